@@ -2,6 +2,10 @@
 ASGI config for E_learning project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn E_learning.asgi:application``)
+to enable the live announcement stream at /announcements/stream/. The
+async dashboards are off unless ``ASYNC_VIEWS=True`` is set as well (see
+E_learning/settings.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
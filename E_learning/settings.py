@@ -1,5 +1,7 @@
 from pathlib import Path
 import os
+import sys
+import django
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -62,6 +64,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "learning.notifications.badge",
             ],
         },
     },
@@ -79,6 +82,24 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (see learning/db.py): WAL and tuned pragmas on every
+# connection, connections kept across requests, and a query_only alias for read-only views
+SQLITE_PRODUCTION = config('SQLITE_PRODUCTION', default=False, cast=bool)
+
+if SQLITE_PRODUCTION:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 5},
+    })
+    if django.VERSION >= (5, 1):
+        # Take the write lock when the transaction starts instead of failing to upgrade it later
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    # Same file; BEGIN IMMEDIATE would need the write lock this alias is forbidden to take
+    DATABASES['readonly'] = dict(DATABASES['default'], OPTIONS={'timeout': 5}, TEST={'MIRROR': 'default'})
+    DATABASE_ROUTERS = ['learning.db.ReadOnlyRouter']
+    MIDDLEWARE.append('learning.db.ReadOnlyViewMiddleware')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -129,14 +150,86 @@ STATICFILES_DIRS = (
     os.path.join(BASE_DIR, "static"),
 )
 
+# Hashed file names and precompressed .gz/.br copies, written by collectstatic (see
+# learning/staticfiles.py). Needs a collectstatic run before {% static %} can render.
+STATIC_MANIFEST = config('STATIC_MANIFEST', default=False, cast=bool)
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': ('learning.staticfiles.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MEDIA_URL = '/media/'
 
+# Media is served by learning.views.main.serve_media after a role check (see learning/media.py).
+# Set MEDIA_OFFLOAD to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) to let the
+# front-end server send the bytes; for nginx, MEDIA_OFFLOAD_PREFIX is its internal location.
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+MEDIA_OFFLOAD_PREFIX = config('MEDIA_OFFLOAD_PREFIX', default='/protected-media/')
+MEDIA_CHUNK_SIZE = 512 * 1024
+
 LOGIN_URL = 'login'
 
+# Fan-out for the announcement stream (see learning/pubsub.py)
+NOTIFICATION_BROKER = config('NOTIFICATION_BROKER', default='learning.pubsub.InProcessBroker')
+
+# Seconds between batched writes of announcement read markers (see learning/read_markers.py)
+READ_MARKER_FLUSH_INTERVAL = config('READ_MARKER_FLUSH_INTERVAL', default=5, cast=int)
+
+# Resumable chunked uploads of notes files (see learning/uploads.py)
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'uploads'))
+CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=1024 * 1024 * 1024, cast=int)
+
+# Bulk account imports (see learning/account_import.py): uploaded CSV/JSONL files hold
+# passwords, so they wait here, outside MEDIA_ROOT, and are deleted once imported.
+# Passwords are hashed on ACCOUNT_IMPORT_WORKERS processes.
+ACCOUNT_IMPORT_DIR = config('ACCOUNT_IMPORT_DIR', default=os.path.join(BASE_DIR, 'imports'))
+ACCOUNT_IMPORT_WORKERS = config('ACCOUNT_IMPORT_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# Run background tasks inline instead of queueing them for run_worker (see learning/jobs.py)
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)
+
+# Seconds a {% fragment %} stays cached at most (see learning/fragments.py)
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a whole response is shared between anonymous visitors; 0 turns it off (see learning/conditional.py)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=0, cast=int)
+
+# Per-request profiling (see learning/profiling.py): Server-Timing headers on every
+# response and the slowest recent requests, with their top SQL, at /profiling/
+PROFILING = config('PROFILING', default=False, cast=bool)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=200, cast=int)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=1.0, cast=float)
+PROFILING_BUFFER_SIZE = 100
+
+if PROFILING:
+    MIDDLEWARE.insert(0, 'learning.profiling.ProfilingMiddleware')
+
+# N+1 detection (see learning/nplusone.py): a statement shape repeated more than
+# NPLUSONE_THRESHOLD times in one request is logged, or raised under manage.py test
+TESTING = sys.argv[1:2] == ['test']
+NPLUSONE_DETECTION = config('NPLUSONE_DETECTION', default=DEBUG or TESTING, cast=bool)
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', default=10, cast=int)
+NPLUSONE_RAISE = TESTING
+
+if NPLUSONE_DETECTION:
+    MIDDLEWARE.insert(0, 'learning.nplusone.QueryRepetitionMiddleware')
+
+# Async dashboards (see learning/concurrency.py): with ASYNC_VIEWS under ASGI the dashboards run
+# their independent queries concurrently, at most DASHBOARD_QUERY_CONCURRENCY at a time per
+# request. Off by default: each read takes a connection of its own, which costs more than it
+# saves unless SQLITE_PRODUCTION keeps connections open and the reads wait on disk or network
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+DASHBOARD_QUERY_CONCURRENCY = config('DASHBOARD_QUERY_CONCURRENCY', default=4, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
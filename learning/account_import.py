@@ -0,0 +1,294 @@
+"""
+Bulk imports of learner and instructor accounts from CSV or JSON Lines.
+
+Signing a class up one form at a time costs, per student, a password hash
+and separate INSERTs for the user, its Learner row and each interest. An
+import works through the file ``CHUNK_SIZE`` records at a time instead:
+
+1. validate the chunk here, finding usernames already taken with one query
+   per chunk rather than one per row;
+2. hash its passwords on a process pool. The hasher is slow on purpose
+   (PBKDF2 with a million iterations by default), which makes it nearly all
+   of an import's time, and it scales with the number of cores;
+3. in one transaction, advance the checkpoint and ``bulk_create`` the users,
+   their Learner/Instructor rows and the interest through rows.
+
+``AccountImport.rows_done`` is the number of the last record committed, so
+an import that dies, or whose job is retried, carries on after it. The
+checkpoint is a compare-and-set: two runs of the same import cannot both
+write a chunk. Rows that fail validation are skipped and written, with the
+reason, to ``<ACCOUNT_IMPORT_DIR>/<import id>.errors.csv``.
+
+Columns (CSV header or JSON keys): ``username``, ``first_name``,
+``last_name`` and ``password`` are required; ``email``, ``phonenumber``,
+``role`` (``learner`` or ``instructor``; the import's role when missing)
+and ``interests``, course names or ids separated by ``;`` or a JSON list.
+
+bulk_create sends no post_save, so the learner sign-up rollup is bumped
+here; imported users keep the default avatar, which needs no derivatives.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import islice
+import csv
+import json
+import multiprocessing
+import os
+import uuid
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups
+from .models import AccountImport, Course, Instructor, Learner, User
+
+CHUNK_SIZE = 1000
+# Rows per INSERT, and usernames per lookup; keeps statements under SQLite's old 999-variable limit
+BATCH_SIZE = 500
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+REQUIRED_COLUMNS = ('username', 'first_name', 'last_name', 'password')
+REPORT_COLUMNS = ['row', 'username', 'error']
+ROLES = [role for role, _ in AccountImport.ROLES]
+
+Progress = namedtuple('Progress', 'rows_done created errors')
+
+
+class Superseded(Exception):
+    """Another run of the same import committed past this run's checkpoint."""
+
+
+def check_format(filename):
+    if os.path.splitext(filename)[1].lower() not in FORMATS:
+        raise ValueError('Import a .csv or .jsonl file, not %s' % os.path.basename(filename))
+
+
+def create(uploaded_file, role, created_by):
+    """Keep an uploaded file in ACCOUNT_IMPORT_DIR and record its import, for the caller to queue."""
+    check_format(uploaded_file.name)
+    os.makedirs(settings.ACCOUNT_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.ACCOUNT_IMPORT_DIR, uuid.uuid4().hex + os.path.splitext(uploaded_file.name)[1].lower())
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return AccountImport.objects.create(created_by=created_by, name=os.path.basename(uploaded_file.name),
+                                        source=path, role=role)
+
+
+def report_path(account_import):
+    return os.path.join(settings.ACCOUNT_IMPORT_DIR, f'{account_import.pk}.errors.csv')
+
+
+def records(path):
+    """``(record number, row)`` for every record of the file; ``row`` is None for a line that is not a JSON object."""
+    check_format(path)
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        if FORMATS[os.path.splitext(path)[1].lower()] == 'csv':
+            reader = csv.DictReader(source)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+            if missing:
+                raise ValueError('The CSV header has no %s column' % ', '.join(missing))
+            yield from enumerate(reader, 1)
+            return
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def _text(row, column):
+    value = row.get(column)
+    return '' if value is None else str(value).strip()
+
+
+def _message(error):
+    if hasattr(error, 'error_dict'):
+        return ' '.join(f'{field}: {message}' for field, messages in error.message_dict.items()
+                        for message in messages)
+    return ' '.join(error.messages)
+
+
+def _course_lookup():
+    # Names (case-insensitively) and ids, as the interests column may use either
+    courses = list(Course.objects.values_list('pk', 'name'))
+    return {**{name.casefold(): pk for pk, name in courses}, **{str(pk): pk for pk, _ in courses}}
+
+
+def _interests(value, courses):
+    names = value if isinstance(value, list) else ('' if value is None else str(value)).split(';')
+    names = [str(name).strip() for name in names if str(name).strip()]
+    unknown = [name for name in names if name.casefold() not in courses]
+    if unknown:
+        raise ValidationError('interests: no course named %s' % ', '.join(unknown))
+    return list(dict.fromkeys(courses[name.casefold()] for name in names))
+
+
+def _account(row, default_role, courses):
+    role = _text(row, 'role').lower() or default_role
+    if role not in ROLES:
+        raise ValidationError('role: must be one of %s' % ', '.join(ROLES))
+    user = User(
+        username=_text(row, 'username'), email=_text(row, 'email'),
+        first_name=_text(row, 'first_name'), last_name=_text(row, 'last_name'),
+        phonenumber=_text(row, 'phonenumber') or None,
+        is_learner=role == 'learner', is_instructor=role == 'instructor',
+    )
+    # Field validators and lengths; uniqueness is checked for the whole chunk at once
+    user.clean_fields(exclude=['password'])
+    password = row.get('password')
+    if not isinstance(password, str) or not password:
+        raise ValidationError('password: This field cannot be blank.')
+    try:
+        validate_password(password, user)
+    except ValidationError as error:
+        raise ValidationError('password: %s' % _message(error))
+    return {'user': user, 'password': password, 'role': role, 'interests': _interests(row.get('interests'), courses)}
+
+
+def _validate(chunk, default_role, courses):
+    """The chunk's valid accounts (dicts) and ``(number, username, error)`` for the rest."""
+    usernames = list({_text(row, 'username') for _, row in chunk if row})
+    taken = set()
+    for i in range(0, len(usernames), BATCH_SIZE):
+        taken.update(User.objects.filter(username__in=usernames[i:i + BATCH_SIZE]).values_list('username', flat=True))
+
+    accounts, errors = [], []
+    for number, row in chunk:
+        username = _text(row, 'username') if row else ''
+        try:
+            if row is None:
+                raise ValidationError('Not a JSON object')
+            account = _account(row, default_role, courses)
+            if username in taken:
+                raise ValidationError('username: A user with that username already exists.')
+        except ValidationError as error:
+            errors.append((number, username, _message(error)))
+            continue
+        taken.add(username)
+        account['number'] = number
+        accounts.append(account)
+    return accounts, errors
+
+
+def _write(account_import, start, end, accounts, errors):
+    now = timezone.now()
+    with transaction.atomic():
+        advanced = AccountImport.objects.filter(pk=account_import.pk, rows_done=start).update(
+            rows_done=end, created_count=F('created_count') + len(accounts),
+            error_count=F('error_count') + len(errors), updated_at=now)
+        if not advanced:
+            raise Superseded(account_import.pk)
+
+        for account in accounts:
+            account['user'].date_joined = now
+        User.objects.bulk_create([account['user'] for account in accounts], batch_size=BATCH_SIZE)
+        learners = [account for account in accounts if account['role'] == 'learner']
+        instructors = {account['user'].pk: Instructor(user=account['user'])
+                       for account in accounts if account['role'] == 'instructor'}
+        Learner.objects.bulk_create([Learner(user=account['user']) for account in learners], batch_size=BATCH_SIZE)
+        Instructor.objects.bulk_create(instructors.values(), batch_size=BATCH_SIZE)
+        Learner.interests.through.objects.bulk_create([
+            Learner.interests.through(learner_id=account['user'].pk, course_id=course_id)
+            for account in learners for course_id in account['interests']
+        ], batch_size=BATCH_SIZE)
+        Instructor.interest.through.objects.bulk_create([
+            Instructor.interest.through(instructor_id=instructors[account['user'].pk].pk, course_id=course_id)
+            for account in accounts if account['role'] == 'instructor' for course_id in account['interests']
+        ], batch_size=BATCH_SIZE)
+        if learners:
+            rollups.signups_added({timezone.localdate(now): len(learners)})
+
+        # Last, so a chunk that rolls back has not been reported; a crash between this and the
+        # commit leaves rows past the checkpoint, which _trim_report drops before the next run
+        if errors:
+            with open(report_path(account_import), 'a', newline='', encoding='utf-8') as report:
+                csv.writer(report).writerows(errors)
+
+
+def _trim_report(account_import):
+    path = report_path(account_import)
+    if not os.path.exists(path):
+        os.makedirs(settings.ACCOUNT_IMPORT_DIR, exist_ok=True)
+        with open(path, 'w', newline='', encoding='utf-8') as report:
+            csv.writer(report).writerow(REPORT_COLUMNS)
+        return
+    with open(path, newline='', encoding='utf-8') as report:
+        rows = list(csv.reader(report))
+    with open(path, 'w', newline='', encoding='utf-8') as report:
+        csv.writer(report).writerows([REPORT_COLUMNS] + [row for row in rows[1:]
+                                                         if int(row[0]) <= account_import.rows_done])
+
+
+def _owned(path):
+    directory = os.path.abspath(settings.ACCOUNT_IMPORT_DIR)
+    return os.path.commonpath([os.path.abspath(path), directory]) == directory
+
+
+def run(account_import, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Import what is left of ``account_import``, yielding a Progress after each chunk commits.
+    Raises Superseded when another run of the same import got ahead of this one.
+    """
+    workers = settings.ACCOUNT_IMPORT_WORKERS if workers is None else workers
+    AccountImport.objects.filter(pk=account_import.pk).update(
+        state=AccountImport.RUNNING, last_error='', updated_at=timezone.now())
+    account_import.refresh_from_db()
+    _trim_report(account_import)
+    # A hasher instance rather than a name, so workers hash with this process's PASSWORD_HASHERS
+    hash_password = partial(make_password, hasher=get_hasher())
+    courses = _course_lookup()
+    start = account_import.rows_done
+    try:
+        with ExitStack() as stack:
+            pool = None
+            if workers > 1:
+                # Hashing is CPU bound, so processes rather than threads
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup))
+            pending = ((number, row) for number, row in records(account_import.source) if number > start)
+            while chunk := list(islice(pending, chunk_size)):
+                end = chunk[-1][0]
+                accounts, errors = _validate(chunk, account_import.role, courses)
+                passwords = [account['password'] for account in accounts]
+                if pool is not None:
+                    hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+                else:
+                    hashes = map(hash_password, passwords)
+                hashed = {account['number']: password for account, password in zip(accounts, hashes)}
+                for attempt in range(2):
+                    for account in accounts:
+                        number = account['number']
+                        account['user'].password = hashed[number] if number in hashed \
+                            else hash_password(account['password'])
+                    try:
+                        _write(account_import, start, end, accounts, errors)
+                        break
+                    except IntegrityError:
+                        if attempt:
+                            raise
+                        # A username was taken (say, by a sign-up) since the chunk was checked
+                        accounts, errors = _validate(chunk, account_import.role, courses)
+                start = end
+                yield Progress(end, len(accounts), errors)
+    except Superseded:
+        raise
+    except Exception as error:
+        AccountImport.objects.filter(pk=account_import.pk).update(
+            state=AccountImport.FAILED, last_error=f'{error.__class__.__name__}: {error}', updated_at=timezone.now())
+        raise
+
+    AccountImport.objects.filter(pk=account_import.pk).update(state=AccountImport.DONE, updated_at=timezone.now())
+    account_import.refresh_from_db()
+    if _owned(account_import.source) and os.path.exists(account_import.source):
+        os.remove(account_import.source)
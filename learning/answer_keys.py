@@ -0,0 +1,72 @@
+"""
+Cached per-quiz answer keys.
+
+A snapshot holds a quiz's question order, answer options and correct answer
+ids as plain tuples. It is cached under the quiz's ``key_version``, which
+the instructor views bump whenever they change questions or answers, so a
+stale snapshot is never read and nothing has to be deleted from the cache.
+"""
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Answer, Question, Quiz
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class AnswerKey:
+
+    def __init__(self, quiz, snapshot):
+        self.quiz = quiz
+        questions, correct_ids = snapshot
+        self.questions = [
+            (Question(pk=question_id, quiz=quiz, text=text),
+             [Answer(pk=answer_id, question_id=question_id, text=answer_text) for answer_id, answer_text in answers])
+            for question_id, text, answers in questions
+        ]
+        self.correct_ids = frozenset(correct_ids)
+        self.answer_ids = [answer.pk for _, answers in self.questions for answer in answers]
+
+    def __len__(self):
+        return len(self.questions)
+
+    def unanswered(self, answered_ids):
+        """Questions (with their answers) that none of ``answered_ids`` belongs to, in quiz order."""
+        answered_ids = set(answered_ids)
+        return [
+            (question, answers) for question, answers in self.questions
+            if not any(answer.pk in answered_ids for answer in answers)
+        ]
+
+
+def _cache_key(quiz):
+    return 'answer-key:%s:%s' % (quiz.pk, quiz.key_version)
+
+def _build_snapshot(quiz):
+    answers = {}
+    correct_ids = []
+    for question_id, answer_id, text, is_correct in Answer.objects.filter(question__quiz=quiz) \
+            .order_by('text').values_list('question_id', 'id', 'text', 'is_correct'):
+        answers.setdefault(question_id, []).append((answer_id, text))
+        if is_correct:
+            correct_ids.append(answer_id)
+    questions = tuple(
+        (question_id, text, tuple(answers.get(question_id, ())))
+        for question_id, text in quiz.questions.order_by('text').values_list('id', 'text')
+    )
+    return questions, tuple(correct_ids)
+
+def get_answer_key(quiz):
+    key = _cache_key(quiz)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _build_snapshot(quiz)
+        cache.set(key, snapshot, CACHE_TIMEOUT)
+    return AnswerKey(quiz, snapshot)
+
+def bump_version(quiz):
+    """Invalidate the cached answer key after the quiz's questions or answers change."""
+    # updated_at too: the quiz's ETag in the API is built from it
+    Quiz.objects.filter(pk=quiz.pk).update(key_version=F('key_version') + 1, updated_at=timezone.now())
+    quiz.refresh_from_db(fields=['key_version', 'updated_at'])
@@ -0,0 +1,147 @@
+"""
+Building blocks of the JSON API (learning/views/api.py, under ``/api/v1/``).
+
+Responses are built from ``values()`` rows rather than model instances:
+each resource has a ``Projection`` from output names to columns, made once
+at import, and a request reads only the columns of the fields it asks for
+with ``?fields=a,b`` (plus the ordering columns the cursor needs). Lists are
+cursor-paginated with ``learning.pagination`` and wrapped as
+``{"results": [...], "next": cursor, "previous": cursor}``.
+
+``endpoint`` wraps every API view: it answers ``401``/``403`` as JSON
+instead of redirecting to the login page, turns ``ApiError`` and ``Http404``
+into ``{"error": ...}`` bodies, and gives any successful GET that has no
+``ETag`` yet (the views wrapped in ``conditional`` have one) a tag of its
+body, so unchanged responses go back as ``304`` without a body. The API uses
+the session cookie of the site's login; writes need the ``X-CSRFToken``
+header like any other POST.
+"""
+from functools import wraps
+import json
+
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+
+from .pagination import CURSOR_PARAM, CursorPaginator
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'separators': (',', ':')})
+
+
+def _error(status, message, **details):
+    return json_response(dict(error=message, **details), status=status)
+
+
+def file_url(model, name):
+    """Converter for a file column: its URL, or None when the row has no file."""
+    storage = model._meta.get_field(name).storage
+    return lambda value: storage.url(value) if value else None
+
+
+class Projection:
+    """
+    The fields of one resource: output name -> column (a ``values()`` path),
+    or ``(column, converter)`` when the stored value is not what the client
+    gets. A column of ``None`` is filled in by the view.
+    """
+
+    def __init__(self, **fields):
+        self.fields = {name: spec if isinstance(spec, tuple) else (spec, None) for name, spec in fields.items()}
+
+    def selected(self, request):
+        """The names asked for with ``?fields=``, in order; all of them by default."""
+        param = request.GET.get('fields', '')
+        names = [name.strip() for name in param.split(',') if name.strip()] or list(self.fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(400, 'Unknown field(s): %s' % ', '.join(unknown), available=list(self.fields))
+        return names
+
+    def values(self, queryset, names, extra=()):
+        columns = [self.fields[name][0] for name in names if self.fields[name][0] is not None]
+        return queryset.values(*dict.fromkeys(columns + list(extra)))
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            column, convert = self.fields[name]
+            if column is not None:
+                data[name] = convert(row[column]) if convert else row[column]
+        return data
+
+
+def page(request, projection, queryset, ordering):
+    """One page of ``queryset`` as the list envelope, in the fields ``request`` asks for."""
+    names = projection.selected(request)
+    try:
+        per_page = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError(400, 'limit must be a number')
+    rows = projection.values(queryset, names, extra=[field.lstrip('-') for field in ordering])
+    result = CursorPaginator(rows, per_page, ordering).page(request.GET.get(CURSOR_PARAM))
+    return {
+        'results': [projection.serialize(row, names) for row in result],
+        'next': result.next_cursor,
+        'previous': result.previous_cursor,
+    }
+
+
+def detail(request, projection, queryset):
+    """The one row of ``queryset`` in the fields ``request`` asks for, or 404."""
+    names = projection.selected(request)
+    row = projection.values(queryset, names).first()
+    if row is None:
+        raise Http404
+    return projection.serialize(row, names)
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'The body must be JSON')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'The body must be a JSON object')
+    return data
+
+
+def endpoint(*methods, role='learner'):
+    """Decorate an API view answering ``methods`` to users with ``role``."""
+    methods = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _error(401, 'Authentication required')
+            if not getattr(request.user, 'is_%s' % role):
+                return _error(403, 'Only %ss can use this endpoint' % role)
+            if request.method not in methods:
+                response = _error(405, 'Method not allowed')
+                response['Allow'] = ', '.join(sorted(methods))
+                return response
+            try:
+                response = view(request, *args, **kwargs)
+            except ApiError as error:
+                return _error(error.status, error.message, **error.details)
+            except Http404:
+                return _error(404, 'Not found')
+            if request.method in ('GET', 'HEAD') and response.status_code == 200 and not response.has_header('ETag'):
+                set_response_etag(response)
+                response = get_conditional_response(request, etag=response['ETag'], response=response)
+            return response
+        return wrapped
+    return decorator
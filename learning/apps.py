@@ -3,3 +3,14 @@ from django.apps import AppConfig
 class LearningConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "learning"
+
+    def ready(self):
+        from . import rollups  # noqa: F401  (connects the rollup signal receivers)
+        from . import notifications  # noqa: F401
+        from . import db  # noqa: F401  (applies the production SQLite pragmas)
+        from . import images  # noqa: F401  (resizes uploaded images)
+        from . import tasks  # noqa: F401  (registers the background tasks)
+        from . import item_analysis  # noqa: F401  (drops cached quiz statistics on deleted attempts)
+        from . import search  # noqa: F401  (keeps the full-text index in sync)
+        from . import staticfiles  # noqa: F401  (registers the vendor asset check)
+        from . import fragments  # noqa: F401  (bumps fragment versions when content changes)
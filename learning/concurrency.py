@@ -0,0 +1,61 @@
+"""
+Running independent ORM reads of one request concurrently (ASGI only).
+
+Django's async ORM methods (``acount()``, ``aaggregate()``...) all run on
+the one thread that owns the request's database connection, so gathering
+them still runs the queries one after another. ``gather`` runs each read in
+a worker thread of its own instead, on that thread's own connection, so the
+database can answer them in parallel; SQLite lets readers overlap, and the
+sqlite3 module releases the GIL while a statement runs. At most
+``DASHBOARD_QUERY_CONCURRENCY`` reads of one request run at once, so a burst
+of dashboard loads cannot open an unbounded number of connections.
+
+Worker threads outlive the request, so each read closes its thread's
+connections afterwards the way Django does at the end of a request (keeping
+them for ``CONN_MAX_AGE``). Reads that need data written earlier in the same
+request, or that run inside a transaction, must not go through here: the
+worker connections cannot see uncommitted rows. The profiling and N+1
+hooks follow the reads into the threads; the ``sql`` figure in
+``Server-Timing`` then adds up statements that overlapped, so it can
+exceed ``view``.
+
+``request_user`` loads the user once for an async view and leaves it on
+``request.user`` too, so rendering does not query it a second time.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def _isolated(call):
+    def run():
+        close_old_connections()
+        try:
+            return call()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather(calls, limit=None):
+    """
+    Run the callables in the dict ``calls`` concurrently, at most ``limit``
+    at a time, and return a dict of their results under the same keys.
+    """
+    semaphore = asyncio.Semaphore(limit or getattr(settings, 'DASHBOARD_QUERY_CONCURRENCY', 4))
+
+    async def run(call):
+        async with semaphore:
+            return await sync_to_async(_isolated(call), thread_sensitive=False)()
+
+    results = await asyncio.gather(*(run(call) for call in calls.values()))
+    return dict(zip(calls, results))
+
+
+async def request_user(request):
+    """The authenticated user of ``request``, for async views."""
+    user = await request.auser()
+    request.user = user
+    return user
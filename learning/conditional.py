@@ -0,0 +1,125 @@
+"""
+Conditional GET for read-mostly pages, and a shared response cache.
+
+``conditional(rows, field)`` gives a view an ``ETag`` built from the newest
+``field`` and the row count of the queryset ``rows(request, ...)`` returns,
+read in one aggregate query, and answers ``304 Not Modified`` when the
+browser already has that version. The count catches deletions, which
+``MAX()`` alone would miss. Related rows the page also shows, such as a
+tutorial's course name, are covered with ``depends``: the content versions
+of ``learning.fragments``, bumped whenever one of them changes. They are
+read from the database (one more query), so every server process sees the
+same versions and builds the same tag. Because the pages carry the
+viewer's name and a CSRF token, the tag also covers the user, their role,
+their CSRF cookie and the templates (their newest modification time), and
+the response is ``Cache-Control: private, no-cache``: browsers keep it but
+ask every time, shared caches do not keep it. ``Last-Modified`` is sent for information
+only; a date cannot see deletions, so ``If-Modified-Since`` is not honoured.
+The unread badge in the navbar may be stale on a 304, as it always is until
+the page script fetches the current count. Pages with pending flash messages
+are always rendered, so the messages are shown.
+
+``shared_cache(roles)`` stores whole responses per role and URL for
+``RESPONSE_CACHE_TIMEOUT`` seconds (0, the default, turns it off). Only use
+it on pages that render the same for everyone in those roles: no user name,
+no CSRF token.
+"""
+from functools import lru_cache, wraps
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .fragments import role, versions
+from .models import Announcement
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+
+@lru_cache(maxsize=None)
+def templates_version():
+    """Newest modification time of the app's templates, so a deploy does not answer 304 with old HTML."""
+    latest = 0
+    for directory, _, files in os.walk(TEMPLATE_DIR):
+        for name in files:
+            latest = max(latest, os.stat(os.path.join(directory, name)).st_mtime_ns)
+    return latest
+
+
+def _etag(request, latest, count, content_versions=()):
+    user = request.user
+    parts = [role(user), user.pk, user.get_username(), request.META.get('CSRF_COOKIE', ''),
+             templates_version(), latest.isoformat() if latest else '', count, *content_versions]
+    return '"%s"' % hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional(rows=None, field=None, depends=()):
+    """
+    Decorate a view (or, with ``method_decorator``, a class-based view's
+    ``get``) to answer conditional GETs. Without ``rows`` the tag only
+    covers the user and the templates, for pages that show no data.
+    ``depends`` names the content kinds (``learning.fragments.VERSIONED``)
+    of related rows the page shows.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+            latest, count = None, 0
+            if rows is not None:
+                aggregate = rows(request, *args, **kwargs).aggregate(latest=Max(field), count=Count('pk'))
+                latest, count = aggregate['latest'], aggregate['count']
+            content_versions = versions(depends)
+
+            def add_validators(response):
+                response['ETag'] = _etag(request, latest, count, content_versions)
+                if latest:
+                    response['Last-Modified'] = http_date(latest.timestamp())
+                patch_cache_control(response, private=True, no_cache=True)
+
+            response = get_conditional_response(request, etag=_etag(request, latest, count, content_versions))
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            # Rendering may set the CSRF cookie the tag covers; class-based views render after returning
+            if getattr(response, 'is_rendered', True):
+                add_validators(response)
+            else:
+                response.add_post_render_callback(add_validators)
+            return response
+        return wrapped
+    return decorator
+
+
+def published_announcements(request, *args, **kwargs):
+    """The rows behind the announcement lists, for ``conditional``."""
+    return Announcement.objects.filter(posted_at__lt=timezone.now())
+
+
+def shared_cache(roles=('anonymous',)):
+    """Decorate a view whose response is the same for every user in ``roles``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+            viewer = role(request.user)
+            if not timeout or request.method not in ('GET', 'HEAD') or viewer not in roles:
+                return view(request, *args, **kwargs)
+            key = 'response:%s:%s:%s' % (viewer, templates_version(),
+                                         hashlib.md5(request.get_full_path().encode()).hexdigest())
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies and not response.streaming:
+                    cache.set(key, response, timeout)
+            return response
+        return wrapped
+    return decorator
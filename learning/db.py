@@ -0,0 +1,111 @@
+"""
+Opt-in production profile for SQLite (``SQLITE_PRODUCTION=True``).
+
+Every new connection is switched to WAL with the pragmas below, so readers
+no longer wait for writers. GET requests to the read-only views listed in
+READ_ONLY_VIEWS read through a second alias opened with ``query_only``. The
+alias points at the same file, so it only takes reads off the connection
+that writes; it also guarantees those views cannot write by accident.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+READ_ONLY_ALIAS = 'readonly'
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    # Durable across application crashes; only a power loss can drop the last commits
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative means KiB: 64 MiB of page cache per connection
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# URL names whose GET requests only read
+READ_ONLY_VIEWS = {
+    'media',
+    'dashboard', 'allannonce', 'allusers', 'importaccounts', 'importreport',
+    'instructor', 'instructorallannonce', 'quiz_change_list', 'quiz_results', 'itutorial', 'itutorial-detail',
+    'lnotes',
+    'learner', 'learnerallannonce', 'grades', 'ltutorial', 'search', 'tutorial-detail', 'lquiz_list',
+    'taken_quiz_list',
+    'api-courses', 'api-tutorials', 'api-tutorial', 'api-notes', 'api-quizzes', 'api-quiz', 'api-taken',
+}
+
+_read_only = ContextVar('read_only', default=False)
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_PRODUCTION', False):
+        return
+    with connection.cursor() as cursor:
+        for name, value in PRODUCTION_PRAGMAS.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+        if connection.alias == READ_ONLY_ALIAS:
+            cursor.execute('PRAGMA query_only = ON')
+            # Only has an effect in shared-cache mode (the in-memory test database), where
+            # it lets this alias read the default connection's open test transaction
+            cursor.execute('PRAGMA read_uncommitted = ON')
+
+
+class ReadOnlyRouter:
+    """Send reads made while serving a read-only view to READ_ONLY_ALIAS."""
+
+    def db_for_read(self, model, **hints):
+        if _read_only.get() and READ_ONLY_ALIAS in connections.databases:
+            return READ_ONLY_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
+
+
+class ReadOnlyViewMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Set the flag in the request's own context, not a thread's copy, so __acall__ can reset it
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._reset(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._reset(request)
+        return response
+
+    def _reset(self, request):
+        token = getattr(request, '_read_only_token', None)
+        if token is not None:
+            _read_only.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD') and request.resolver_match.url_name in READ_ONLY_VIEWS:
+            request._read_only_token = _read_only.set(True)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        ReadOnlyViewMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
@@ -97,8 +97,27 @@ class BaseAnswerInlineFormSet(forms.BaseInlineFormSet):
         if not has_one_correct_answer:
             raise ValidationError('Mark at least one answer as correct.', code='no_correct_answer')
 
+class AnswerChoiceField(forms.ModelChoiceField):
+    # Can be fed answers that were loaded up front, so a page holding a whole
+    # quiz renders and validates without one query per question
+    answers = None
+
+    def set_answers(self, answers):
+        self.answers = {str(answer.pk): answer for answer in answers}
+        self.choices = [(answer.pk, answer.text) for answer in answers]
+
+    def to_python(self, value):
+        if self.answers is None:
+            return super().to_python(value)
+        if value in self.empty_values:
+            return None
+        try:
+            return self.answers[str(value)]
+        except KeyError:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
 class TakeQuizForm(forms.ModelForm):
-    answer = forms.ModelChoiceField(
+    answer = AnswerChoiceField(
         queryset=Answer.objects.none(),
         widget=forms.RadioSelect(),
         required=True,
@@ -110,8 +129,18 @@ class TakeQuizForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         question = kwargs.pop('question')
+        answers = kwargs.pop('answers', None)
         super().__init__(*args, **kwargs)
         self.fields['answer'].queryset = question.answers.order_by('text')
+        if answers is not None:
+            self.fields['answer'].set_answers(answers)
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        if self.fields['answer'].answers is not None:
+            # Already checked against the preloaded answers, skip the model's FK lookup
+            exclude.add('answer')
+        return exclude
 
 class LearnerCourse(forms.ModelForm):
     class Meta:
@@ -0,0 +1,116 @@
+"""
+Cached template fragments, invalidated by content versions.
+
+``{% fragment %}`` (learning/templatetags/fragments.py) caches the HTML of
+a block under the fragment's name, the viewer's role and user id, any extra
+values the block varies on, and the current version of each kind of content
+it shows. Saving or deleting a ``Course``, ``Tutorial``, ``Notes`` or
+``Announcement`` bumps that kind's version, as does a change to a user's
+name (the ``user`` kind, for pages that show authors), so the next render
+misses and every older copy is simply never read again; nothing is
+deleted. A kind's first bump starts it at the current time in milliseconds
+rather than at one, so emptying the table cannot bring back a number an
+old fragment was cached under.
+
+The versions live in the ``ContentVersion`` table, bumped with ``F()``, so
+a change made by any server process or by the job worker (a course
+deleted by ``delete_course``, derivatives written by ``make_derivatives``)
+reaches every process at once. Reading them is one query per fragment or
+conditional GET that depends on content. The fragments themselves may sit
+in the default per-process cache; a shared cache only saves each process
+rendering its own copy.
+
+Hits and misses are counted per fragment name in this process and shown on
+the admin *Slow Requests* page.
+"""
+from collections import Counter
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Announcement, ContentVersion, Course, Notes, Tutorial, User
+
+VERSIONED = {Course: 'course', Tutorial: 'tutorial', Notes: 'notes', Announcement: 'announcement', User: 'user'}
+
+# The user fields content shows; logins save last_login alone and leave the version be
+_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+_hits = Counter()
+_misses = Counter()
+_stats_lock = threading.Lock()
+
+
+def versions(kinds):
+    """The current version of each of ``kinds``, in order; 0 for a kind never bumped."""
+    if not kinds:
+        return []
+    found = dict(ContentVersion.objects.filter(kind__in=kinds).values_list('kind', 'version'))
+    return [found.get(kind, 0) for kind in kinds]
+
+
+def bump(kind):
+    if ContentVersion.objects.filter(kind=kind).update(version=F('version') + 1):
+        return
+    _, created = ContentVersion.objects.get_or_create(kind=kind, defaults={'version': int(time.time() * 1000)})
+    if not created:
+        # Another process made the row first; this change still needs a version of its own
+        ContentVersion.objects.filter(kind=kind).update(version=F('version') + 1)
+
+
+def role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_admin or user.is_superuser:
+        return 'admin'
+    if user.is_instructor:
+        return 'instructor'
+    if user.is_learner:
+        return 'learner'
+    return 'user'
+
+
+def cache_key(name, user, vary_on, depends):
+    vary = hashlib.md5(':'.join(str(value) for value in vary_on).encode()).hexdigest()
+    return 'fragment:%s:%s:%s:%s:%s' % (name, role(user), user.pk, vary,
+                                        '.'.join(str(version) for version in versions(depends)))
+
+
+def load(name, key):
+    html = cache.get(key)
+    with _stats_lock:
+        (_misses if html is None else _hits)[name] += 1
+    return html
+
+
+def store(key, html):
+    cache.set(key, html, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300))
+
+
+def stats():
+    """``(name, hits, misses)`` for every fragment rendered in this process, by name."""
+    with _stats_lock:
+        return [(name, _hits[name], _misses[name]) for name in sorted(set(_hits) | set(_misses))]
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Tutorial)
+@receiver(post_save, sender=Notes)
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Tutorial)
+@receiver(post_delete, sender=Notes)
+@receiver(post_delete, sender=Announcement)
+def content_changed(sender, **kwargs):
+    bump(VERSIONED[sender])
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    if update_fields is None or _USER_FIELDS & set(update_fields):
+        bump('user')
@@ -0,0 +1,119 @@
+"""
+Resized copies ("derivatives") of uploaded images.
+
+Each original gets one WebP and one JPEG per width in DERIVATIVES, stored
+next to it as ``<name>.<width>w.webp`` / ``.jpg``; ``<name>`` keeps the
+original's extension, so ``a.png`` and ``a.jpg`` do not share copies. They
+are generated when a tutorial, note or user is saved with an image whose
+derivatives are missing or older than the original, and templates serve
+them through the ``{% responsive_image %}`` tag. Saving only queues the
+work (see learning/jobs.py). Images saved before this existed (or loaded
+with bulk_create) are covered by ``python manage.py generate_derivatives``.
+Both bump the owning model's fragment version once the files are written,
+so cached pages that showed the plain original pick up the derivatives.
+"""
+from io import BytesIO
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import fragments
+from .jobs import task
+from .models import Notes, Tutorial, User
+
+logger = logging.getLogger(__name__)
+
+# Widths in CSS pixels times 1x/2x of where each image is shown
+DERIVATIVES = {
+    (Tutorial, 'thumb'): (300, 600, 1200),
+    (Notes, 'cover'): (100, 200),
+    (User, 'avatar'): (100, 200, 400),
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivative_name(name, width, extension):
+    return f'{name}.{width}w.{extension}'
+
+
+def is_stale(name, widths, storage=default_storage):
+    """True when the largest derivative of ``name`` is missing or older than the original."""
+    largest = derivative_name(name, max(widths), 'jpg')
+    try:
+        return (not storage.exists(largest)
+                or storage.get_modified_time(largest) < storage.get_modified_time(name))
+    except (OSError, NotImplementedError):
+        return True
+
+
+def generate(name, widths, storage=default_storage):
+    """Write every derivative of ``name``; returns the names written."""
+    with storage.open(name, 'rb') as f:
+        original = Image.open(f)
+        # Let JPEG decode at 1/2, 1/4 or 1/8 scale when that is still larger than needed
+        original.draft('RGB', (max(widths), max(widths)))
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        # JPEG has no alpha; flatten transparent PNGs onto white
+        background = Image.new('RGB', original.size, 'white')
+        background.paste(original, mask=original.convert('RGBA').getchannel('A'))
+        original = background
+
+    written = []
+    for width in widths:
+        # Never upscale: a 200px upload gets "400w" copies at 200px, which the browser handles fine
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        for extension, options in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, **options)
+            target = derivative_name(name, width, extension)
+            # save() would pick a new name rather than overwrite
+            storage.delete(target)
+            written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def widths_for(field_file):
+    return DERIVATIVES[(field_file.instance.__class__, field_file.field.name)]
+
+
+def delete_derivatives(field_file):
+    for width in widths_for(field_file):
+        for extension in FORMATS:
+            field_file.storage.delete(derivative_name(field_file.name, width, extension))
+
+
+@task(process=True, priority=3)
+def make_derivatives(name, widths, kind=None):
+    try:
+        generate(name, widths)
+    except (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError):
+        # Retrying will not help; templates keep serving the original
+        logger.warning('Could not generate derivatives of %s', name, exc_info=True)
+        return
+    if kind:
+        # Fragments rendered while the derivatives were missing hold a plain <img>
+        fragments.bump(kind)
+
+
+@receiver(post_save, sender=Tutorial)
+@receiver(post_save, sender=Notes)
+@receiver(post_save, sender=User)
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    for (model, field), widths in DERIVATIVES.items():
+        if model is not sender or (update_fields is not None and field not in update_fields):
+            continue
+        name = getattr(instance, field).name
+        # The shared default avatar is left to generate_derivatives rather than checked on every signup
+        if name and name != sender._meta.get_field(field).get_default() and is_stale(name, widths):
+            make_derivatives.delay(name, list(widths), fragments.VERSIONED[sender])
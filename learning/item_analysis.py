@@ -0,0 +1,152 @@
+"""
+Per-question statistics for the quiz results page.
+
+For every question: its difficulty (the share of respondents answering it
+correctly), its discrimination (the point-biserial correlation between
+answering it correctly and the score on the *other* questions, so an item
+does not correlate with itself), and how often each answer was picked.
+
+All of these derive from a few sums over respondents: n, sum(S), sum(S^2)
+for the total scores S, sum(X_j) and sum(X_j * S) per question (X_j = 1 if
+correct), and a pick count per answer. The sums are cached per quiz together
+with the id of the last attempt they include. Opening the results page only
+loads the ``LearnerAnswer`` rows of attempts made since then, once, into
+NumPy arrays, and adds them in. A change to the questions (the answer key's
+``key_version``) or a deleted attempt starts the sums over.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+import numpy as np
+
+from .answer_keys import get_answer_key
+from .models import LearnerAnswer, TakenQuiz
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Below these, a question is flagged on the results page
+MIN_DISCRIMINATION = 0.2
+MIN_DIFFICULTY, MAX_DIFFICULTY = 0.2, 0.9
+
+
+def _cache_key(quiz_id):
+    return 'item-analysis:%s' % quiz_id
+
+
+class _Layout:
+    """Column positions for a quiz's answer key: one column per answer, grouped by question."""
+
+    def __init__(self, key):
+        self.key = key
+        self.answer_ids = np.array(key.answer_ids, dtype=np.int64)
+        self.order = np.argsort(self.answer_ids, kind='stable')
+        self.question_of = np.array(
+            [q for q, (_, answers) in enumerate(key.questions) for _ in answers], dtype=np.int64)
+        self.correct = np.isin(self.answer_ids, np.fromiter(key.correct_ids, dtype=np.int64))
+        # (answers x questions) 0/1 matrix summing an answer column into its question
+        self.to_question = np.zeros((len(self.answer_ids), len(key)), dtype=np.int64)
+        self.to_question[np.arange(len(self.answer_ids)), self.question_of] = 1
+
+    def empty(self, version):
+        return {
+            'version': version, 'last_attempt': 0, 'n': 0, 'sum_s': 0.0, 'sum_s2': 0.0,
+            'sum_x': [0.0] * len(self.key), 'sum_xs': [0.0] * len(self.key),
+            'picks': [0] * len(self.answer_ids),
+        }
+
+    def add(self, sums, learner_ids, rows):
+        """Add the attempts of ``learner_ids``, whose picks are ``rows`` of (learner id, answer id)."""
+        learners = np.unique(np.asarray(learner_ids, dtype=np.int64))
+        picks = np.zeros((len(learners), len(self.answer_ids)), dtype=bool)
+        if rows:
+            pairs = np.asarray(rows, dtype=np.int64)
+            row = np.searchsorted(learners, pairs[:, 0])
+            column = self.order[np.searchsorted(self.answer_ids, pairs[:, 1], sorter=self.order)]
+            picks[row, column] = True
+        # x[i, j] = 1 if learner i picked the correct answer of question j
+        x = ((picks & self.correct).astype(np.int64) @ self.to_question > 0).astype(np.float64)
+        s = x.sum(axis=1)
+        sums['n'] += len(learners)
+        sums['sum_s'] += float(s.sum())
+        sums['sum_s2'] += float((s * s).sum())
+        sums['sum_x'] = (np.asarray(sums['sum_x']) + x.sum(axis=0)).tolist()
+        sums['sum_xs'] = (np.asarray(sums['sum_xs']) + x.T @ s).tolist()
+        sums['picks'] = (np.asarray(sums['picks']) + picks.sum(axis=0)).tolist()
+
+    def statistics(self, sums):
+        """Difficulty and discrimination per question, and the picks per answer, from the sums."""
+        n = sums['n']
+        if not n:
+            return [None] * len(self.key), [None] * len(self.key)
+        sum_x, sum_xs = np.asarray(sums['sum_x']), np.asarray(sums['sum_xs'])
+        p = sum_x / n
+        # Rest score R_j = S - X_j; since X_j^2 = X_j these follow from the stored sums
+        mean_r = (sums['sum_s'] - sum_x) / n
+        mean_r2 = (sums['sum_s2'] - 2 * sum_xs + sum_x) / n
+        mean_xr = (sum_xs - sum_x) / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = (mean_xr - p * mean_r) / np.sqrt(p * (1 - p) * (mean_r2 - mean_r ** 2))
+        # Undefined when everyone (or no one) got the question or the rest of the quiz right
+        discrimination = [None if not np.isfinite(value) else float(value) for value in r]
+        return p.tolist(), discrimination
+
+
+def _new_attempts(quiz, attempts, last_attempt):
+    if attempts is None:
+        attempts = TakenQuiz.objects.filter(quiz=quiz, pk__gt=last_attempt).values_list('pk', 'learner_id')
+        return list(attempts)
+    return [(attempt.pk, attempt.learner_id) for attempt in attempts if attempt.pk > last_attempt]
+
+
+def analyse(quiz, attempts=None):
+    """
+    Return the item analysis of ``quiz`` as a list of dicts, one per question
+    in quiz order. ``attempts`` may be the quiz's ``TakenQuiz`` rows when the
+    caller has loaded them anyway; otherwise the new ones are queried.
+    """
+    key = get_answer_key(quiz)
+    layout = _Layout(key)
+    sums = cache.get(_cache_key(quiz.pk))
+    if sums is None or sums['version'] != quiz.key_version:
+        sums = layout.empty(quiz.key_version)
+
+    new = _new_attempts(quiz, attempts, sums['last_attempt'])
+    if new:
+        learner_ids = [learner_id for _, learner_id in new]
+        rows = list(LearnerAnswer.objects.filter(student_id__in=learner_ids, answer_id__in=key.answer_ids)
+                    .values_list('student_id', 'answer_id'))
+        layout.add(sums, learner_ids, rows)
+        sums['last_attempt'] = max(pk for pk, _ in new)
+        cache.set(_cache_key(quiz.pk), sums, CACHE_TIMEOUT)
+
+    difficulty, discrimination = layout.statistics(sums)
+    n = sums['n']
+    items = []
+    column = 0
+    for index, (question, answers) in enumerate(key.questions):
+        options = []
+        for answer in answers:
+            picked = sums['picks'][column]
+            options.append({
+                'answer': answer,
+                'is_correct': answer.pk in key.correct_ids,
+                'picks': picked,
+                'share': picked / n if n else None,
+            })
+            column += 1
+        p, r = difficulty[index], discrimination[index]
+        items.append({
+            'question': question,
+            'difficulty': p,
+            'discrimination': r,
+            'answers': options,
+            'flagged': p is not None and (not MIN_DIFFICULTY <= p <= MAX_DIFFICULTY
+                                          or (r is not None and r < MIN_DISCRIMINATION)),
+        })
+    return items
+
+
+@receiver(post_delete, sender=TakenQuiz)
+def attempt_deleted(sender, instance, **kwargs):
+    # The sums cannot subtract an attempt whose answers may be gone; start over
+    cache.delete(_cache_key(instance.quiz_id))
@@ -0,0 +1,118 @@
+"""
+A small database-backed job queue with Celery's calling convention.
+
+    @task(priority=5)
+    def delete_files(names): ...
+
+    delete_files.delay(['notes/files/a.pdf'])                  # enqueue
+    delete_files.apply_async(args=(names,), countdown=60)      # later
+    delete_files(names)                                         # run inline
+
+Jobs are rows of ``Job``, so enqueueing inside a request's transaction only
+becomes visible to workers once it commits. ``python manage.py run_worker``
+claims them highest priority first, runs I/O-bound tasks on a thread pool
+and ``process=True`` tasks on a process pool, and retries failures with
+exponential backoff. A claimed job stays invisible for the task's
+``visibility_timeout``; if its worker dies it is claimed again after that,
+so tasks must be safe to run twice.
+
+With ``JOBS_EAGER = True`` (like Celery's ``task_always_eager``) tasks run
+inline when enqueued, for tests and one-off scripts.
+"""
+from datetime import timedelta
+import logging
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Task name -> Task, filled in as modules defining tasks are imported
+registry = {}
+
+
+class Task:
+
+    def __init__(self, func, name=None, priority=0, max_retries=3, retry_backoff=10,
+                 visibility_timeout=300, process=False):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__name__}'
+        self.priority = priority
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.visibility_timeout = visibility_timeout
+        self.process = process
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=None, eta=None, priority=None):
+        """Queue the task; ``args`` and ``kwargs`` must be JSON serializable."""
+        if getattr(settings, 'JOBS_EAGER', False):
+            self.func(*args, **(kwargs or {}))
+            return None
+        visible_at = eta or timezone.now() + timedelta(seconds=countdown or 0)
+        return Job.objects.create(name=self.name, args=list(args), kwargs=kwargs or {},
+                                  priority=self.priority if priority is None else priority, visible_at=visible_at)
+
+
+def task(func=None, **options):
+    """Register ``func`` as a task; usable bare (``@task``) or with options (``@task(process=True)``)."""
+    def register(func):
+        registered = Task(func, **options)
+        registry[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def claim(names, limit):
+    """Mark up to ``limit`` visible jobs of the given tasks as running for this worker and return them."""
+    now = timezone.now()
+    candidates = list(Job.objects.filter(state__in=[Job.QUEUED, Job.RUNNING], visible_at__lte=now, name__in=names)
+                      .order_by('-priority', 'visible_at').values_list('pk', 'name')[:limit])
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        for pk, name in candidates:
+            # Compare-and-set: a job another worker took in between no longer matches visible_at__lte
+            Job.objects.filter(pk=pk, state__in=[Job.QUEUED, Job.RUNNING], visible_at__lte=now).update(
+                state=Job.RUNNING, token=token, attempts=F('attempts') + 1,
+                visible_at=now + timedelta(seconds=registry[name].visibility_timeout))
+    return list(Job.objects.filter(token=token, state=Job.RUNNING).order_by('-priority', 'created_at'))
+
+
+def execute(name, args, kwargs):
+    # Module level so the process pool can pickle it
+    registry[name].func(*args, **kwargs)
+
+
+def succeeded(job):
+    Job.objects.filter(pk=job.pk, token=job.token).delete()
+
+
+def failed(job, error):
+    """Queue ``job`` again after a backoff, or mark it failed once it is out of retries."""
+    message = ''.join(traceback.format_exception(error)) if isinstance(error, BaseException) else str(error)
+    task = registry.get(job.name)
+    jobs = Job.objects.filter(pk=job.pk, token=job.token)
+    if task is not None and job.attempts <= task.max_retries:
+        delay = task.retry_backoff * 2 ** (job.attempts - 1)
+        jobs.update(state=Job.QUEUED, last_error=message, visible_at=timezone.now() + timedelta(seconds=delay))
+        logger.warning('Job %s (%s) failed, retrying in %ss', job.pk, job.name, delay)
+    else:
+        jobs.update(state=Job.FAILED, last_error=message)
+        logger.error('Job %s (%s) failed for good after %s attempts', job.pk, job.name, job.attempts)
@@ -0,0 +1,169 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from learning.models import Quiz, User
+
+MODES = {'wsgi': 'False', 'asgi': 'True'}
+
+
+def _pages(instructor, admin):
+    quiz = Quiz.objects.filter(owner=instructor).annotate(attempts=Count('taken_quizzes')).order_by('-attempts').first()
+    pages = [('instructor', instructor, reverse('instructor'))]
+    if quiz is not None:
+        pages.append(('quiz_results', instructor, reverse('quiz_results', args=[quiz.pk])))
+    if admin is not None:
+        pages.append(('dashboard', admin, reverse('dashboard')))
+    return pages
+
+
+def _summary(latencies, wall, errors):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'wall': wall,
+        'median': statistics.median(latencies),
+        'p95': statistics.quantiles(latencies, n=100, method='inclusive')[94] if len(latencies) > 1 else latencies[0],
+    }
+
+
+class WSGIRun:
+    """Requests through Django's WSGI handler; concurrent ones on threads, as a threaded WSGI server runs them."""
+
+    def client(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def run(self, user, path, requests, concurrency):
+        clients = [self.client(user) for _ in range(concurrency)]
+        clients[0].get(path)  # warm up
+
+        def batch(client, count):
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                status = client.get(path).status_code
+                timings.append((time.perf_counter() - started, status))
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            batches = pool.map(batch, clients, _split(requests, concurrency))
+            timings = [timing for timings in batches for timing in timings]
+        return timings, time.perf_counter() - started
+
+
+class ASGIRun:
+    """Requests through Django's ASGI handler on one event loop, as an ASGI server runs them."""
+
+    def run(self, user, path, requests, concurrency):
+        return asyncio.run(self._run(user, path, requests, concurrency))
+
+    async def _run(self, user, path, requests, concurrency):
+        clients = []
+        for _ in range(concurrency):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+        await clients[0].get(path)  # warm up
+
+        async def batch(client, count):
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                status = (await client.get(path)).status_code
+                timings.append((time.perf_counter() - started, status))
+            return timings
+
+        started = time.perf_counter()
+        batches = await asyncio.gather(*(batch(client, count)
+                                         for client, count in zip(clients, _split(requests, concurrency))))
+        timings = [timing for timings in batches for timing in timings]
+        return timings, time.perf_counter() - started
+
+
+def _split(requests, workers):
+    return [requests // workers + (1 if n < requests % workers else 0) for n in range(workers)]
+
+
+class Command(BaseCommand):
+    help = ('Compare wall-clock time of the dashboards (instructor home, quiz results, admin dashboard) '
+            'served by the sync views through the WSGI handler and by the async views through the ASGI handler.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instructor', help='Username to load the instructor pages as; '
+                                                 'defaults to the instructor with the most quizzes.')
+        parser.add_argument('--admin', help='Username to load the admin dashboard as; defaults to the first admin.')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per page and concurrency level.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8],
+                            help='Simultaneous clients; 1 measures one request at a time.')
+        parser.add_argument('--mode', choices=sorted(MODES), help='Run only this mode and print JSON (internal).')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self._measure(options)))
+            return
+        # Each mode runs in a process of its own: ASYNC_VIEWS decides the URLconf when it is imported
+        results = {}
+        for mode, async_views in MODES.items():
+            command = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_dashboards',
+                       '--mode', mode, '--requests', str(options['requests']),
+                       '--concurrency', *map(str, options['concurrency'])]
+            for name in ('instructor', 'admin'):
+                if options[name]:
+                    command += ['--' + name, options[name]]
+            child = subprocess.run(command, env=dict(os.environ, ASYNC_VIEWS=async_views),
+                                   capture_output=True, text=True)
+            if child.returncode:
+                raise CommandError('%s run failed:\n%s' % (mode, child.stderr))
+            results[mode] = json.loads(child.stdout.strip().splitlines()[-1])
+        self._report(results)
+
+    def _user(self, username, default):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError('No user named %r' % username)
+        return default
+
+    def _measure(self, options):
+        instructor = self._user(options['instructor'], User.objects.filter(is_instructor=True)
+                                .annotate(quizzes_owned=Count('quizzes')).order_by('-quizzes_owned').first())
+        admin = self._user(options['admin'], User.objects.filter(is_admin=True).first()
+                           or User.objects.filter(is_superuser=True).first())
+        if instructor is None:
+            raise CommandError('No instructor to load the dashboards as; run generate_dataset first.')
+        # The test clients call the handlers in this process, under the host name they always send
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        runner = (ASGIRun if options['mode'] == 'asgi' else WSGIRun)()
+        results = {}
+        for name, user, path in _pages(instructor, admin):
+            for concurrency in options['concurrency']:
+                timings, wall = runner.run(user, path, options['requests'], concurrency)
+                errors = sum(1 for _, status in timings if status != 200)
+                results['%s %d' % (name, concurrency)] = _summary([duration for duration, _ in timings], wall, errors)
+        return results
+
+    def _report(self, results):
+        self.stdout.write(f'{"page":<14}{"clients":>8}{"server":>8}{"wall s":>9}{"req/s":>9}'
+                          f'{"median ms":>11}{"p95 ms":>9}{"errors":>8}')
+        for key in results['wsgi']:
+            name, concurrency = key.rsplit(' ', 1)
+            for mode in MODES:
+                row = results[mode][key]
+                self.stdout.write(f'{name:<14}{concurrency:>8}{mode:>8}{row["wall"]:>9.2f}'
+                                  f'{row["requests"] / row["wall"]:>9.1f}{row["median"] * 1000:>11.1f}'
+                                  f'{row["p95"] * 1000:>9.1f}{row["errors"]:>8}')
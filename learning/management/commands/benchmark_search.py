@@ -0,0 +1,111 @@
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from learning.search import CREATE_TABLE, SET_RANK, TABLE, match_query, search_sql
+
+TITLE_WORDS = 5
+BODY_WORDS = 40
+LIMIT = 30
+
+
+def _vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return 'p50 %.2f ms  p95 %.2f ms  p99 %.2f ms  max %.2f ms' % (
+        pick(0.50), pick(0.95), pick(0.99), samples[-1] * 1000)
+
+
+class Command(BaseCommand):
+    help = ('Compare the FTS5 search index with LIKE scans on a synthetic corpus in a scratch database '
+            '(never the real one).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1000000)
+        parser.add_argument('--vocabulary', type=int, default=50000, help='Distinct words in the corpus.')
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--interests', type=int, default=5, help='Courses each searching learner follows.')
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--like-queries', type=int, default=10,
+                            help='LIKE queries to time; each one reads the whole table.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = _vocabulary(options['vocabulary'], rng)
+        # Zipf-like: the n-th most common word turns up about 1/n as often as the first
+        weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'search.sqlite3')
+            connection = sqlite3.connect(path, isolation_level=None)
+            self._load(connection, words, weights, rng, options)
+            self.stdout.write('Database: %.0f MB' % (os.path.getsize(path) / 1024 / 1024))
+            self._run(connection, words, rng, options)
+            connection.close()
+
+    def _load(self, connection, words, weights, rng, options):
+        connection.execute(CREATE_TABLE)
+        connection.execute(SET_RANK)
+        connection.execute('CREATE TABLE document (id INTEGER PRIMARY KEY, title TEXT, body TEXT, course_id INTEGER)')
+        started = time.perf_counter()
+        batch = 10000
+        for first in range(0, options['documents'], batch):
+            rows = []
+            for n in range(first, min(first + batch, options['documents'])):
+                text = rng.choices(words, cum_weights=weights, k=TITLE_WORDS + BODY_WORDS)
+                # Like announcements, one document in twenty belongs to no course
+                course_id = None if n % 20 == 0 else rng.randrange(options['courses'])
+                rows.append((n + 1, ' '.join(text[:TITLE_WORDS]), ' '.join(text[TITLE_WORDS:]), course_id))
+            connection.execute('BEGIN')
+            connection.executemany(f'INSERT INTO {TABLE} (rowid, title, body, course_id) VALUES (?, ?, ?, ?)', rows)
+            connection.executemany('INSERT INTO document VALUES (?, ?, ?, ?)', rows)
+            connection.execute('COMMIT')
+        connection.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        self.stdout.write('Loaded %d documents in %.1f s' % (options['documents'], time.perf_counter() - started))
+
+    def _run(self, connection, words, rng, options):
+        interests = rng.sample(range(options['courses']), min(options['interests'], options['courses']))
+        sql = search_sql(len(interests)).replace('%s', '?')
+        # Mid-frequency words, as people search for topics rather than for "the"
+        candidates = words[50:5000]
+        fts, like, hits = [], [], []
+        for n in range(options['queries']):
+            terms = rng.sample(candidates, rng.choice((1, 1, 2)))
+            if n % 3 == 0:
+                # Search-as-you-type: the last word is still being typed
+                terms[-1] = terms[-1][:max(3, len(terms[-1]) - 2)]
+            started = time.perf_counter()
+            rows = connection.execute(sql, ['[', ']', '...', 16, match_query(' '.join(terms)), *interests,
+                                            LIMIT]).fetchall()
+            fts.append(time.perf_counter() - started)
+            hits.append(len(rows))
+
+            if n < options['like_queries']:
+                placeholders = ', '.join('?' * len(interests))
+                started = time.perf_counter()
+                connection.execute(
+                    f'SELECT id, title FROM document WHERE (title LIKE ? OR body LIKE ?) '
+                    f'AND (course_id IS NULL OR course_id IN ({placeholders})) LIMIT ?',
+                    ['%' + terms[0] + '%', '%' + terms[0] + '%', *interests, LIMIT]).fetchall()
+                like.append(time.perf_counter() - started)
+
+        self.stdout.write(self.style.SUCCESS(
+            'FTS5 ranked (%d queries, %.1f results on average): %s' % (len(fts), statistics.mean(hits),
+                                                                        _percentiles(fts))))
+        if like:
+            self.stdout.write(self.style.SUCCESS(
+                'LIKE unranked (%d queries): %s' % (len(like), _percentiles(like))))
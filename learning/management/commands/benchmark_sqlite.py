@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from learning.db import PRODUCTION_PRAGMAS
+
+# Python's sqlite3 defaults, which is what Django runs with unless SQLITE_PRODUCTION is set
+DEFAULT_PRAGMAS = {}
+
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute('PRAGMA %s = %s' % (name, value))
+    return connection
+
+
+def _worker(path, pragmas, role, deadline, results):
+    # Readers run the notification query; writers post rows one autocommit INSERT at a time, like Django
+    connection = _connect(path, pragmas)
+    done = errors = 0
+    latencies = []
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                connection.execute(
+                    'SELECT id, content FROM announcement WHERE posted_at > ? ORDER BY posted_at DESC LIMIT 10',
+                    (time.time() - 60,)).fetchall()
+            else:
+                connection.execute('INSERT INTO announcement (user_id, content, posted_at) VALUES (?, ?, ?)',
+                                   (1, 'benchmark', time.time()))
+            done += 1
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    results.put((role, done, errors, max(latencies, default=0)))
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent SQLite read/write throughput with the default and the production pragmas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--rows', type=int, default=100000, help='Rows preloaded into the benchmark table.')
+
+    def handle(self, *args, **options):
+        # A scratch database, so the benchmark never writes to the real one
+        with tempfile.TemporaryDirectory() as directory:
+            for label, pragmas in (('default', DEFAULT_PRAGMAS), ('production', PRODUCTION_PRAGMAS)):
+                path = os.path.join(directory, f'{label}.sqlite3')
+                self._prepare(path, pragmas, options['rows'])
+                self._report(label, self._run(path, pragmas, options), options['duration'])
+
+    def _prepare(self, path, pragmas, rows):
+        connection = _connect(path, pragmas)
+        connection.execute('CREATE TABLE announcement (id INTEGER PRIMARY KEY, user_id INTEGER, '
+                           'content TEXT, posted_at REAL)')
+        connection.execute('CREATE INDEX announcement_posted_at ON announcement (posted_at)')
+        now = time.time()
+        connection.execute('BEGIN')
+        connection.executemany('INSERT INTO announcement (user_id, content, posted_at) VALUES (?, ?, ?)',
+                               ((n % 50, 'seed', now - n) for n in range(rows)))
+        connection.execute('COMMIT')
+        connection.close()
+
+    def _run(self, path, pragmas, options):
+        results = multiprocessing.Queue()
+        deadline = time.time() + options['duration']
+        roles = ['read'] * options['readers'] + ['write'] * options['writers']
+        workers = [multiprocessing.Process(target=_worker, args=(path, pragmas, role, deadline, results))
+                   for role in roles]
+        for worker in workers:
+            worker.start()
+        totals = {}
+        for _ in workers:
+            role, done, errors, slowest = results.get()
+            total = totals.setdefault(role, [0, 0, 0])
+            total[0] += done
+            total[1] += errors
+            total[2] = max(total[2], slowest)
+        for worker in workers:
+            worker.join()
+        return totals
+
+    def _report(self, label, totals, duration):
+        for role in ('read', 'write'):
+            done, errors, slowest = totals.get(role, (0, 0, 0))
+            self.stdout.write(f'{label:<11} {role:<6} {done / duration:>10.0f} ops/s '
+                              f'{errors:>6} locked errors   slowest {slowest * 1000:.0f} ms')
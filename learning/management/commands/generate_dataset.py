@@ -0,0 +1,158 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from learning import rollups, search
+from learning.models import (Announcement, Answer, Course, Instructor, Learner, LearnerAnswer, Question, Quiz,
+                             TakenQuiz, User)
+
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic dataset for load testing, e.g. '
+            '--learners 100000 --quizzes 5000 --questions-per-quiz 10 --attempts-per-learner 10 '
+            'for roughly 10M learner answers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='load', help='Prefix of every generated username and course name.')
+        parser.add_argument('--password', default='password', help='Password shared by every generated user.')
+        parser.add_argument('--courses', type=int, default=20)
+        parser.add_argument('--instructors', type=int, default=50)
+        parser.add_argument('--learners', type=int, default=1000)
+        parser.add_argument('--quizzes', type=int, default=100)
+        parser.add_argument('--questions-per-quiz', type=int, default=10)
+        parser.add_argument('--answers-per-question', type=int, default=4)
+        parser.add_argument('--attempts-per-learner', type=int, default=5,
+                            help='Quizzes each learner has already taken, answering every question.')
+        parser.add_argument('--announcements', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild the rollup tables afterwards (run rebuild_rollups yourself).')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users prefixed "{prefix}-" already exist; pick another --prefix.')
+        if options['instructors'] < 1 or options['courses'] < 1:
+            raise CommandError('At least one instructor and one course are needed.')
+        started = time.monotonic()
+
+        # Hashing is deliberately slow; every generated user shares one precomputed hash
+        password = make_password(options['password'])
+
+        courses = Course.objects.bulk_create([
+            Course(name=f'{prefix} course {i}'[:30]) for i in range(options['courses'])
+        ])
+        instructors = self._create_users('instructor', 0, options['instructors'], password, is_instructor=True)
+        Instructor.objects.bulk_create([Instructor(user=user) for user in instructors], batch_size=self.batch_size)
+        self._log(f'{len(courses)} courses, {len(instructors)} instructors')
+
+        quizzes = self._create_quizzes(instructors, courses)
+        self._log(f'{len(quizzes)} quizzes')
+
+        Announcement.objects.bulk_create([
+            Announcement(user=self.rng.choice(instructors), content=f'Announcement {i}')
+            for i in range(options['announcements'])
+        ], batch_size=self.batch_size)
+
+        learner_count = self._create_learners(password, courses, quizzes)
+        self._log(f'{learner_count} learners')
+
+        # bulk_create skips the signals that maintain the rollups
+        if options['skip_rollups']:
+            self.stdout.write('Skipped rollups; run "python manage.py rebuild_rollups" before load testing.')
+        else:
+            rollups.rebuild_all()
+            self._log('rollups rebuilt')
+        # ...and the search index
+        self._log(f'{search.rebuild()} documents indexed for search')
+        self.stdout.write(self.style.SUCCESS(f'Generated dataset in {time.monotonic() - started:.1f}s'))
+
+    def _log(self, message):
+        self.stdout.write(f'  {message}')
+
+    def _create_users(self, role, start, stop, password, **flags):
+        prefix = self.options['prefix']
+        now = timezone.now()
+        return User.objects.bulk_create([
+            User(username=f'{prefix}-{role}-{i}', password=password, email=f'{prefix}-{role}-{i}@example.com',
+                 first_name=role.title(), last_name=str(i),
+                 date_joined=now - timedelta(days=self.rng.randint(0, 365)), **flags)
+            for i in range(start, stop)
+        ], batch_size=self.batch_size)
+
+    def _create_quizzes(self, instructors, courses):
+        """Create the quizzes with their questions and answers.
+
+        Returns ``(quiz, course_id, [(answer_ids, correct_id), ...])`` per quiz.
+        """
+        options = self.options
+        with transaction.atomic():
+            quizzes = Quiz.objects.bulk_create([
+                Quiz(owner=instructors[i % len(instructors)], name=f'Quiz {i}', course=self.rng.choice(courses))
+                for i in range(options['quizzes'])
+            ], batch_size=self.batch_size)
+            questions = Question.objects.bulk_create([
+                Question(quiz=quiz, text=f'Question {q}')
+                for quiz in quizzes for q in range(options['questions_per_quiz'])
+            ], batch_size=self.batch_size)
+            answers = Answer.objects.bulk_create([
+                Answer(question=question, text=f'Answer {a}', is_correct=a == 0)
+                for question in questions for a in range(options['answers_per_question'])
+            ], batch_size=self.batch_size)
+
+        keys = {quiz.pk: [] for quiz in quizzes}
+        per_question = options['answers_per_question']
+        for n, question in enumerate(questions):
+            answer_ids = [answer.pk for answer in answers[n * per_question:(n + 1) * per_question]]
+            keys[question.quiz_id].append((answer_ids, answer_ids[0]))
+        return [(quiz, quiz.course_id, keys[quiz.pk]) for quiz in quizzes]
+
+    def _create_learners(self, password, courses, quizzes):
+        options = self.options
+        quizzes_by_course = {}
+        for quiz in quizzes:
+            quizzes_by_course.setdefault(quiz[1], []).append(quiz)
+        course_ids = [course.pk for course in courses]
+        total = options['learners']
+
+        # Batches of learners are written with their interests, attempts and answers
+        # so memory stays flat however many LearnerAnswer rows are generated
+        chunk = max(1, self.batch_size // max(1, options['attempts_per_learner'] * options['questions_per_quiz']))
+        for start in range(0, total, chunk):
+            with transaction.atomic():
+                users = self._create_users('learner', start, min(start + chunk, total), password, is_learner=True)
+                learners = Learner.objects.bulk_create([Learner(user=user) for user in users])
+                self._fill_learners(learners, course_ids, quizzes_by_course)
+            if start // chunk % 20 == 0:
+                self._log(f'{min(start + chunk, total)}/{total} learners')
+        return total
+
+    def _fill_learners(self, learners, course_ids, quizzes_by_course):
+        rng = self.rng
+        interests, taken, answers = [], [], []
+        for learner in learners:
+            chosen = rng.sample(course_ids, min(len(course_ids), rng.randint(1, 3)))
+            interests += [Learner.interests.through(learner_id=learner.pk, course_id=course_id)
+                          for course_id in chosen]
+            available = [quiz for course_id in chosen for quiz in quizzes_by_course.get(course_id, ())]
+            for quiz, _, key in rng.sample(available, min(len(available), self.options['attempts_per_learner'])):
+                correct = 0
+                for answer_ids, correct_id in key:
+                    # Better than chance, so scores spread out instead of clustering
+                    answer_id = correct_id if rng.random() < 0.6 else rng.choice(answer_ids)
+                    correct += answer_id == correct_id
+                    answers.append(LearnerAnswer(student_id=learner.pk, answer_id=answer_id))
+                score = round(correct / len(key) * 100.0, 2) if key else 0.0
+                taken.append(TakenQuiz(learner_id=learner.pk, quiz=quiz, score=score))
+        Learner.interests.through.objects.bulk_create(interests, batch_size=self.batch_size)
+        TakenQuiz.objects.bulk_create(taken, batch_size=self.batch_size)
+        LearnerAnswer.objects.bulk_create(answers, batch_size=self.batch_size)
@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+
+import django
+from django.core.management.base import BaseCommand
+
+from learning import fragments
+from learning.images import DERIVATIVES, generate, is_stale
+
+
+def _generate(name, widths):
+    # Runs in a worker process; errors are reported rather than stopping the pool
+    try:
+        return name, len(generate(name, widths)), None
+    except Exception as error:
+        return name, 0, f'{error.__class__.__name__}: {error}'
+
+
+class Command(BaseCommand):
+    help = ('Generate the WebP/JPEG derivatives of existing tutorial thumbnails, note covers and avatars '
+            'in parallel. Only images whose derivatives are missing or stale are processed unless --force.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes.')
+        parser.add_argument('--force', action='store_true', help='Regenerate even up-to-date derivatives.')
+
+    def handle(self, *args, **options):
+        # An image shared by many rows (e.g. the default avatar) is processed once
+        pending = {}
+        kinds = {}
+        for (model, field), widths in DERIVATIVES.items():
+            names = (model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                     .values_list(field, flat=True).distinct().iterator())
+            for name in names:
+                if options['force'] or is_stale(name, widths):
+                    pending[name] = widths
+                    kinds.setdefault(name, set()).add(fragments.VERSIONED[model])
+        if not pending:
+            self.stdout.write('All derivatives are up to date.')
+            return
+
+        written = failed = 0
+        refreshed = set()
+        # Decoding and resizing is CPU bound, so processes rather than threads
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = [pool.submit(_generate, name, widths) for name, widths in pending.items()]
+            for future in as_completed(futures):
+                name, count, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                else:
+                    refreshed |= kinds[name]
+                written += count
+        # Cached fragments showing these images were rendered with the plain originals
+        for kind in refreshed:
+            fragments.bump(kind)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(pending) - failed} of {len(pending)} images processed, {written} files written.'))
@@ -0,0 +1,60 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from learning import account_import
+from learning.models import AccountImport
+
+
+class Command(BaseCommand):
+    help = ('Create learner or instructor accounts in bulk from a CSV or JSONL file, hashing passwords in '
+            'parallel. Rows that fail validation go to stderr and to the import\'s error report; an '
+            'interrupted import carries on where it stopped with --resume.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='The .csv or .jsonl file to import.')
+        parser.add_argument('--role', choices=[role for role, _ in AccountImport.ROLES], default='learner',
+                            help='Role of rows without a role column.')
+        parser.add_argument('--resume', type=int, metavar='ID', help='Carry on with an earlier import.')
+        parser.add_argument('--workers', type=int, default=settings.ACCOUNT_IMPORT_WORKERS,
+                            help='Password hashing processes.')
+        parser.add_argument('--chunk-size', type=int, default=account_import.CHUNK_SIZE,
+                            help='Records per transaction.')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            pending = AccountImport.objects.filter(pk=options['resume']).first()
+            if pending is None:
+                raise CommandError(f'No import {options["resume"]}.')
+            if pending.state == AccountImport.DONE:
+                raise CommandError(f'Import {pending.pk} is already done.')
+        elif options['path']:
+            path = os.path.abspath(options['path'])
+            if not os.path.isfile(path):
+                raise CommandError(f'{path} does not exist.')
+            try:
+                account_import.check_format(path)
+            except ValueError as error:
+                raise CommandError(error)
+            pending = AccountImport.objects.create(name=os.path.basename(path), source=path, role=options['role'])
+        else:
+            raise CommandError('Give a file to import, or --resume ID.')
+
+        self.stdout.write(f'Import {pending.pk}: {pending.name}, from row {pending.rows_done + 1}')
+        created = pending.created_count
+        try:
+            for progress in account_import.run(pending, workers=options['workers'], chunk_size=options['chunk_size']):
+                for number, username, error in progress.errors:
+                    self.stderr.write(f'row {number} ({username or "no username"}): {error}')
+                created += progress.created
+                self.stdout.write(f'{progress.rows_done} rows read, {created} accounts created')
+        except account_import.Superseded:
+            raise CommandError(f'Import {pending.pk} is being run elsewhere.')
+        except ValueError as error:
+            raise CommandError(f'{error}; fix the file and run with --resume {pending.pk}.')
+
+        pending.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f'{pending.created_count} accounts created, {pending.error_count} rows rejected '
+            f'(report: {account_import.report_path(pending)}).'))
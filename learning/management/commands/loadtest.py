@@ -0,0 +1,190 @@
+import http.cookiejar
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404, resolve
+
+from learning.models import User
+
+QUIZ_LINK = re.compile(r'href="/quiz/(\d+)/"')
+ANSWER_INPUT = re.compile(r'<input type="radio"[^>]*name="([\w-]*answer)" value="(\d+)"')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Each hop is timed on its own, under its own URL name
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """One simulated browser: a cookie jar plus the timings of every request it made."""
+
+    def __init__(self, base_url, samples):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        self.samples = samples
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, path, data=None, follow=True):
+        """GET (or POST when ``data`` is given) ``path``; returns ``(status, body, path)`` of the last hop."""
+        while True:
+            body = None
+            if data is not None:
+                body = urllib.parse.urlencode(dict(data, csrfmiddlewaretoken=self.csrf_token())).encode()
+            started = time.perf_counter()
+            try:
+                with self.opener.open(self.base_url + path, body, timeout=60) as response:
+                    status, content, location = response.status, response.read(), None
+            except urllib.error.HTTPError as error:
+                status, content, location = error.code, error.read(), error.headers.get('Location')
+            except OSError:
+                status, content, location = 0, b'', None
+            self.samples.append((_url_name(path), time.perf_counter() - started, 0 < status < 400))
+            if not (follow and location and 300 <= status < 400):
+                return status, content.decode('utf-8', 'replace'), path
+            path, data = urllib.parse.urlsplit(location).path, None
+
+
+def _url_name(path):
+    try:
+        return resolve(path).url_name or path
+    except Resolver404:
+        return path
+
+
+def _percentile(durations, percent):
+    if len(durations) == 1:
+        return durations[0]
+    return statistics.quantiles(durations, n=100, method='inclusive')[percent - 1]
+
+
+class Command(BaseCommand):
+    help = ('Drive concurrent learner and instructor sessions against a running server (e.g. gunicorn) '
+            'and report throughput and latency percentiles per URL name.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--prefix', default='load', help='Username prefix used by generate_dataset.')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--workers', type=int, default=20, help='Concurrent sessions.')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to keep starting new sessions.')
+        parser.add_argument('--instructor-share', type=float, default=0.1,
+                            help='Fraction of sessions that log in as an instructor.')
+        parser.add_argument('--polls', type=int, default=3, help='Notification polls per session.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--json', dest='json_path', help='Also write the report to this file for comparing runs.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        # A sample is plenty; the server sees a different user on most sessions either way
+        learners = list(User.objects.filter(username__startswith=f'{prefix}-learner-')
+                        .values_list('username', flat=True)[:10000])
+        instructors = list(User.objects.filter(username__startswith=f'{prefix}-instructor-')
+                           .values_list('username', flat=True)[:1000])
+        if not learners or not instructors:
+            raise CommandError(f'No "{prefix}-" users found; run generate_dataset first.')
+        self.options = options
+
+        samples = []
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            threading.Thread(target=self._work, args=(deadline, learners, instructors, samples,
+                                                      random.Random(None if options['seed'] is None
+                                                                    else options['seed'] + n)))
+            for n in range(options['workers'])
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report = self._report(samples, time.monotonic() - started)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def _work(self, deadline, learners, instructors, samples, rng):
+        local = []
+        while time.monotonic() < deadline:
+            session = Session(self.options['base_url'], local)
+            if rng.random() < self.options['instructor_share']:
+                if self._login(session, rng.choice(instructors)):
+                    self._instructor_session(session)
+            elif self._login(session, rng.choice(learners)):
+                self._learner_session(session, rng)
+            session.request('/logout/')
+        samples.extend(local)
+
+    def _login(self, session, username):
+        session.request('/login_form/')
+        status, _, path = session.request('/login/', {'username': username, 'password': self.options['password']})
+        return status == 200 and path != '/login_form/'
+
+    def _poll(self, session):
+        session.request('/notifications/')
+
+    def _instructor_session(self, session):
+        for _ in range(self.options['polls']):
+            session.request('/instructor/')
+            self._poll(session)
+
+    def _learner_session(self, session, rng):
+        self._poll(session)
+        _, body, _ = session.request('/learner_quiz/')
+        quiz_ids = QUIZ_LINK.findall(body)
+        if not quiz_ids:
+            return
+        path = '/quiz/%s/' % rng.choice(quiz_ids)
+        # Step-by-step quizzes take one POST per question, single-page ones a single POST
+        for step in range(100):
+            status, body, current = session.request(path)
+            if status != 200 or current != path:
+                return
+            choices = {}
+            for name, value in ANSWER_INPUT.findall(body):
+                choices.setdefault(name, []).append(value)
+            if not choices:
+                return
+            _, _, current = session.request(path, {name: rng.choice(values) for name, values in choices.items()})
+            if current != path:
+                # Redirected to the quiz list: the attempt is finished
+                return
+            if step < self.options['polls']:
+                self._poll(session)
+
+    def _report(self, samples, elapsed):
+        by_name = {}
+        for name, duration, ok in samples:
+            by_name.setdefault(name, []).append((duration, ok))
+
+        report = {'elapsed': round(elapsed, 2), 'workers': self.options['workers'], 'urls': {}}
+        self.stdout.write(f"{'url name':<24}{'requests':>9}{'errors':>8}{'req/s':>9}"
+                          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name in sorted(by_name):
+            durations = sorted(duration for duration, _ in by_name[name])
+            row = {
+                'requests': len(durations),
+                'errors': sum(1 for _, ok in by_name[name] if not ok),
+                'throughput': round(len(durations) / elapsed, 2),
+                'p50': round(_percentile(durations, 50) * 1000, 1),
+                'p95': round(_percentile(durations, 95) * 1000, 1),
+                'p99': round(_percentile(durations, 99) * 1000, 1),
+            }
+            report['urls'][name] = row
+            self.stdout.write(f"{name:<24}{row['requests']:>9}{row['errors']:>8}{row['throughput']:>9}"
+                              f"{row['p50']:>9}{row['p95']:>9}{row['p99']:>9}")
+        total = len(samples)
+        self.stdout.write(self.style.SUCCESS(f'{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)'))
+        return report
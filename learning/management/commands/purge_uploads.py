@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from learning import uploads
+from learning.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Discard chunked uploads that have not moved for a while, freeing their partial files and blobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=24, help='Hours since the last chunk.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = Upload.objects.filter(updated_at__lt=cutoff).select_related('blob')
+        count = 0
+        for upload in stale.iterator():
+            uploads.discard(upload)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Discarded {count} uploads.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from learning import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the instructor dashboard rollup tables from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instructor', type=int, help='Only rebuild the rollups of this user id.')
+
+    def handle(self, *args, **options):
+        if options['instructor']:
+            rollups.refresh_instructor(options['instructor'])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for instructor {options['instructor']}"))
+            return
+        count = rollups.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {count} instructors'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from learning import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the tutorial, notes, announcement, quiz and question tables.'
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
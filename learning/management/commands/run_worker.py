@@ -0,0 +1,79 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import multiprocessing
+import os
+import signal
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from learning import jobs
+
+
+def _run_in_thread(name, args, kwargs):
+    try:
+        jobs.execute(name, args, kwargs)
+    finally:
+        # Connections are per thread; don't leave one open per pool thread
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs: I/O-bound tasks on a thread pool, process=True tasks on a process pool. '
+            'Stops claiming on SIGINT/SIGTERM and exits once running jobs finish.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--processes', type=int, default=os.cpu_count())
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is visible instead of polling.')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        thread_tasks = [name for name, task in jobs.registry.items() if not task.process]
+        process_tasks = [name for name, task in jobs.registry.items() if task.process]
+        threads = ThreadPoolExecutor(options['threads'], thread_name_prefix='job')
+        # Spawned, not forked, so children never inherit the parent's open database connection
+        processes = ProcessPoolExecutor(options['processes'], mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=django.setup)
+        running = {}
+        try:
+            while running or not self.stopping:
+                claimed = 0
+                if not self.stopping:
+                    for pool, runner, names, size in (
+                            (threads, _run_in_thread, thread_tasks, options['threads']),
+                            (processes, jobs.execute, process_tasks, options['processes'])):
+                        free = size - sum(1 for job in running.values() if job.name in names)
+                        if not names or free <= 0:
+                            continue
+                        for job in jobs.claim(names, free):
+                            running[pool.submit(runner, job.name, job.args, job.kwargs)] = job
+                            claimed += 1
+                if not running:
+                    if options['once'] and not claimed:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._settle(running.pop(future), future)
+        finally:
+            threads.shutdown()
+            processes.shutdown()
+
+    def _settle(self, job, future):
+        error = future.exception()
+        if error is None:
+            jobs.succeeded(job)
+            self.stdout.write(f'{job.name} #{job.pk} done')
+        else:
+            jobs.failed(job, error)
+            self.stderr.write(f'{job.name} #{job.pk} failed: {error!r}')
+
+    def _stop(self, signum, frame):
+        self.stopping = True
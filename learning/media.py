@@ -0,0 +1,175 @@
+"""
+Serving uploaded media (MEDIA_URL) to signed-in users.
+
+Every request is checked against the user's role, then answered with
+``ETag``/``Last-Modified`` validators and ``Accept-Ranges: bytes``, so
+browsers revalidate with a 304 and video players and PDF viewers fetch only
+the byte ranges they need. A single ``Range`` is honoured (guarded by
+``If-Range``); anything fancier gets the whole file, as RFC 9110 allows.
+
+With ``MEDIA_OFFLOAD`` set, the view only authorizes: it answers with an
+empty response carrying ``X-Accel-Redirect`` (nginx) or ``X-Sendfile``
+(Apache, lighttpd), and the front-end server sends the bytes, ranges and
+all, without tying up a Python worker. For nginx, map
+``MEDIA_OFFLOAD_PREFIX`` to MEDIA_ROOT in an ``internal`` location:
+
+    location /protected-media/ {
+        internal;
+        alias /srv/e-learning/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+OFFLOAD_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+# Content-addressed (see learning/uploads.py): a name never points at different bytes
+IMMUTABLE_PREFIXES = ('notes/blobs/',)
+
+_range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def can_read(user, name):
+    """Whether ``user`` may download the media file ``name``."""
+    return user.is_superuser or user.is_admin or user.is_instructor or user.is_learner
+
+
+def _path(name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def _etag(stat):
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    ``None`` to send the whole file, or ``False`` if the range cannot be
+    satisfied.
+    """
+    match = _range_re.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    # A date only validates a range if it is exactly the file's modification time
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _read(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _offload(name, content_type):
+    mode = settings.MEDIA_OFFLOAD.lower()
+    if mode not in OFFLOAD_HEADERS:
+        raise ValueError('MEDIA_OFFLOAD must be one of %s' % ', '.join(OFFLOAD_HEADERS))
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        target = settings.MEDIA_OFFLOAD_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        target = _path(name)
+    response[OFFLOAD_HEADERS[mode]] = target
+    return response
+
+
+def response(request, name):
+    """Answer a GET or HEAD for the media file ``name`` (relative to MEDIA_ROOT)."""
+    path = _path(name)
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    cache_control = ('private, max-age=31536000, immutable' if name.startswith(IMMUTABLE_PREFIXES)
+                     else 'private, no-cache')
+
+    if getattr(settings, 'MEDIA_OFFLOAD', None):
+        offloaded = _offload(name, content_type)
+        offloaded['Cache-Control'] = cache_control
+        return offloaded
+
+    stat = os.stat(path)
+    etag = _etag(stat)
+    size = stat.st_size
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control
+        return not_modified
+
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+    length = end - start + 1 if size else 0
+
+    if request.method == 'HEAD':
+        response = HttpResponse(status=status, content_type=content_type)
+    elif status == 200:
+        # Lets the WSGI server use sendfile() when it has a file wrapper
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response.block_size = settings.MEDIA_CHUNK_SIZE
+    else:
+        response = StreamingHttpResponse(_read(path, start, length, settings.MEDIA_CHUNK_SIZE),
+                                         status=status, content_type=content_type)
+    if status == 206:
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
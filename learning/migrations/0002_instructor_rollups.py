@@ -0,0 +1,120 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+import django.db.models.deletion
+import django.utils.timezone
+import learning.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySignups',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('learners', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InstructorStats',
+            fields=[
+                ('instructor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('quiz_count', models.PositiveIntegerField(default=0)),
+                ('tutorial_count', models.PositiveIntegerField(default=0)),
+                ('notes_count', models.PositiveIntegerField(default=0)),
+                ('announcement_count', models.PositiveIntegerField(default=0)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('quizzes_with_attempts', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('recent_attempts', models.JSONField(default=list)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notes',
+            name='cover',
+            field=models.ImageField(blank=True, null=True, upload_to=learning.models.notes_cover_path),
+        ),
+        migrations.AlterField(
+            model_name='notes',
+            name='file',
+            field=models.FileField(blank=True, null=True, upload_to=learning.models.notes_file_path),
+        ),
+        migrations.AlterField(
+            model_name='tutorial',
+            name='thumb',
+            field=models.ImageField(blank=True, null=True, upload_to=learning.models.tutorial_thumbnail_path),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, default='users/avatars/default_avatar.png', upload_to=learning.models.user_avatar_path),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='is_superuser',
+            field=models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status'),
+        ),
+        migrations.CreateModel(
+            name='InstructorCourseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quiz_count', models.PositiveIntegerField(default=0)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='learning.course')),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('instructor', 'course'), name='unique_instructor_course_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InstructorLearnerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('avg_score', models.FloatField(default=0)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learner_stats', to=settings.AUTH_USER_MODEL)),
+                ('learner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='learning.learner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['instructor', '-avg_score'], name='learner_stats_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('instructor', 'learner'), name='unique_instructor_learner_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0002_instructor_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='single_page',
+            field=models.BooleanField(default=False, help_text='Learners answer every question and submit them together instead of one question per page.', verbose_name='Show all questions on one page'),
+        ),
+    ]
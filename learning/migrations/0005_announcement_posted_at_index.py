@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_quiz_key_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcement',
+            name='posted_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+    ]
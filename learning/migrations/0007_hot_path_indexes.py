@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('learning', '0006_notification_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['user', '-posted_at'], name='announcement_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learneranswer',
+            index=models.Index(fields=['student', 'answer'], name='learner_answer_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='takenquiz',
+            index=models.Index(fields=['quiz', '-date'], name='taken_quiz_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='takenquiz',
+            index=models.Index(fields=['learner', 'quiz'], name='taken_quiz_learner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(fields=['-created_at'], name='tutorial_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(fields=['user', '-created_at'], name='tutorial_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_learner', 'date_joined'], name='user_learner_joined_idx'),
+        ),
+    ]
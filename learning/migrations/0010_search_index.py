@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# The same statements as learning/search.py, frozen here as migrations should be
+CREATE = ("CREATE VIRTUAL TABLE search_index USING fts5("
+          "title, body, course_id UNINDEXED, tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')")
+RANK = "INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+SOURCES = (
+    'SELECT id * 8 + 1, title, content, course_id FROM learning_tutorial',
+    "SELECT id * 8 + 2, title, '', course_id FROM learning_notes",
+    "SELECT id * 8 + 3, '', content, NULL FROM learning_announcement",
+    "SELECT id * 8 + 4, name, '', course_id FROM learning_quiz",
+    "SELECT q.id * 8 + 5, '', q.text, z.course_id FROM learning_question q JOIN learning_quiz z ON z.id = q.quiz_id",
+)
+
+
+def create_index(apps, schema_editor):
+    # FTS5 is SQLite only; on other databases search is switched off
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE)
+    schema_editor.execute(RANK)
+    for select in SOURCES:
+        schema_editor.execute('INSERT INTO search_index (rowid, title, body, course_id) ' + select)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0009_content_addressed_uploads'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutorial',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        # Existing tutorials count as last changed when they were created
+        migrations.RunSQL('UPDATE learning_tutorial SET updated_at = created_at', migrations.RunSQL.noop),
+    ]
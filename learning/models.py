@@ -4,6 +4,7 @@ from django.db import models
 from django.utils.html import escape, mark_safe
 from embed_video.fields import EmbedVideoField
 import os
+import uuid
 
 def user_avatar_path(instance, filename):
     # File will be uploaded to MEDIA_ROOT/users/avatars/<filename>
@@ -36,6 +37,12 @@ class User(AbstractUser):
     )
     last_announcements_check = models.DateTimeField(default=timezone.now)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Learner sign-ups per day (rollups.rebuild_signups), answered from the index alone
+            models.Index(fields=['is_learner', 'date_joined'], name='user_learner_joined_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # First save to generate ID if it's a new user
         if not self.pk:
@@ -50,11 +57,21 @@ class User(AbstractUser):
 class Announcement(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
-    posted_at = models.DateTimeField(auto_now=True, null=True)
+    posted_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-posted_at'], name='announcement_user_recent_idx'),
+        ]
 
     def __str__(self):
         return str(self.content)
 
+class NotificationCounter(models.Model):
+    # Denormalized unread badge count, maintained by learning.notifications
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
 class Course(models.Model):
     name = models.CharField(max_length=30)
     color = models.CharField(max_length=7, default='#007bff')
@@ -79,13 +96,23 @@ class Tutorial(models.Model):
     )
     course = models.ForeignKey(Course, on_delete=models.CASCADE, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     video = EmbedVideoField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='tutorial_recent_idx'),
+            models.Index(fields=['user', '-created_at'], name='tutorial_user_recent_idx'),
+        ]
+
     def delete(self, *args, **kwargs):
-        # Delete thumbnail file when tutorial is deleted
+        # Delete thumbnail file (and its resized copies) when tutorial is deleted
         if self.thumb:
-            self.thumb.delete()
+            from .images import delete_derivatives  # learning.images imports this module
+            delete_derivatives(self.thumb)
+            # No save: the row goes next, and saving it would only re-run the post_save receivers
+            self.thumb.delete(save=False)
         super().delete(*args, **kwargs)
 
 class Notes(models.Model):
@@ -109,17 +136,26 @@ class Notes(models.Model):
         return self.title
 
     def delete(self, *args, **kwargs):
-        # Delete files when notes is deleted
+        # Delete files when notes is deleted (no save: the row goes next)
         if self.file:
-            self.file.delete()
+            from .uploads import release  # learning.uploads imports this module
+            # Other notes may share the file; it goes with the last of them
+            release(self.file.name)
         if self.cover:
-            self.cover.delete()
+            from .images import delete_derivatives  # learning.images imports this module
+            delete_derivatives(self.cover)
+            self.cover.delete(save=False)
         super().delete(*args, **kwargs)    
 
 class Quiz(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quizzes')
     name = models.CharField(max_length=255)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='quizzes')
+    single_page = models.BooleanField(
+        'Show all questions on one page', default=False,
+        help_text='Learners answer every question and submit them together instead of one question per page.')
+    # Bumped by answer_keys.bump_version whenever questions or answers change
+    key_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -166,6 +202,151 @@ class TakenQuiz(models.Model):
     score = models.FloatField()
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Quiz results, newest first
+            models.Index(fields=['quiz', '-date'], name='taken_quiz_recent_idx'),
+            # "Has this learner taken this quiz?" and the quiz list's exclusion
+            models.Index(fields=['learner', 'quiz'], name='taken_quiz_learner_idx'),
+        ]
+
 class LearnerAnswer(models.Model):
     student = models.ForeignKey(Learner, on_delete=models.CASCADE, related_name='quiz_answers')
-    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='+')
\ No newline at end of file
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        indexes = [
+            # Scoring and resuming a quiz look up a learner's answers among one quiz's answer ids
+            models.Index(fields=['student', 'answer'], name='learner_answer_student_idx'),
+        ]
+
+class InstructorStats(models.Model):
+    # Rollup of an instructor's content and quiz attempts, kept current by learning.rollups
+    instructor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    quiz_count = models.PositiveIntegerField(default=0)
+    tutorial_count = models.PositiveIntegerField(default=0)
+    notes_count = models.PositiveIntegerField(default=0)
+    announcement_count = models.PositiveIntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    quizzes_with_attempts = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    # [[taken_quiz_id, score], ...] newest first, capped at rollups.RECENT_ATTEMPTS
+    recent_attempts = models.JSONField(default=list)
+
+    @property
+    def avg_score(self):
+        return self.score_sum / self.attempt_count if self.attempt_count else 0
+
+class InstructorCourseStats(models.Model):
+    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    quiz_count = models.PositiveIntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['instructor', 'course'], name='unique_instructor_course_stats'),
+        ]
+
+    @property
+    def avg_score(self):
+        return self.score_sum / self.attempt_count if self.attempt_count else 0
+
+class InstructorLearnerStats(models.Model):
+    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='learner_stats')
+    learner = models.ForeignKey(Learner, on_delete=models.CASCADE, related_name='+')
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    avg_score = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['instructor', 'learner'], name='unique_instructor_learner_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['instructor', '-avg_score'], name='learner_stats_top_idx'),
+        ]
+
+class DailySignups(models.Model):
+    # Learners joined per day, so growth figures never count over the User table
+    day = models.DateField(unique=True)
+    learners = models.PositiveIntegerField(default=0)
+
+class Job(models.Model):
+    # Background work queued by learning.jobs and run by the run_worker command
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)
+    state = models.CharField(max_length=10, choices=STATES, default=QUEUED)
+    # Not claimable before this: the countdown/retry delay while queued, the visibility timeout while running
+    visible_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Set by each claim, so a worker whose claim expired cannot settle the job another worker holds
+    token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'visible_at'], name='job_claim_idx',
+                         condition=models.Q(state__in=['queued', 'running'])),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.state})'
+
+class Blob(models.Model):
+    # A file stored once under its content hash (see learning.uploads), however many notes use it
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class Upload(models.Model):
+    # A chunked upload in progress; the partial file lives in CHUNKED_UPLOAD_DIR until it is complete
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class AccountImport(models.Model):
+    # A bulk import of accounts (see learning.account_import); rows_done is the checkpoint it resumes from
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+    ROLES = [('learner', 'Learner'), ('instructor', 'Instructor')]
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    name = models.CharField(max_length=255)
+    # The CSV or JSONL file; uploads are kept in ACCOUNT_IMPORT_DIR until the import is done
+    source = models.CharField(max_length=500)
+    role = models.CharField(max_length=10, choices=ROLES, default='learner')
+    state = models.CharField(max_length=10, choices=STATES, default=QUEUED)
+    rows_done = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.state})'
+
+class ContentVersion(models.Model):
+    # The version of one kind of content (see learning.fragments); in the database so every process sees a bump
+    kind = models.CharField(max_length=20, primary_key=True)
+    version = models.BigIntegerField()
@@ -0,0 +1,63 @@
+"""
+Announcement notifications for every role.
+
+The navbar badge reads a per-user ``NotificationCounter`` (a primary key
+lookup) instead of counting announcements. Posting an announcement bumps
+every counter with a single UPDATE and publishes it to the live stream;
+marking as read zeroes the counter and moves the user's read marker.
+"""
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import read_markers
+from .models import Announcement, NotificationCounter
+from .pubsub import publish_announcement
+
+RECENT_LIMIT = 10
+
+
+def unread_count(user):
+    unread = NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first()
+    if unread is not None:
+        return unread
+    # First visit since counters were introduced: seed it from the read marker once
+    unread = Announcement.objects.filter(posted_at__gt=read_markers.last_check(user)).exclude(user=user).count()
+    try:
+        with transaction.atomic():
+            NotificationCounter.objects.create(user=user, unread=unread)
+    except IntegrityError:
+        pass
+    return unread
+
+def recent_unread(user, limit=RECENT_LIMIT):
+    """The newest announcements posted since the user last marked them read."""
+    return list(Announcement.objects.filter(posted_at__gt=read_markers.last_check(user))
+                .exclude(user=user).order_by('-posted_at')
+                .values('id', 'user', 'content', 'posted_at')[:limit])
+
+def mark_all_read(user):
+    NotificationCounter.objects.filter(user=user).update(unread=0)
+    read_markers.mark_read(user, timezone.now())
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_posted(sender, instance, created, **kwargs):
+    if not created:
+        return
+    NotificationCounter.objects.exclude(user_id=instance.user_id).update(unread=F('unread') + 1)
+    transaction.on_commit(partial(publish_announcement, instance))
+
+
+def badge(request):
+    """Context processor: ``new_announcements_count`` for the dashboard navbars.
+
+    Passed as a callable so pages that never draw the badge never query it.
+    """
+    def count():
+        return unread_count(request.user) if request.user.is_authenticated else 0
+    return {'new_announcements_count': count}
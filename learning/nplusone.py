@@ -0,0 +1,186 @@
+"""
+N+1 query detection for development and tests.
+
+``QueryRepetitionMiddleware`` fingerprints every SQL statement a request
+runs: whitespace collapsed, literals and placeholders replaced by ``?`` and
+``IN (...)`` lists folded, so the same lookup for different rows has the
+same shape. A shape that runs more than ``NPLUSONE_THRESHOLD`` times in one
+request is almost always a lazy foreign key or reverse relation loaded per
+row, and is reported with the template line and the application code line
+that ran it the first time it went over the limit. Under ``manage.py test``
+a report raises ``NPlusOneError``, failing the test that made the request;
+otherwise it is logged to ``learning.nplusone``.
+
+The middleware is installed when ``NPLUSONE_DETECTION`` is on (by default
+when ``DEBUG`` is, and always under ``manage.py test``). Code that repeats a
+statement on purpose, such as per-row writes, can opt out with ``allow()``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import os
+import re
+import sys
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('query_repetitions', default=None)
+_installed = False
+
+_whitespace_re = re.compile(r'\s+')
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+_in_list_re = re.compile(r'\bIN \((?:\?|%s)(?:, (?:\?|%s))*\)', re.IGNORECASE)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """The shape of ``sql``: what stays the same when it runs for another row."""
+    sql = _whitespace_re.sub(' ', sql.strip())
+    sql = _string_re.sub('?', sql)
+    sql = _number_re.sub('?', sql)
+    return _in_list_re.sub('IN (...)', sql.replace('%s', '?'))
+
+
+def _template_line(frame):
+    # The innermost template node being rendered, i.e. the tag or variable that ran the query
+    while frame is not None:
+        node = frame.f_locals.get('self') if frame.f_code.co_name == 'render_annotated' else None
+        if isinstance(node, Node) and getattr(node, 'token', None) and getattr(node, 'origin', None):
+            return '%s, line %s: %s' % (node.origin.template_name or node.origin.name, node.token.lineno,
+                                        node.token.contents)
+        frame = frame.f_back
+    return None
+
+
+def _code_line(frame):
+    # The innermost frame in the project itself, skipping Django and this module
+    base = str(settings.BASE_DIR) + os.sep
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base) and 'site-packages' not in filename
+                and os.path.abspath(filename) != os.path.abspath(__file__)):
+            return '%s:%s in %s' % (os.path.relpath(filename, base), frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+
+class QueryRepetitions:
+    """Statement shapes seen in one request, and the ones that went over the threshold."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.reports = {}
+        self.allowed = 0
+
+    def add(self, sql):
+        if self.allowed:
+            return
+        shape = fingerprint(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == self.threshold + 1:
+            frame = sys._getframe(2)
+            self.reports[shape] = {'template': _template_line(frame), 'code': _code_line(frame)}
+
+    def describe(self, request):
+        lines = ['%s %s repeated %d statement shape(s) more than %d times:' % (
+            request.method, request.path, len(self.reports), self.threshold)]
+        for shape, where in self.reports.items():
+            lines.append('  %dx %s' % (self.counts[shape], shape))
+            for label in ('template', 'code'):
+                if where[label]:
+                    lines.append('      %s: %s' % (label, where[label]))
+        return '\n'.join(lines)
+
+
+def _record_query(execute, sql, params, many, context):
+    repetitions = _current.get()
+    if repetitions is not None:
+        repetitions.add(sql)
+    return execute(sql, params, many, context)
+
+
+def _wrap_connection(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _connection_created(sender, connection, **kwargs):
+    _wrap_connection(connection)
+
+
+def install():
+    """Hook SQL execution on this thread's connections and every new one; idempotent."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    connection_created.connect(_connection_created, dispatch_uid='learning.nplusone')
+
+
+@contextmanager
+def allow():
+    """Do not count the statements run inside this block."""
+    repetitions = _current.get()
+    if repetitions is None:
+        yield
+        return
+    repetitions.allowed += 1
+    try:
+        yield
+    finally:
+        repetitions.allowed -= 1
+
+
+class QueryRepetitionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 10)
+        self.raise_errors = getattr(settings, 'NPLUSONE_RAISE', False)
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        repetitions = QueryRepetitions(self.threshold)
+        token = _current.set(repetitions)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, repetitions)
+
+    async def __acall__(self, request):
+        repetitions = QueryRepetitions(self.threshold)
+        token = _current.set(repetitions)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, repetitions)
+
+    def _report(self, request, response, repetitions):
+        if repetitions.reports:
+            message = repetitions.describe(request)
+            if self.raise_errors:
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
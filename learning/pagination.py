@@ -0,0 +1,122 @@
+"""
+Keyset ("cursor") pagination.
+
+Pages are read with ``WHERE (created_at, id) < (last seen)`` instead of an
+OFFSET, and one extra row is fetched to learn whether another page exists,
+so there is no ``COUNT(*)`` and page N costs the same as page 1. The
+ordering must end in a unique column (the primary key) for that to be exact.
+
+Cursors are signed, so clients cannot forge positions, and opaque, so the
+ordering can change without breaking anything but bookmarked links (which
+fall back to the first page).
+"""
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_PARAM = 'cursor'
+_SALT = 'learning.pagination'
+
+
+class CursorPage:
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        # [(field name, descending)], e.g. ('-created_at', '-id')
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self._fields = [queryset.model._meta.get_field(name) for name, _ in self.ordering]
+
+    def page(self, cursor=None):
+        position, backwards = self._decode(cursor)
+        rows = list(self.rows_after(position, backwards)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows, None, None)
+        # Going forwards there is a previous page whenever we started from a cursor, and vice versa
+        has_next, has_previous = (position is not None, more) if backwards else (more, position is not None)
+        return CursorPage(
+            rows,
+            self._encode(rows[-1], backwards=False) if has_next else None,
+            self._encode(rows[0], backwards=True) if has_previous else None,
+        )
+
+    def rows_after(self, position=None, backwards=False):
+        """Rows after ``position`` (a list of ordering values); walked in reverse when ``backwards``."""
+        ordering = [(name, descending != backwards) for name, descending in self.ordering]
+        queryset = self.queryset.order_by(*[('-' if descending else '') + name for name, descending in ordering])
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        return queryset
+
+    def _after(self, ordering, position):
+        # (a, b) after (x, y)  <=>  a > x OR (a = x AND b > y), with > flipped for descending columns.
+        # The redundant a >= x in front gives SQLite a range it can seek to on the index over a.
+        condition = Q()
+        for i, (name, descending) in enumerate(ordering):
+            step = Q(**{f'{name}__{"lt" if descending else "gt"}': position[i]})
+            for j in range(i):
+                step &= Q(**{ordering[j][0]: position[j]})
+            condition |= step
+        first, descending = ordering[0]
+        return Q(**{f'{first}__{"lte" if descending else "gte"}': position[0]}) & condition
+
+    def _encode(self, obj, backwards):
+        if isinstance(obj, dict):
+            # A values() row; it has to include the ordering columns
+            obj = self.queryset.model(**{name: obj[name] for name, _ in self.ordering})
+        values = [field.value_to_string(obj) for field in self._fields]
+        return signing.dumps([values, backwards], salt=_SALT, compress=True)
+
+    def _decode(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            values, backwards = signing.loads(cursor, salt=_SALT)
+            position = [field.to_python(value) for field, value in zip(self._fields, values, strict=True)]
+        except (signing.BadSignature, ValidationError, ValueError, TypeError):
+            return None, False
+        return position, bool(backwards)
+
+
+def paginate(request, queryset, per_page, ordering):
+    """Page ``queryset`` by the ``?cursor=`` of ``request``; returns the CursorPage."""
+    return CursorPaginator(queryset, per_page, ordering).page(request.GET.get(CURSOR_PARAM))
+
+
+class CursorPaginationMixin:
+    """For ListViews: set ``paginate_by`` and ``cursor_ordering`` (ending in the primary key)."""
+
+    cursor_ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        page = paginator.page(self.request.GET.get(CURSOR_PARAM))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,200 @@
+"""
+Opt-in per-request profiling (``PROFILING=True``).
+
+``ProfilingMiddleware`` times every request: the SQL it ran (count and
+time, on every database alias), template rendering, the view and the whole
+request through the middleware stack. The figures go out in a
+``Server-Timing`` header, which browser developer tools show next to the
+request. Requests slower than ``PROFILING_SLOW_MS`` are kept, sampled at
+``PROFILING_SAMPLE_RATE``, in a ring buffer of the last
+``PROFILING_BUFFER_SIZE`` with their most expensive SQL statements; admins
+see it at ``/profiling/``. The buffer lives in the process, so each worker
+has its own.
+
+When profiling is off the middleware is not installed at all, and neither
+are the SQL and template hooks, so an unprofiled request pays nothing.
+Timings nest: ``view`` includes the SQL and templates it ran, and ``total``
+includes ``view``.
+"""
+from collections import deque
+from contextvars import ContextVar
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import base as template_base
+
+TOP_QUERIES = 5
+
+_current = ContextVar('profile', default=None)
+_buffer = deque(maxlen=getattr(settings, 'PROFILING_BUFFER_SIZE', 100))
+_buffer_lock = threading.Lock()
+_installed = False
+
+
+class Profile:
+    """What one request spent its time on; every duration is in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view = 0.0
+        self.total = 0.0
+        self.sql = 0.0
+        self.template = 0.0
+        self.queries = {}
+        self.query_count = 0
+        self._template_depth = 0
+
+    def add_query(self, sql, duration):
+        self.sql += duration
+        self.query_count += 1
+        # Keyed by the SQL with its placeholders, so one statement run in a loop adds up
+        count, total = self.queries.get(sql, (0, 0.0))
+        self.queries[sql] = (count + 1, total + duration)
+
+    def top_queries(self, limit=TOP_QUERIES):
+        ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{'sql': sql, 'count': count, 'ms': total * 1000} for sql, (count, total) in ranked]
+
+    def server_timing(self):
+        return ', '.join([
+            'sql;dur=%.1f;desc="%d queries"' % (self.sql * 1000, self.query_count),
+            'tpl;dur=%.1f;desc="templates"' % (self.template * 1000),
+            'view;dur=%.1f' % (self.view * 1000),
+            'total;dur=%.1f' % (self.total * 1000),
+        ])
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def _wrap_connection(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _connection_created(sender, connection, **kwargs):
+    _wrap_connection(connection)
+
+
+def _timed_render(render):
+    def timed(self, context):
+        profile = _current.get()
+        if profile is None:
+            return render(self, context)
+        # {% include %} renders a template inside a template; only the outermost one counts
+        profile._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile._template_depth -= 1
+            if not profile._template_depth:
+                profile.template += time.perf_counter() - started
+    timed.__wrapped__ = render
+    return timed
+
+
+def install():
+    """Hook SQL execution and template rendering; idempotent."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    # Connections are per thread and opened lazily: wrap the ones that exist, and every new one
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    connection_created.connect(_connection_created, dispatch_uid='learning.profiling')
+    template_base.Template.render = _timed_render(template_base.Template.render)
+
+
+def recent():
+    """The buffered slow requests, newest first."""
+    with _buffer_lock:
+        return list(reversed(_buffer))
+
+
+def clear():
+    with _buffer_lock:
+        _buffer.clear()
+
+
+class ProfilingMiddleware:
+    """Put it first in MIDDLEWARE, so ``total`` covers the rest of the stack."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow = getattr(settings, 'PROFILING_SLOW_MS', 200) / 1000
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    def _finish(self, request, response, profile):
+        now = time.perf_counter()
+        if profile.view_started is not None:
+            profile.view = now - profile.view_started
+        profile.total = now - profile.started
+        response['Server-Timing'] = profile.server_timing()
+        if profile.total >= self.slow and random.random() < self.sample_rate:
+            self._keep(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current.get().view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _current.get().view_started = time.perf_counter()
+
+    def _keep(self, request, response, profile):
+        match = request.resolver_match
+        with _buffer_lock:
+            _buffer.append({
+                'at': time.time(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': match.view_name if match else '',
+                'status': response.status_code,
+                'total_ms': profile.total * 1000,
+                'view_ms': profile.view * 1000,
+                'sql_ms': profile.sql * 1000,
+                'template_ms': profile.template * 1000,
+                'query_count': profile.query_count,
+                'top_queries': profile.top_queries(),
+            })
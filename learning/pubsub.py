@@ -0,0 +1,89 @@
+"""
+Fan-out of live events (new announcements) to streaming clients.
+
+The broker is chosen with the ``NOTIFICATION_BROKER`` setting. The default
+``InProcessBroker`` only reaches clients connected to the same process as
+the publisher, which is enough for a single ASGI worker. With several
+workers, point the setting at a class that relays through a local broker
+(Redis pub/sub, a kombu fanout exchange, ...) and implements the same two
+methods: ``publish(channel, message)``, callable from any thread, and
+``subscribe(channel)``, an async context manager yielding an object whose
+``get()`` coroutine returns the next message.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+ANNOUNCEMENTS = 'announcements'
+
+
+class InProcessBroker:
+    # Each subscriber is an asyncio.Queue bound to the event loop that is
+    # serving its connection; publish() may be called from any thread.
+    max_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The loop serving that connection has already shut down
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            # A client that stopped reading loses its oldest message, not everyone's
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    def subscribe(self, channel):
+        return _Subscription(self, channel)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers[channel])
+
+
+class _Subscription:
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+
+    async def __aenter__(self):
+        self.subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.broker.max_queue_size))
+        with self.broker._lock:
+            self.broker._subscribers[self.channel].add(self.subscriber)
+        return self.subscriber[1]
+
+    async def __aexit__(self, *exc_info):
+        with self.broker._lock:
+            self.broker._subscribers[self.channel].discard(self.subscriber)
+
+
+broker = SimpleLazyObject(lambda: import_string(
+    getattr(settings, 'NOTIFICATION_BROKER', 'learning.pubsub.InProcessBroker'))())
+
+
+def announcement_payload(announcement):
+    # Same shape as the polling endpoints return
+    return {
+        'id': announcement.pk,
+        'user': announcement.user_id,
+        'content': announcement.content,
+        'posted_at': announcement.posted_at.isoformat() if announcement.posted_at else None,
+    }
+
+def publish_announcement(announcement):
+    broker.publish(ANNOUNCEMENTS, announcement_payload(announcement))
@@ -0,0 +1,100 @@
+"""
+Write-behind storage for ``User.last_announcements_check``.
+
+Every notification poll moves the user's read marker. Saving the User row
+each time meant a full-row write per poll per tab, contending with quiz
+submissions for SQLite's single writer. Markers now live in the cache and a
+background thread writes the pending ones in batches, updating that single
+column. Reads prefer the cached marker and fall back to the column.
+
+``READ_MARKER_FLUSH_INTERVAL`` (seconds) sets how often the flusher runs;
+0 writes through synchronously (tests, single-shot scripts).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+MARKER_TIMEOUT = 60 * 60 * 24 * 30
+
+_lock = threading.Lock()
+_pending = {}
+_flusher_pid = None
+
+
+def _key(user_id):
+    return 'read-marker:%s' % user_id
+
+def _flush_interval():
+    return getattr(settings, 'READ_MARKER_FLUSH_INTERVAL', 5)
+
+def last_check(user):
+    marker = cache.get(_key(user.pk))
+    if marker is None or marker < user.last_announcements_check:
+        return user.last_announcements_check
+    return marker
+
+def mark_read(user, when=None):
+    when = when or timezone.now()
+    cache.set(_key(user.pk), when, MARKER_TIMEOUT)
+    user.last_announcements_check = when
+    if _flush_interval() <= 0:
+        User.objects.filter(pk=user.pk).update(last_announcements_check=when)
+        return
+    with _lock:
+        if user.pk not in _pending or _pending[user.pk] < when:
+            _pending[user.pk] = when
+    _ensure_flusher()
+
+def flush():
+    """Write every pending marker to the database. Returns how many were written."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return 0
+    try:
+        User.objects.bulk_update(
+            [User(pk=user_id, last_announcements_check=when) for user_id, when in pending.items()],
+            ['last_announcements_check'], batch_size=500)
+    except Exception:
+        # Put them back so the next round retries, unless a newer marker arrived meanwhile
+        with _lock:
+            for user_id, when in pending.items():
+                if user_id not in _pending or _pending[user_id] < when:
+                    _pending[user_id] = when
+        raise
+    return len(pending)
+
+def _run_flusher():
+    while True:
+        time.sleep(_flush_interval())
+        try:
+            flush()
+        except Exception:
+            logger.exception('Could not flush announcement read markers')
+        finally:
+            connections.close_all()
+
+def _ensure_flusher():
+    # Keyed on the pid so a worker forked after the first poll starts its own thread
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_run_flusher, name='read-marker-flusher', daemon=True).start()
+
+atexit.register(flush)
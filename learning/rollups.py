@@ -0,0 +1,207 @@
+"""
+Incrementally maintained summary tables behind the instructor dashboard.
+
+Creating a row only ever bumps counters with F() expressions, so the hot
+path (a learner finishing a quiz) costs a handful of indexed writes.
+Deleting quizzes or attempts is rare and usually cascades, so those schedule
+a recompute of the affected instructor once the transaction commits.
+
+Signals do not fire for bulk_create/update(); run
+``python manage.py rebuild_rollups`` after loading data that way.
+"""
+from functools import lru_cache, partial
+import threading
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (Announcement, DailySignups, InstructorCourseStats, InstructorLearnerStats,
+                     InstructorStats, Notes, Quiz, TakenQuiz, Tutorial, User)
+
+# How many of an instructor's latest attempts are kept for the score trend
+RECENT_ATTEMPTS = 40
+
+_local = threading.local()
+
+
+def _bump(model, lookup, **deltas):
+    model.objects.get_or_create(**lookup)
+    model.objects.filter(**lookup).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+def _drop(model, lookup, field):
+    model.objects.filter(**lookup, **{f'{field}__gt': 0}).update(**{field: F(field) - 1})
+
+@lru_cache(maxsize=4096)
+def _quiz_owner(quiz_id):
+    # A quiz never changes owner, so this is safe to memoise across requests
+    return Quiz.objects.filter(pk=quiz_id).values_list('owner_id', flat=True).first()
+
+def refresh_after_commit(instructor_id):
+    """Recompute an instructor's rollups once, after the current transaction commits."""
+    if instructor_id is None:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = {}
+    callback = pending.get(instructor_id)
+    hooks = transaction.get_connection().run_on_commit
+    if callback is not None and any(hook[1] is callback for hook in hooks):
+        # Already queued in this transaction (e.g. a quiz delete cascading to its attempts)
+        return
+    callback = pending[instructor_id] = partial(refresh_instructor, instructor_id)
+    transaction.on_commit(callback)
+
+
+def refresh_instructor(instructor_id):
+    """Rebuild every rollup row for one instructor from the source tables."""
+    if not User.objects.filter(pk=instructor_id).exists():
+        return
+    attempts = TakenQuiz.objects.filter(quiz__owner_id=instructor_id)
+    totals = attempts.aggregate(attempt_count=Count('id'), score_sum=Sum('score'))
+
+    with transaction.atomic():
+        InstructorStats.objects.update_or_create(instructor_id=instructor_id, defaults={
+            'quiz_count': Quiz.objects.filter(owner_id=instructor_id).count(),
+            'tutorial_count': Tutorial.objects.filter(user_id=instructor_id).count(),
+            'notes_count': Notes.objects.filter(user_id=instructor_id).count(),
+            'announcement_count': Announcement.objects.filter(user_id=instructor_id).count(),
+            'attempt_count': totals['attempt_count'],
+            'score_sum': totals['score_sum'] or 0,
+            'quizzes_with_attempts': Quiz.objects.filter(
+                owner_id=instructor_id, taken_quizzes__isnull=False).distinct().count(),
+            'recent_attempts': [
+                list(row) for row in attempts.order_by('-date', '-id').values_list('pk', 'score')[:RECENT_ATTEMPTS]
+            ],
+        })
+
+        courses = {
+            row['course']: InstructorCourseStats(instructor_id=instructor_id, course_id=row['course'],
+                                                 quiz_count=row['quiz_count'])
+            for row in Quiz.objects.filter(owner_id=instructor_id).values('course').annotate(quiz_count=Count('id'))
+        }
+        for row in attempts.values('quiz__course').annotate(attempt_count=Count('id'), score_sum=Sum('score')):
+            course_stats = courses[row['quiz__course']]
+            course_stats.attempt_count = row['attempt_count']
+            course_stats.score_sum = row['score_sum'] or 0
+        InstructorCourseStats.objects.filter(instructor_id=instructor_id).delete()
+        InstructorCourseStats.objects.bulk_create(courses.values())
+
+        InstructorLearnerStats.objects.filter(instructor_id=instructor_id).delete()
+        InstructorLearnerStats.objects.bulk_create([
+            InstructorLearnerStats(instructor_id=instructor_id, learner_id=row['learner'],
+                                   attempt_count=row['attempt_count'], score_sum=row['score_sum'],
+                                   avg_score=row['score_sum'] / row['attempt_count'])
+            for row in attempts.values('learner').annotate(attempt_count=Count('id'), score_sum=Sum('score'))
+        ], batch_size=500)
+
+
+def rebuild_signups():
+    with transaction.atomic():
+        DailySignups.objects.all().delete()
+        DailySignups.objects.bulk_create([
+            DailySignups(day=row['day'], learners=row['learners'])
+            for row in User.objects.filter(is_learner=True)
+                .values(day=F('date_joined__date')).annotate(learners=Count('id'))
+        ], batch_size=500)
+
+
+def signups_added(days):
+    """Count learners created with bulk_create, which sends no post_save; ``days`` maps date -> learners."""
+    for day, learners in days.items():
+        _bump(DailySignups, {'day': day}, learners=learners)
+
+
+def rebuild_all():
+    """Recompute every rollup table from scratch. Returns the number of instructors processed."""
+    owners = set(Quiz.objects.values_list('owner_id', flat=True).distinct())
+    owners.update(Tutorial.objects.values_list('user_id', flat=True).distinct())
+    owners.update(Notes.objects.values_list('user_id', flat=True).distinct())
+    owners.update(Announcement.objects.values_list('user_id', flat=True).distinct())
+    InstructorStats.objects.exclude(pk__in=owners).delete()
+    for instructor_id in owners:
+        refresh_instructor(instructor_id)
+    rebuild_signups()
+    return len(owners)
+
+
+@receiver(post_save, sender=TakenQuiz)
+def taken_quiz_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    quiz = instance.quiz
+    score = instance.score
+    with transaction.atomic():
+        first_attempt = not TakenQuiz.objects.filter(quiz_id=quiz.pk).exclude(pk=instance.pk).exists()
+        stats, _ = InstructorStats.objects.select_for_update().get_or_create(instructor_id=quiz.owner_id)
+        stats.recent_attempts = ([[instance.pk, score]] + stats.recent_attempts)[:RECENT_ATTEMPTS]
+        stats.attempt_count = F('attempt_count') + 1
+        stats.score_sum = F('score_sum') + score
+        stats.quizzes_with_attempts = F('quizzes_with_attempts') + int(first_attempt)
+        stats.save(update_fields=['recent_attempts', 'attempt_count', 'score_sum', 'quizzes_with_attempts'])
+
+        _bump(InstructorCourseStats, {'instructor_id': quiz.owner_id, 'course_id': quiz.course_id},
+              attempt_count=1, score_sum=score)
+
+        lookup = {'instructor_id': quiz.owner_id, 'learner_id': instance.learner_id}
+        InstructorLearnerStats.objects.get_or_create(**lookup)
+        InstructorLearnerStats.objects.filter(**lookup).update(
+            attempt_count=F('attempt_count') + 1,
+            score_sum=F('score_sum') + score,
+            avg_score=(F('score_sum') + score) / (F('attempt_count') + 1),
+        )
+
+@receiver(pre_delete, sender=TakenQuiz)
+def taken_quiz_deleted(sender, instance, **kwargs):
+    refresh_after_commit(_quiz_owner(instance.quiz_id))
+
+@receiver(pre_save, sender=Quiz)
+def quiz_saving(sender, instance, **kwargs):
+    instance._rollup_course_id = None
+    if instance.pk:
+        instance._rollup_course_id = Quiz.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, **kwargs):
+    if created:
+        _bump(InstructorStats, {'instructor_id': instance.owner_id}, quiz_count=1)
+        _bump(InstructorCourseStats, {'instructor_id': instance.owner_id, 'course_id': instance.course_id},
+              quiz_count=1)
+    elif instance._rollup_course_id not in (None, instance.course_id):
+        # Moving a quiz to another course moves all of its attempts with it
+        refresh_after_commit(instance.owner_id)
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    refresh_after_commit(instance.owner_id)
+
+@receiver(post_save, sender=Tutorial)
+@receiver(post_save, sender=Notes)
+@receiver(post_save, sender=Announcement)
+def content_saved(sender, instance, created, **kwargs):
+    if created:
+        _bump(InstructorStats, {'instructor_id': instance.user_id}, **{_COUNTERS[sender]: 1})
+
+@receiver(post_delete, sender=Tutorial)
+@receiver(post_delete, sender=Notes)
+@receiver(post_delete, sender=Announcement)
+def content_deleted(sender, instance, **kwargs):
+    _drop(InstructorStats, {'instructor_id': instance.user_id}, _COUNTERS[sender])
+
+_COUNTERS = {
+    Tutorial: 'tutorial_count',
+    Notes: 'notes_count',
+    Announcement: 'announcement_count',
+}
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created and instance.is_learner:
+        _bump(DailySignups, {'day': timezone.localdate(instance.date_joined)}, learners=1)
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    if instance.is_learner:
+        _drop(DailySignups, {'day': timezone.localdate(instance.date_joined)}, 'learners')
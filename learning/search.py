@@ -0,0 +1,200 @@
+"""
+Full-text search over tutorials, notes, announcements, quizzes and questions.
+
+Everything searchable lives in one SQLite FTS5 table, ``search_index``
+(created by migration 0010), with a ``title`` and a ``body`` column and the
+document's course as an unindexed column. The rowid encodes what a row is:
+``object id * 8 + kind``, so updating or deleting a document is a rowid
+lookup rather than a scan of the index. The receivers below keep it in step
+with every save and delete; ``bulk_create`` and ``update()`` skip them, so
+run ``python manage.py rebuild_search_index`` after loading data that way.
+
+``search`` turns what the user typed into an FTS5 query of quoted terms
+(the last one a prefix, for search-as-you-type), ranks with bm25 weighting
+title matches over body matches, and only returns documents from the
+learner's courses plus announcements, which belong to no course.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Announcement, Notes, Question, Quiz, Tutorial
+
+TABLE = 'search_index'
+
+TUTORIAL, NOTES, ANNOUNCEMENT, QUIZ, QUESTION = 1, 2, 3, 4, 5
+KINDS = 8
+KIND_LABELS = {
+    TUTORIAL: 'Tutorial', NOTES: 'Notes', ANNOUNCEMENT: 'Announcement', QUIZ: 'Quiz', QUESTION: 'Question',
+}
+_SENDER_KINDS = {Tutorial: TUTORIAL, Notes: NOTES, Announcement: ANNOUNCEMENT, Quiz: QUIZ, Question: QUESTION}
+
+# Also in migration 0010. Title matches count ten times as much as body matches.
+CREATE_TABLE = (f"CREATE VIRTUAL TABLE {TABLE} USING fts5(title, body, course_id UNINDEXED, "
+                f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')")
+SET_RANK = f"INSERT INTO {TABLE} ({TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+SNIPPET_TOKENS = 16
+# Private-use characters mark the matches in snippets, so they survive escaping the text around them
+_MARK_START, _MARK_END = '\ue000', '\ue001'
+
+_term_re = re.compile(r'\w+', re.UNICODE)
+
+# rowid, title, body and course id of every document, for rebuild()
+SOURCES = (
+    'SELECT id * 8 + 1, title, content, course_id FROM learning_tutorial',
+    "SELECT id * 8 + 2, title, '', course_id FROM learning_notes",
+    "SELECT id * 8 + 3, '', content, NULL FROM learning_announcement",
+    "SELECT id * 8 + 4, name, '', course_id FROM learning_quiz",
+    "SELECT q.id * 8 + 5, '', q.text, z.course_id FROM learning_question q JOIN learning_quiz z ON z.id = q.quiz_id",
+)
+
+
+def _enabled(conn):
+    return conn.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    return pk * KINDS + kind
+
+
+def index(kind, pk, title, body, course_id):
+    if not _enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT OR REPLACE INTO {TABLE} (rowid, title, body, course_id) VALUES (%s, %s, %s, %s)',
+                       [_rowid(kind, pk), title or '', body or '', course_id])
+
+
+def unindex(kind, pk):
+    if not _enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(kind, pk)])
+
+
+def rebuild():
+    """Re-create every row of the index from the source tables; returns the number of documents."""
+    if not _enabled(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for select in SOURCES:
+            cursor.execute(f'INSERT INTO {TABLE} (rowid, title, body, course_id) {select}')
+        # Merge the b-tree segments the bulk insert left behind
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_query(text):
+    """What the user typed, as an FTS5 query: every word must match, the last one as a prefix."""
+    terms = _term_re.findall(text.lower())
+    if not terms:
+        return ''
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search_sql(course_count):
+    """The ranked query behind ``search``, for ``course_count`` course ids."""
+    courses = ' OR course_id IN (%s)' % ', '.join(['%s'] * course_count) if course_count else ''
+    return (f'SELECT rowid, title, snippet({TABLE}, 1, %s, %s, %s, %s) FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s AND (course_id IS NULL{courses}) ORDER BY rank LIMIT %s')
+
+
+def search(text, course_ids, limit=30):
+    """
+    Return up to ``limit`` results, best first, as dicts with ``kind``,
+    ``label``, ``id``, ``title``, ``snippet`` (safe HTML) and ``url``.
+    """
+    query = match_query(text)
+    conn = connections[router.db_for_read(Tutorial)]
+    if not query or not _enabled(conn):
+        return []
+    course_ids = list(course_ids)
+    with conn.cursor() as cursor:
+        cursor.execute(search_sql(len(course_ids)),
+                       [_MARK_START, _MARK_END, '…', SNIPPET_TOKENS, query, *course_ids, limit])
+        rows = cursor.fetchall()
+
+    results = []
+    for rowid, title, snippet in rows:
+        kind, pk = rowid % KINDS, rowid // KINDS
+        results.append({'kind': kind, 'label': KIND_LABELS[kind], 'id': pk, 'title': title,
+                        'snippet': _highlight(snippet)})
+    _add_urls(results)
+    return results
+
+
+def _add_urls(results):
+    # One query each for the kinds whose link needs more than the id
+    ids = {kind: [r['id'] for r in results if r['kind'] == kind] for kind in (NOTES, QUESTION)}
+    files = dict(Notes.objects.filter(pk__in=ids[NOTES]).values_list('pk', 'file')) if ids[NOTES] else {}
+    quizzes = (dict(Question.objects.filter(pk__in=ids[QUESTION]).values_list('pk', 'quiz_id'))
+               if ids[QUESTION] else {})
+    for result in results:
+        kind, pk = result['kind'], result['id']
+        if kind == TUTORIAL:
+            result['url'] = reverse('tutorial-detail', args=[pk])
+        elif kind == NOTES:
+            result['url'] = reverse('media', args=[files[pk]]) if files.get(pk) else reverse('grades')
+        elif kind == ANNOUNCEMENT:
+            result['url'] = reverse('learnerallannonce')
+        elif kind == QUIZ:
+            result['url'] = reverse('take_quiz', args=[pk])
+        else:
+            result['url'] = reverse('take_quiz', args=[quizzes[pk]]) if pk in quizzes else reverse('lquiz_list')
+
+
+@receiver(post_save, sender=Tutorial)
+def tutorial_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index(TUTORIAL, instance.pk, instance.title, instance.content, instance.course_id)
+
+
+@receiver(post_save, sender=Notes)
+def notes_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index(NOTES, instance.pk, instance.title, '', instance.course_id)
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index(ANNOUNCEMENT, instance.pk, '', instance.content, None)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    index(QUIZ, instance.pk, instance.name, '', instance.course_id)
+    if not created:
+        # The questions carry the quiz's course, which may have just changed
+        for pk, text in instance.questions.values_list('pk', 'text'):
+            index(QUESTION, pk, '', text, instance.course_id)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index(QUESTION, instance.pk, '', instance.text, instance.quiz.course_id)
+
+
+@receiver(post_delete, sender=Tutorial)
+@receiver(post_delete, sender=Notes)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Question)
+def document_deleted(sender, instance, **kwargs):
+    unindex(_SENDER_KINDS[sender], instance.pk)
@@ -0,0 +1,173 @@
+"""
+Production static files: hashed names, precompressed copies and a vendor audit.
+
+``CompressedManifestStaticFilesStorage`` is Django's manifest storage (every
+file is also written as ``name.<md5 prefix>.ext`` and ``{% static %}`` links
+to that) plus a gzip and, when the optional ``brotli`` package is installed,
+a Brotli sibling of each hashed text asset, written once at
+``collectstatic`` time. A hashed name never changes content, so the front-end
+server can send it with ``Cache-Control: immutable`` and a year's max-age,
+and pick the ``.br``/``.gz`` file the browser accepts instead of compressing
+on every request.
+
+``check_vendor_assets`` runs with ``manage.py check --deploy``. It follows
+every template built on a ``dashboard/*/base.html`` and warns when a page
+loads the same library twice (say two jQuery builds), when a static file is
+an unreferenced copy of a library the pages use, and when a ``vendor/``
+package is referenced by no template at all.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+import re
+
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.checks import Tags, Warning, register
+from django.template import engines
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf',
+                           '.otf', '.eot'}
+# Below this the compressed copy saves less than the extra request headers cost
+MIN_COMPRESS_SIZE = 256
+
+_static_re = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]""")
+_extends_re = re.compile(r"""{%\s*extends\s+['"]([^'"]+)['"]""")
+_base_re = re.compile(r'^dashboard/[^/]+/base\.html$')
+# Suffixes that name a build of a library rather than a different library
+_build_re = re.compile(r'(-\d+(\.\d+)*|\.min|\.slim|\.bundle)(?=\.|$)')
+_min_re = re.compile(r'\.min(?=\.[^.]+$)')
+
+
+def _compressed(data):
+    """Yield ``(suffix, bytes)`` for each encoding that makes ``data`` meaningfully smaller."""
+    encoded = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['.br'] = brotli.compress(data, quality=11)
+    for suffix, content in encoded.items():
+        if len(content) < len(data) * 0.95:
+            yield suffix, content
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        with ThreadPoolExecutor() as pool:
+            # zlib and brotli release the GIL while compressing
+            list(pool.map(self._write_compressed, sorted(set(self.hashed_files.values()))))
+
+    def _write_compressed(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        for suffix, content in _compressed(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(content)
+
+
+def library(name):
+    """``vendor/jquery/jquery-3.5.1.min.js`` -> ``jquery.js``: what a static path is a build of."""
+    base = os.path.basename(name).lower()
+    stem, extension = os.path.splitext(base)
+    return _build_re.sub('', stem) + extension
+
+
+def _template_names():
+    engine = engines['django']
+    for directory in engine.template_dirs:
+        for root, dirs, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith('.html'):
+                    yield os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+
+
+def _page_assets():
+    """Map each template built on a dashboard base to the static paths it and its parents reference."""
+    engine = engines['django']
+    sources = {}
+    for name in set(_template_names()):
+        sources[name] = engine.get_template(name).template.source
+
+    def chain(name, seen=()):
+        source = sources.get(name, '')
+        parent = _extends_re.search(source)
+        assets = _static_re.findall(source)
+        if parent and parent.group(1) not in seen:
+            bases, inherited = chain(parent.group(1), seen + (name,))
+            return bases + [name], inherited + assets
+        return [name], assets
+
+    pages = {}
+    for name in sources:
+        bases, assets = chain(name)
+        if any(_base_re.match(base) for base in bases):
+            pages[name] = assets
+    referenced = {asset for source in sources.values() for asset in _static_re.findall(source)}
+    return pages, referenced
+
+
+def _static_files():
+    # STATICFILES_DIRS only: the apps' own static files (the admin's jQuery) are not ours to prune
+    for path, storage in FileSystemFinder().list(['CVS', '.*', '*~']):
+        yield path.replace(os.sep, '/'), storage
+
+
+def _is_source_of(path, referenced):
+    # jquery.js next to a referenced jquery.min.js is the readable source of the same build
+    return any(_min_re.sub('', asset) == path for asset in referenced)
+
+
+@register(Tags.staticfiles, deploy=True)
+def check_vendor_assets(app_configs, **kwargs):
+    pages, referenced = _page_assets()
+    warnings = []
+
+    for page, assets in sorted(pages.items()):
+        builds = {}
+        for asset in assets:
+            builds.setdefault(library(asset), []).append(asset)
+        for key, paths in sorted(builds.items()):
+            if len(paths) > 1:
+                warnings.append(Warning(
+                    '%s loads %s %d times: %s' % (page, key, len(paths), ', '.join(paths)),
+                    hint='Keep the copy in the dashboard base template and drop the others.',
+                    id='learning.W001',
+                ))
+
+    used_libraries = {library(asset) for assets in pages.values() for asset in assets}
+    packages = {}
+    for path, storage in _static_files():
+        parts = path.split('/')
+        if parts[0] == 'vendor' and len(parts) > 2:
+            size = storage.size(path)
+            packages.setdefault(parts[1], [0, False])[0] += size
+            if any(asset.startswith('vendor/%s/' % parts[1]) for asset in referenced):
+                packages[parts[1]][1] = True
+        if (path not in referenced and library(path) in used_libraries and path.endswith(('.js', '.css'))
+                and not _is_source_of(path, referenced)):
+            warnings.append(Warning(
+                '%s is an unreferenced copy of %s' % (path, library(path)),
+                hint='Delete it; the dashboard templates load another build.',
+                id='learning.W002',
+            ))
+
+    for package, (size, used) in sorted(packages.items()):
+        if not used:
+            warnings.append(Warning(
+                'static/vendor/%s (%.1f MB) is not referenced by any template' % (package, size / 1024 / 1024),
+                hint='Delete it, or exclude it from collectstatic with --ignore.',
+                id='learning.W003',
+            ))
+    return warnings
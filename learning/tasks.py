@@ -0,0 +1,46 @@
+"""Background tasks run by ``python manage.py run_worker`` (see learning/jobs.py)."""
+from django.core.files.storage import default_storage
+
+from . import account_import
+from .jobs import task
+from .models import AccountImport, Blob, Course, Notes, Tutorial
+
+
+@task(priority=1)
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+@task(priority=1)
+def delete_unused_blob(name):
+    # The same content may have been uploaded again since the last reference was released
+    if not Blob.objects.filter(name=name).exists():
+        default_storage.delete(name)
+
+
+@task(priority=5, visibility_timeout=900)
+def delete_course(course_id):
+    # Gone already when a retry follows a run that got as far as the delete
+    course = Course.objects.filter(pk=course_id).first()
+    if course is None:
+        return
+    # A cascade deletes rows only; Tutorial.delete and Notes.delete also remove their files
+    for tutorial in Tutorial.objects.filter(course=course).iterator():
+        tutorial.delete()
+    for notes in Notes.objects.filter(course=course).iterator():
+        notes.delete()
+    course.delete()
+
+
+@task(priority=2, visibility_timeout=3600)
+def import_accounts(import_id):
+    # A retry, or a second worker once the visibility timeout lapses, carries on from the checkpoint
+    pending = AccountImport.objects.exclude(state=AccountImport.DONE).filter(pk=import_id).first()
+    if pending is None:
+        return
+    try:
+        for _ in account_import.run(pending):
+            pass
+    except account_import.Superseded:
+        pass
@@ -0,0 +1,52 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from .. import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+
+    def __init__(self, nodelist, name, vary_on, depends):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.depends = depends
+
+    def render(self, context):
+        # The viewer, never a ``user`` the view put in the context (e.g. the user a DeleteView shows)
+        key = fragments.cache_key(self.name, context.request.user, [value.resolve(context) for value in self.vary_on], self.depends)
+        html = fragments.load(self.name, key)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.store(key, html)
+        return mark_safe(html)
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    ``{% fragment "tutorial-cards" request.GET.cursor depends="tutorial course" %}...{% endfragment %}``
+
+    Caches the enclosed block per role and user, per value of the optional
+    variables after the name, until content of one of the ``depends`` kinds
+    (see learning.fragments.VERSIONED) is saved or deleted.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError("'%s' takes at least a fragment name" % bits[0])
+    name = bits[1].strip('"\'')
+    depends = []
+    vary_on = []
+    for bit in bits[2:]:
+        if bit.startswith('depends='):
+            depends = bit[len('depends='):].strip('"\'').split()
+            unknown = set(depends) - set(fragments.VERSIONED.values())
+            if unknown:
+                raise template.TemplateSyntaxError("'%s' cannot depend on %s" % (bits[0], ', '.join(sorted(unknown))))
+        else:
+            vary_on.append(parser.compile_filter(bit))
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, name, vary_on, depends)
@@ -0,0 +1,31 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import derivative_name, is_stale, widths_for
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, sizes, alt='', **attrs):
+    """
+    ``{% responsive_image tutorial.thumb "300px" alt=tutorial.title class="..." style="..." %}``
+
+    Renders a lazily loaded <picture> offering the WebP and JPEG derivatives
+    of ``field_file``, or a plain <img> of the original until they exist.
+    """
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    widths = widths_for(field_file)
+    if is_stale(field_file.name, widths, field_file.storage):
+        return format_html('<img src="{}" alt="{}" loading="lazy" decoding="async"{}>', field_file.url, alt, extra)
+
+    def srcset(extension):
+        return ', '.join(f'{field_file.storage.url(derivative_name(field_file.name, width, extension))} {width}w'
+                         for width in widths)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}></picture>',
+        srcset('webp'), sizes,
+        field_file.storage.url(derivative_name(field_file.name, widths[0], 'jpg')), srcset('jpg'), sizes, alt, extra,
+    )
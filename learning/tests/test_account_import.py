@@ -0,0 +1,126 @@
+"""Bulk account imports in learning.account_import."""
+import csv
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from learning import account_import
+from learning.models import AccountImport, Course, DailySignups, Instructor, Learner, User
+
+PASSWORD = 'correct-horse-42'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountImportTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.algebra = Course.objects.create(name='Algebra')
+        cls.biology = Course.objects.create(name='Biology')
+        User.objects.create_user('taken', is_learner=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(ACCOUNT_IMPORT_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def start(self, filename, content, role='learner'):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        return AccountImport.objects.create(name=filename, source=path, role=role)
+
+    def report(self, pending):
+        with open(account_import.report_path(pending), newline='', encoding='utf-8') as report:
+            return [(int(row['row']), row['username']) for row in csv.DictReader(report)]
+
+    def test_csv_rows_become_accounts_and_bad_rows_are_reported(self):
+        pending = self.start('intake.csv', '\n'.join([
+            'username,email,first_name,last_name,password,role,interests',
+            f'ada,ada@example.com,Ada,Lovelace,{PASSWORD},,Algebra; biology',
+            f'grace,,Grace,Hopper,{PASSWORD},instructor,{self.biology.pk}',
+            f'taken,,Some,One,{PASSWORD},,',
+            f'ada,,Ada,Again,{PASSWORD},,',
+            f'bad-email,not-an-email,Bad,Email,{PASSWORD},,',
+            'weak,,Weak,Password,123,,',
+            f'lost,,Lost,Course,{PASSWORD},,Chemistry',
+            f'alan,,Alan,Turing,{PASSWORD},learner,',
+        ]))
+        progress = list(account_import.run(pending, workers=1, chunk_size=3))
+
+        self.assertEqual([step.rows_done for step in progress], [3, 6, 8])
+        pending.refresh_from_db()
+        self.assertEqual((pending.state, pending.rows_done, pending.created_count, pending.error_count),
+                         (AccountImport.DONE, 8, 3, 5))
+        self.assertEqual(self.report(pending), [(3, 'taken'), (4, 'ada'), (5, 'bad-email'), (6, 'weak'), (7, 'lost')])
+        self.assertFalse(os.path.exists(pending.source))
+
+        ada = User.objects.get(username='ada')
+        self.assertTrue(ada.is_learner and ada.check_password(PASSWORD))
+        self.assertEqual(set(Learner.objects.get(user=ada).interests.all()), {self.algebra, self.biology})
+        grace = Instructor.objects.get(user__username='grace')
+        self.assertTrue(grace.user.is_instructor)
+        self.assertEqual(list(grace.interest.all()), [self.biology])
+        self.assertEqual(DailySignups.objects.get(day=timezone.localdate()).learners, 3)
+
+    def test_an_interrupted_import_carries_on_from_its_checkpoint(self):
+        lines = [json.dumps({'username': 'learner%s' % n, 'first_name': 'Learner', 'last_name': str(n),
+                            'password': PASSWORD}) for n in range(5)]
+        lines.insert(2, '["not", "an", "object"]')
+        pending = self.start('intake.jsonl', '\n'.join(lines))
+
+        run = account_import.run(pending, workers=1, chunk_size=2)
+        next(run)
+        run.close()
+        pending.refresh_from_db()
+        self.assertEqual((pending.state, pending.rows_done), (AccountImport.RUNNING, 2))
+
+        # A report line written by a chunk that never committed is dropped on the next run
+        with open(account_import.report_path(pending), 'a', encoding='utf-8') as report:
+            report.write('3,,Not a JSON object\n')
+        list(account_import.run(pending, workers=1, chunk_size=2))
+        pending.refresh_from_db()
+        self.assertEqual((pending.state, pending.created_count, pending.error_count), (AccountImport.DONE, 5, 1))
+        self.assertEqual(User.objects.filter(username__startswith='learner').count(), 5)
+        self.assertEqual(self.report(pending), [(3, '')])
+
+        # A second run from a stale checkpoint writes nothing
+        stale = AccountImport.objects.create(name='again', source=pending.source, rows_done=0)
+        AccountImport.objects.filter(pk=stale.pk).update(rows_done=1)
+        with self.assertRaises(account_import.Superseded):
+            account_import._write(stale, 0, 2, [], [])
+
+    def test_passwords_are_hashed_on_a_process_pool(self):
+        pending = self.start('intake.csv', 'username,first_name,last_name,password\n' + ''.join(
+            f'pooled{n},Pooled,{n},{PASSWORD}\n' for n in range(4)))
+        list(account_import.run(pending, workers=2))
+        users = User.objects.filter(username__startswith='pooled')
+        self.assertEqual(len(users), 4)
+        self.assertTrue(all(user.check_password(PASSWORD) for user in users))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_admins_upload_imports_and_download_reports(self):
+        self.client.force_login(User.objects.create_user('admin', is_admin=True))
+        upload = SimpleUploadedFile('intake.csv', '\n'.join([
+            'username,first_name,last_name,password', f'uploaded,Up,Loaded,{PASSWORD}', f'taken,Some,One,{PASSWORD}',
+        ]).encode())
+        response = self.client.post('/importaccounts/', {'file': upload, 'role': 'learner'})
+        self.assertRedirects(response, '/importaccounts/')
+
+        pending = AccountImport.objects.get()
+        self.assertEqual((pending.state, pending.created_count, pending.error_count), (AccountImport.DONE, 1, 1))
+        self.assertTrue(Learner.objects.filter(user__username='uploaded').exists())
+        self.assertEqual(os.listdir(self.directory), ['%s.errors.csv' % pending.pk])
+        response = self.client.get('/importaccounts/%d/report/' % pending.pk)
+        self.assertIn(b'2,taken,username: A user with that username already exists.', b''.join(response))
+
+        self.client.post('/importaccounts/', {'file': SimpleUploadedFile('intake.xlsx', b'...'), 'role': 'learner'})
+        self.assertEqual(AccountImport.objects.count(), 1)
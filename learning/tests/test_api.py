@@ -0,0 +1,106 @@
+"""The learner JSON API (learning/api.py, learning/views/api.py)."""
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from learning.answer_keys import bump_version
+from learning.models import Answer, Course, Learner, Question, Quiz, TakenQuiz, Tutorial, User
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ApiTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name='Course')
+        instructor = User.objects.create_user('instructor', password='pw', is_instructor=True)
+        for n in range(5):
+            Tutorial.objects.create(title='Tutorial %s' % n, content='...', course=course, user=instructor)
+        cls.quiz = Quiz.objects.create(owner=instructor, name='Quiz', course=course)
+        cls.correct = []
+        for q in range(2):
+            question = Question.objects.create(quiz=cls.quiz, text='Question %s' % q)
+            cls.correct.append(Answer.objects.create(question=question, text='A right', is_correct=True))
+            Answer.objects.create(question=question, text='B wrong')
+        cls.instructor = instructor
+        cls.learner = User.objects.create_user('learner', password='pw', is_learner=True)
+        Learner.objects.create(user=cls.learner).interests.set([course])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        return response, json.loads(response.content)
+
+    def submit(self, answers):
+        response = self.client.post('/api/v1/quizzes/%d/submit/' % self.quiz.pk, json.dumps({'answers': answers}),
+                                    content_type='application/json')
+        return response, json.loads(response.content)
+
+    def test_lists_are_cursor_paginated_in_the_fields_asked_for(self):
+        response, page = self.get('/api/v1/tutorials/', fields='id,title', limit=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page['results'], [{'id': t.pk, 'title': t.title}
+                                           for t in Tutorial.objects.order_by('-created_at', '-id')[:2]])
+        titles = [row['title'] for row in page['results']]
+        while page['next']:
+            _, page = self.get('/api/v1/tutorials/', fields='title', limit=2, cursor=page['next'])
+            titles += [row['title'] for row in page['results']]
+        self.assertEqual(sorted(titles), ['Tutorial %s' % n for n in range(5)])
+
+        response, body = self.get('/api/v1/tutorials/', fields='title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', body['available'])
+
+    def test_unchanged_resources_answer_not_modified(self):
+        for path in ('/api/v1/tutorials/', '/api/v1/courses/', '/api/v1/quizzes/%d/' % self.quiz.pk):
+            etag = self.client.get(path)['ETag']
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304, path)
+        # The tutorials carry their course's name
+        etag = self.client.get('/api/v1/tutorials/')['ETag']
+        course = Course.objects.get()
+        course.name = 'Renamed'
+        course.save()
+        self.assertEqual(self.client.get('/api/v1/tutorials/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        path = '/api/v1/quizzes/%d/' % self.quiz.pk
+        etag = self.client.get(path)['ETag']
+        # What the instructor views do after editing a question
+        bump_version(self.quiz)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_quiz_hides_the_correct_answers_and_submission_grades_it(self):
+        response, quiz = self.get('/api/v1/quizzes/%d/' % self.quiz.pk)
+        self.assertEqual([len(question['answers']) for question in quiz['questions']], [2, 2])
+        self.assertNotIn('is_correct', response.content.decode())
+
+        questions = quiz['questions']
+        response, body = self.submit({str(questions[0]['id']): self.correct[0].pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(body['questions']), [str(questions[1]['id'])])
+
+        # Only plain integers are answer ids
+        for bad in ([self.correct[1].pk], True, str(self.correct[1].pk)):
+            response, body = self.submit({str(questions[0]['id']): self.correct[0].pk, str(questions[1]['id']): bad})
+            self.assertEqual(response.status_code, 400, bad)
+            self.assertEqual(list(body['questions']), [str(questions[1]['id'])])
+        self.assertFalse(TakenQuiz.objects.exists())
+
+        wrong = [answer['id'] for answer in questions[1]['answers'] if answer['id'] != self.correct[1].pk][0]
+        response, body = self.submit({str(questions[0]['id']): self.correct[0].pk, str(questions[1]['id']): wrong})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(body['score'], 50.0)
+        self.assertEqual(TakenQuiz.objects.get(learner_id=self.learner.pk).score, 50.0)
+        self.assertEqual(self.get('/api/v1/quizzes/')[1]['results'], [])
+        self.assertEqual(self.get('/api/v1/taken/', fields='quiz,score')[1]['results'],
+                         [{'quiz': self.quiz.pk, 'score': 50.0}])
+        self.assertEqual(self.submit({})[0].status_code, 409)
+
+    def test_only_signed_in_learners_get_in(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/v1/courses/').status_code, 401)
+        self.client.force_login(self.instructor)
+        self.assertEqual(self.client.get('/api/v1/courses/').status_code, 403)
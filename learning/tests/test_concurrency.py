@@ -0,0 +1,89 @@
+"""Concurrent reads for the async dashboards (learning.concurrency)."""
+import asyncio
+import re
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TransactionTestCase
+
+from learning import concurrency
+from learning.models import Answer, Course, Learner, Question, Quiz, TakenQuiz, User
+from learning.views import admin, instructor
+
+# The masked CSRF token differs on every render, in forms and in the page scripts
+CSRF_TOKEN = re.compile(r'[A-Za-z0-9]{64}')
+
+
+class GatherTests(SimpleTestCase):
+
+    def test_results_keep_their_names_and_the_limit_holds(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def call(value):
+            def run():
+                with lock:
+                    running.append(value)
+                    peak.append(len(running))
+                time.sleep(0.02)
+                with lock:
+                    running.remove(value)
+                return value * 2
+            return run
+
+        results = async_to_sync(concurrency.gather)({n: call(n) for n in range(6)}, limit=2)
+        self.assertEqual(results, {n: n * 2 for n in range(6)})
+        self.assertEqual(list(results), list(range(6)))
+        self.assertEqual(max(peak), 2)
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    # The reads run on worker threads' own connections, which cannot see a TestCase's open transaction
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('instructor', is_instructor=True)
+        self.admin = User.objects.create_user('admin', is_admin=True)
+        self.quiz = Quiz.objects.create(owner=self.instructor, name='Quiz', course=Course.objects.create(name='Course'))
+        question = Question.objects.create(quiz=self.quiz, text='Question')
+        Answer.objects.create(question=question, text='Right', is_correct=True)
+        for n in range(3):
+            learner = Learner.objects.create(user=User.objects.create_user('learner%s' % n))
+            TakenQuiz.objects.create(learner=learner, quiz=self.quiz, score=50 + n * 10)
+
+    def render(self, view, user, path, **kwargs):
+        request = RequestFactory().get(path)
+        request.user = user
+        response = view(request, **kwargs)
+        return response.render() if hasattr(response, 'render') else response
+
+    def render_async(self, view, user, path, **kwargs):
+        request = AsyncRequestFactory().get(path)
+
+        async def auser():
+            return user
+        request.auser = auser
+        return asyncio.run(view(request, **kwargs))
+
+    def assertSamePage(self, sync, async_):
+        self.assertEqual(sync.status_code, 200)
+        self.assertEqual(async_.status_code, 200)
+        self.assertEqual(CSRF_TOKEN.sub('', sync.content.decode()), CSRF_TOKEN.sub('', async_.content.decode()))
+
+    def test_async_views_render_the_sync_pages(self):
+        self.assertSamePage(self.render(instructor.home_instructor, self.instructor, '/instructor/'),
+                            self.render_async(instructor.home_instructor_async, self.instructor, '/instructor/'))
+        path = '/quiz/%d/results/' % self.quiz.pk
+        self.assertSamePage(self.render(instructor.QuizResultsView.as_view(), self.instructor, path, pk=self.quiz.pk),
+                            self.render_async(instructor.quiz_results_async, self.instructor, path, pk=self.quiz.pk))
+        self.assertSamePage(self.render(admin.dashboard, self.admin, '/dashboard/'),
+                            self.render_async(admin.dashboard_async, self.admin, '/dashboard/'))
+
+    def test_async_views_check_the_role(self):
+        response = self.render_async(instructor.home_instructor_async, self.admin, '/instructor/')
+        self.assertEqual(response.status_code, 302)
+        response = self.render_async(admin.dashboard_async, self.instructor, '/dashboard/')
+        self.assertEqual(response.status_code, 302)
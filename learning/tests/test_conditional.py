@@ -0,0 +1,99 @@
+"""Conditional GETs and the shared response cache (learning.conditional)."""
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from learning.models import Announcement, ContentVersion, Course, Learner, Tutorial, User
+
+
+class ConditionalTests(TestCase):
+    # The learner pages read through the read-only alias under SQLITE_PRODUCTION
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name='Biology')
+        cls.instructor = User.objects.create_user('instructor', password='pw', is_instructor=True)
+        cls.learner = User.objects.create_user('learner', password='pw', is_learner=True)
+        Learner.objects.create(user=cls.learner)
+        cls.tutorial = Tutorial.objects.create(title='Cells', content='', course=cls.course, user=cls.instructor)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return first, self.client.get(url, headers={'If-None-Match': first['ETag']})
+
+    def test_not_modified_until_the_rows_change(self):
+        first, second = self.revalidate('/ltutorial/')
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        self.assertTrue(first.has_header('Last-Modified'))
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.content, b'')
+
+        self.tutorial.title = 'Genes'
+        self.tutorial.save()
+        changed = self.client.get('/ltutorial/', headers={'If-None-Match': first['ETag']})
+        self.assertContains(changed, 'Genes')
+
+        other = Tutorial.objects.create(title='Plants', content='', course=self.course, user=self.instructor)
+        current = self.client.get('/ltutorial/')['ETag']
+        other.delete()
+        self.assertEqual(self.client.get('/ltutorial/', headers={'If-None-Match': current}).status_code, 200)
+
+    def test_renamed_course_or_author_changes_the_tag(self):
+        list_etag = self.client.get('/ltutorial/')['ETag']
+        detail_url = '/tutorials/%s/' % self.tutorial.pk
+        detail_etag = self.client.get(detail_url)['ETag']
+
+        self.course.name = 'Botany'
+        self.course.save()
+        self.assertContains(self.client.get('/ltutorial/', headers={'If-None-Match': list_etag}), 'Botany')
+        self.instructor.username = 'lecturer'
+        self.instructor.save()
+        self.assertContains(self.client.get(detail_url, headers={'If-None-Match': detail_etag}), 'lecturer')
+
+    def test_a_change_recorded_by_another_process_changes_the_tag(self):
+        first, second = self.revalidate('/ltutorial/')
+        self.assertEqual(second.status_code, 304)
+        # What fragments.bump('course') writes when a worker or another server process renames a course
+        ContentVersion.objects.filter(kind='course').update(version=F('version') + 1)
+        self.assertEqual(self.client.get('/ltutorial/', headers={'If-None-Match': first['ETag']}).status_code, 200)
+
+    def test_renamed_announcement_author_changes_the_tag(self):
+        Announcement.objects.create(user=self.instructor, content='Exams on Monday')
+        admin = User.objects.create_user('admin', password='pw', is_admin=True)
+        for user, url in ((self.learner, '/learnerallannonce/'), (self.instructor, '/instructorallannonce/'),
+                          (admin, '/allannonce/')):
+            self.client.force_login(user)
+            etag = self.client.get(url)['ETag']
+            self.instructor.username = 'lecturer-%s' % user.pk
+            self.instructor.save()
+            self.assertContains(self.client.get(url, headers={'If-None-Match': etag}), 'lecturer-%s' % user.pk)
+
+    def test_detail_and_announcement_lists(self):
+        for url in ('/tutorials/%s/' % self.tutorial.pk, '/learnerallannonce/', '/grades/'):
+            self.assertEqual(self.revalidate(url)[1].status_code, 304, url)
+
+    def test_tag_covers_the_user(self):
+        etag = self.client.get('/ltutorial/')['ETag']
+        other = User.objects.create_user('other', password='pw', is_learner=True)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/ltutorial/', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_other_roles_are_still_redirected(self):
+        self.client.force_login(self.instructor)
+        self.assertRedirects(self.client.get('/ltutorial/'), '/', fetch_redirect_response=False)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_home_is_shared_between_anonymous_visitors(self):
+        self.client.logout()
+        self.assertTemplateUsed(self.client.get('/'), 'home.html')
+        self.assertTemplateNotUsed(self.client.get('/'), 'home.html')
+
+        self.client.force_login(self.learner)
+        self.assertContains(self.client.get('/'), 'learner')
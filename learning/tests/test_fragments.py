@@ -0,0 +1,143 @@
+"""Fragment caching and its content versions (learning.fragments)."""
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import multiprocessing
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import django
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template import RequestContext, Template, TemplateSyntaxError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from PIL import Image
+
+from learning import fragments, jobs
+from learning.models import ContentVersion, Course, Job, Learner, Tutorial, User
+
+TITLES = Template('{% load fragments %}{% fragment "titles" page depends="tutorial" %}'
+                  '{% for tutorial in tutorials %}{{ tutorial.title }};{% endfor %}{% endfragment %}')
+
+
+def _create_table():
+    with connection.schema_editor() as editor:
+        editor.create_model(ContentVersion)
+
+
+class FragmentTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name='Biology')
+        cls.admin = User.objects.create_user('admin', password='pw', is_admin=True)
+        cls.instructor = User.objects.create_user('instructor', password='pw', is_instructor=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, user, page=1):
+        request = RequestFactory().get('/')
+        request.user = user
+        return TITLES.render(RequestContext(request, {'page': page, 'tutorials': Tutorial.objects.order_by('pk')}))
+
+    def counts(self, name):
+        return next(((hits, misses) for n, hits, misses in fragments.stats() if n == name), (0, 0))
+
+    def test_cached_until_content_changes(self):
+        tutorial = Tutorial.objects.create(title='Cells', content='', course=self.course, user=self.instructor)
+        hits, misses = self.counts('titles')
+        self.assertEqual(self.render(self.instructor), 'Cells;')
+        # Only the content version is read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.render(self.instructor), 'Cells;')
+        self.assertEqual(self.counts('titles'), (hits + 1, misses + 1))
+
+        tutorial.title = 'Genes'
+        tutorial.save()
+        self.assertEqual(self.render(self.instructor), 'Genes;')
+        tutorial.delete()
+        self.assertEqual(self.render(self.instructor), '')
+        # Course changes do not touch a fragment that only depends on tutorials
+        Course.objects.create(name='History')
+        self.assertEqual(self.counts('titles'), (hits + 1, misses + 3))
+        self.render(self.instructor)
+        self.assertEqual(self.counts('titles'), (hits + 2, misses + 3))
+
+    def test_keyed_by_user_and_vary_values(self):
+        Tutorial.objects.create(title='Cells', content='', course=self.course, user=self.instructor)
+        self.render(self.instructor)
+        hits, misses = self.counts('titles')
+        self.render(self.admin)
+        self.render(self.instructor, page=2)
+        self.assertEqual(self.counts('titles'), (hits, misses + 2))
+
+    def test_bump(self):
+        [before] = fragments.versions(['course'])
+        fragments.bump('course')
+        self.assertEqual(fragments.versions(['course']), [before + 1])
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load fragments %}{% fragment "x" depends="quiz" %}{% endfragment %}')
+
+    def test_course_table_skips_its_query_when_cached(self):
+        self.client.force_login(self.admin)
+        self.client.get('/course/')
+        Course.objects.create(name='History')
+        with CaptureQueriesContext(connection) as miss:
+            self.assertContains(self.client.get('/course/'), 'History')
+        with CaptureQueriesContext(connection) as hit:
+            self.assertContains(self.client.get('/course/'), 'History')
+        self.assertEqual(len(hit), len(miss) - 1)
+
+    def test_sidebar_is_keyed_by_the_viewer_not_the_context_user(self):
+        learner = User.objects.create_user('learner', password='pw', is_learner=True)
+        Learner.objects.create(user=learner)
+        # The delete confirmation has the learner being deleted as its ``user``
+        self.client.force_login(self.admin)
+        self.client.get('/admindeleteuser/%d' % learner.pk)
+        self.client.force_login(learner)
+        response = self.client.get('/learner/')
+        self.assertContains(response, 'Logged As learner')
+        for admin_link in ('/allusers/', '/course/', '/dashboard/'):
+            self.assertNotContains(response, 'href="%s"' % admin_link)
+
+    def test_tutorial_cards_pick_up_thumbnail_derivatives(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root, MEDIA_OFFLOAD=''):
+            learner = User.objects.create_user('learner', password='pw', is_learner=True)
+            self.client.force_login(learner)
+            buffer = BytesIO()
+            Image.new('RGB', (800, 600), 'green').save(buffer, 'PNG')
+            Tutorial.objects.create(title='Cells', content='', course=self.course, user=self.instructor,
+                                    thumb=SimpleUploadedFile('cells.png', buffer.getvalue()))
+            # Rendered before the queued job has run: the cards hold the plain original
+            self.assertNotContains(self.client.get('/ltutorial/'), 'srcset')
+
+            job = Job.objects.get(name='learning.images.make_derivatives')
+            jobs.execute(job.name, job.args, job.kwargs)
+            self.assertContains(self.client.get('/ltutorial/'), 'srcset')
+
+
+class CrossProcessTests(SimpleTestCase):
+
+    def test_a_bump_in_one_process_reaches_the_others(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # Two processes of their own, like a server process and the job worker, on one database file
+        environ = mock.patch.dict(os.environ, DATABASE_NAME=os.path.join(directory, 'db.sqlite3'))
+        options = {'max_workers': 1, 'mp_context': multiprocessing.get_context('spawn'), 'initializer': django.setup}
+        with environ, ProcessPoolExecutor(**options) as web, ProcessPoolExecutor(**options) as worker:
+            web.submit(_create_table).result()
+            worker.submit(fragments.bump, 'course').result()
+            [course, tutorial] = web.submit(fragments.versions, ['course', 'tutorial']).result()
+            worker.submit(fragments.bump, 'course').result()
+            self.assertEqual(web.submit(fragments.versions, ['course', 'tutorial']).result(), [course + 1, tutorial])
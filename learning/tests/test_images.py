@@ -0,0 +1,34 @@
+"""Derivative names and staleness in learning.images."""
+from io import BytesIO
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+from PIL import Image
+
+from learning.images import derivative_name, generate, is_stale
+
+
+class DerivativeTests(SimpleTestCase):
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = FileSystemStorage(location=location)
+
+    def save(self, name, image_format):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'green').save(buffer, image_format)
+        return self.storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_originals_differing_only_in_extension_keep_their_own_copies(self):
+        png = self.save('covers/a.png', 'PNG')
+        jpg = self.save('covers/a.jpg', 'JPEG')
+        self.assertEqual(derivative_name(png, 300, 'webp'), 'covers/a.png.300w.webp')
+
+        written = generate(png, (100, 300), storage=self.storage)
+        self.assertNotIn(derivative_name(jpg, 300, 'jpg'), written)
+        self.assertFalse(is_stale(png, (100, 300), storage=self.storage))
+        self.assertTrue(is_stale(jpg, (100, 300), storage=self.storage))
@@ -0,0 +1,81 @@
+"""Item statistics on the quiz results page (learning.item_analysis)."""
+from django.core.cache import cache
+from django.test import TestCase
+import numpy as np
+
+from learning import item_analysis
+from learning.models import Answer, Course, Learner, LearnerAnswer, Question, Quiz, TakenQuiz, User
+
+# Picks per learner (answer index per question, None = skipped); answer 0 is correct
+RESPONSES = [
+    [0, 0, 0],
+    [0, 0, 1],
+    [0, 1, 1],
+    [1, 0, None],
+    [0, 2, 0],
+    [1, 1, 1],
+]
+
+
+class ItemAnalysisTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('instructor', password='pw', is_instructor=True)
+        cls.quiz = Quiz.objects.create(owner=instructor, name='Quiz', course=Course.objects.create(name='Course'))
+        cls.answers = []
+        for q in range(3):
+            question = Question.objects.create(quiz=cls.quiz, text='Question %s' % q)
+            cls.answers.append([Answer.objects.create(question=question, text='Answer %s' % a, is_correct=a == 0)
+                                for a in range(3)])
+        cls.learners = [Learner.objects.create(user=User.objects.create_user('learner%s' % i, password='pw'))
+                        for i in range(len(RESPONSES))]
+
+    def setUp(self):
+        cache.clear()
+
+    def take(self, learner, picks):
+        for question, pick in enumerate(picks):
+            if pick is not None:
+                LearnerAnswer.objects.create(student=learner, answer=self.answers[question][pick])
+        TakenQuiz.objects.create(learner=learner, quiz=self.quiz, score=0)
+
+    def expected(self, responses):
+        x = np.array([[pick == 0 for pick in picks] for picks in responses], dtype=float)
+        rest = x.sum(axis=1)[:, None] - x
+        return x.mean(axis=0), [np.corrcoef(x[:, j], rest[:, j])[0, 1] for j in range(x.shape[1])]
+
+    def test_statistics_match_a_direct_computation(self):
+        for learner, picks in zip(self.learners, RESPONSES):
+            self.take(learner, picks)
+        items = item_analysis.analyse(self.quiz)
+        difficulty, discrimination = self.expected(RESPONSES)
+        np.testing.assert_allclose([item['difficulty'] for item in items], difficulty)
+        np.testing.assert_allclose([item['discrimination'] for item in items], discrimination)
+        self.assertEqual([option['picks'] for option in items[1]['answers']], [3, 2, 1])
+        self.assertEqual([option['picks'] for option in items[2]['answers']], [2, 3, 0])
+
+    def test_new_attempts_are_added_incrementally(self):
+        for learner, picks in zip(self.learners[:3], RESPONSES[:3]):
+            self.take(learner, picks)
+        item_analysis.analyse(self.quiz)
+        for learner, picks in zip(self.learners[3:], RESPONSES[3:]):
+            self.take(learner, picks)
+        # Answer key cached; one query for the new attempts and one for their answers
+        with self.assertNumQueries(2):
+            items = item_analysis.analyse(self.quiz)
+        np.testing.assert_allclose([item['difficulty'] for item in items], self.expected(RESPONSES)[0])
+        with self.assertNumQueries(1):
+            item_analysis.analyse(self.quiz)
+
+        TakenQuiz.objects.filter(learner=self.learners[0]).delete()
+        LearnerAnswer.objects.filter(student=self.learners[0]).delete()
+        items = item_analysis.analyse(self.quiz)
+        np.testing.assert_allclose([item['difficulty'] for item in items], self.expected(RESPONSES[1:])[0])
+
+    def test_undefined_discrimination(self):
+        self.take(self.learners[0], [0, 0, 0])
+        items = item_analysis.analyse(self.quiz)
+        self.assertEqual([item['difficulty'] for item in items], [1.0, 1.0, 1.0])
+        self.assertEqual([item['discrimination'] for item in items], [None, None, None])
+        self.assertTrue(all(item['flagged'] for item in items))
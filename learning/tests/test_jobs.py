@@ -0,0 +1,73 @@
+"""Claiming, retrying and settling jobs in learning.jobs."""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from learning import jobs
+from learning.models import Job
+
+calls = []
+
+
+@jobs.task(name='tests.record', max_retries=1, retry_backoff=30, visibility_timeout=60)
+def record(value):
+    calls.append(value)
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_claim_runs_highest_priority_first(self):
+        record.delay('low')
+        record.apply_async(('high',), priority=9)
+        record.apply_async(('later',), countdown=60)
+
+        claimed = jobs.claim(['tests.record'], 10)
+        self.assertEqual([job.args for job in claimed], [['high'], ['low']])
+        self.assertTrue(all(job.state == Job.RUNNING and job.attempts == 1 for job in claimed))
+        # Invisible while claimed, so a second worker gets nothing
+        self.assertEqual(jobs.claim(['tests.record'], 10), [])
+
+        for job in claimed:
+            jobs.execute(job.name, job.args, job.kwargs)
+            jobs.succeeded(job)
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_expired_claim_is_taken_over_and_the_old_worker_cannot_settle_it(self):
+        record.delay('x')
+        [stale] = jobs.claim(['tests.record'], 1)
+        Job.objects.update(visible_at=timezone.now() - timedelta(seconds=1))
+        [current] = jobs.claim(['tests.record'], 1)
+
+        jobs.succeeded(stale)
+        self.assertTrue(Job.objects.filter(pk=current.pk).exists())
+        jobs.succeeded(current)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        record.delay('x')
+        [job] = jobs.claim(['tests.record'], 1)
+        with self.assertLogs('learning.jobs', 'WARNING'):
+            jobs.failed(job, ValueError('boom'))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.QUEUED)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.visible_at, timezone.now() + timedelta(seconds=25))
+
+        Job.objects.update(visible_at=timezone.now())
+        [job] = jobs.claim(['tests.record'], 1)
+        with self.assertLogs('learning.jobs', 'ERROR'):
+            jobs.failed(job, ValueError('boom'))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertEqual(jobs.claim(['tests.record'], 1), [])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_inline(self):
+        record.delay('now')
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
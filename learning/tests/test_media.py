@@ -0,0 +1,84 @@
+"""Role checks, validators and byte ranges in learning.media."""
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from learning.media import parse_range
+from learning.models import User
+
+CONTENT = bytes(range(256)) * 40
+
+
+class MediaTests(TestCase):
+    # serve_media reads through the read-only alias under SQLITE_PRODUCTION
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.media_root, 'notes', 'files'))
+        with open(os.path.join(cls.media_root, 'notes', 'files', 'lecture.pdf'), 'wb') as f:
+            f.write(CONTENT)
+        cls.settings = override_settings(MEDIA_ROOT=cls.media_root, MEDIA_OFFLOAD='')
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('learner', password='pw', is_learner=True))
+
+    def get(self, **headers):
+        return self.client.get('/media/notes/files/lecture.pdf', headers=headers)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+        self.assertFalse(parse_range('bytes=1000-', 1000))
+        # Malformed or multiple ranges: send the whole file
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+
+    def test_whole_file_and_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_range(self):
+        response = self.get(range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/%d' % len(CONTENT))
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100:200])
+        self.assertEqual(self.get(range='bytes=%d-' % len(CONTENT)).status_code, 416)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(range='bytes=0-9', if_range=etag).status_code, 206)
+        # The file changed since the client's copy: send all of it
+        self.assertEqual(self.get(range='bytes=0-9', if_range='"stale"').status_code, 200)
+
+    def test_access(self):
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.client.force_login(User.objects.create_user('norole', password='pw'))
+        self.assertRedirects(self.get(), '/')
+        self.client.logout()
+        self.assertEqual(self.get().status_code, 302)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect', MEDIA_OFFLOAD_PREFIX='/protected-media/')
+    def test_offload(self):
+        response = self.get(range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/notes/files/lecture.pdf')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,61 @@
+"""Statement fingerprints and the N+1 detector (learning.nplusone)."""
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from learning.models import Course, Tutorial, User
+from learning.nplusone import NPlusOneError, QueryRepetitionMiddleware, allow, fingerprint
+
+ROWS = Template('{% for tutorial in tutorials %}\n{{ tutorial.user.username }}\n{% endfor %}')
+
+
+def lazy_rows(request):
+    return HttpResponse(ROWS.render(Context({'tutorials': Tutorial.objects.all()})))
+
+
+def joined_rows(request):
+    return HttpResponse(ROWS.render(Context({'tutorials': Tutorial.objects.select_related('user')})))
+
+
+def allowed_rows(request):
+    with allow():
+        return lazy_rows(request)
+
+
+class NPlusOneTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name='Course')
+        for n in range(4):
+            user = User.objects.create_user('instructor%s' % n, password='pw', is_instructor=True)
+            Tutorial.objects.create(title='Tutorial %s' % n, content='', course=course, user=user)
+
+    def run_view(self, view, **settings):
+        with override_settings(NPLUSONE_THRESHOLD=2, **settings):
+            return QueryRepetitionMiddleware(view)(RequestFactory().get('/tutorials/'))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT  *\n FROM "t" WHERE "id" = %s AND name = \'it\'\'s\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" = ? AND name = ? LIMIT ?')
+        self.assertEqual(fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+                         fingerprint('SELECT * FROM "t" WHERE "id" IN (%s)'))
+
+    def test_reports_the_template_line_and_the_view(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            self.run_view(lazy_rows, NPLUSONE_RAISE=True)
+        message = str(raised.exception)
+        self.assertIn('GET /tutorials/ repeated 1 statement shape(s) more than 2 times', message)
+        self.assertIn('4x SELECT', message)
+        self.assertIn('line 2: tutorial.user.username', message)
+        self.assertIn('learning/tests/test_nplusone.py', message)
+        self.assertIn('in lazy_rows', message)
+
+    def test_logs_outside_tests(self):
+        with self.assertLogs('learning.nplusone', 'WARNING'):
+            self.assertEqual(self.run_view(lazy_rows, NPLUSONE_RAISE=False).status_code, 200)
+
+    def test_joined_and_allowed_queries_pass(self):
+        self.run_view(joined_rows, NPLUSONE_RAISE=True)
+        self.run_view(allowed_rows, NPLUSONE_RAISE=True)
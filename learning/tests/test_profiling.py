@@ -0,0 +1,65 @@
+"""Server-Timing headers and the slow-request buffer (learning.profiling)."""
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from learning import profiling
+from learning.models import User
+
+PROFILED = ['learning.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE
+
+
+def timings(response):
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        entries[name] = dict(param.split('=', 1) for param in params)
+    return entries
+
+
+class ProfilingTests(TestCase):
+    # The admin pages read through the read-only alias under SQLITE_PRODUCTION
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_admin=True)
+        cls.learner = User.objects.create_user('learner', password='pw', is_learner=True)
+
+    def setUp(self):
+        profiling.clear()
+        self.client.force_login(self.admin)
+
+    def test_off_by_default(self):
+        self.assertFalse(self.client.get('/allusers/').has_header('Server-Timing'))
+
+    @override_settings(MIDDLEWARE=PROFILED, PROFILING=True, PROFILING_SLOW_MS=0)
+    def test_timings_and_slow_request_buffer(self):
+        response = self.client.get('/allusers/?q=1')
+        entries = timings(response)
+        self.assertEqual(set(entries), {'sql', 'tpl', 'view', 'total'})
+        self.assertGreater(float(entries['tpl']['dur']), 0)
+        self.assertLessEqual(float(entries['view']['dur']), float(entries['total']['dur']))
+
+        [profile] = profiling.recent()
+        self.assertEqual((profile['method'], profile['path'], profile['view'], profile['status']),
+                         ('GET', '/allusers/?q=1', 'allusers', 200))
+        self.assertEqual(entries['sql']['desc'], '"%d queries"' % profile['query_count'])
+        self.assertGreater(profile['query_count'], 0)
+        self.assertLessEqual(len(profile['top_queries']), profiling.TOP_QUERIES)
+        self.assertLessEqual(sum(query['count'] for query in profile['top_queries']), profile['query_count'])
+        ms = [query['ms'] for query in profile['top_queries']]
+        self.assertEqual(ms, sorted(ms, reverse=True))
+
+        response = self.client.get('/profiling/')
+        self.assertContains(response, '/allusers/?q=1')
+        self.client.post('/profiling/')
+        self.assertEqual(len(profiling.recent()), 1)  # the POST itself was slow enough to keep
+
+    @override_settings(MIDDLEWARE=PROFILED, PROFILING=True, PROFILING_SLOW_MS=60000)
+    def test_fast_requests_are_not_kept(self):
+        self.assertTrue(self.client.get('/allusers/').has_header('Server-Timing'))
+        self.assertEqual(profiling.recent(), [])
+
+    def test_admins_only(self):
+        self.client.force_login(self.learner)
+        self.assertRedirects(self.client.get('/profiling/'), '/', fetch_redirect_response=False)
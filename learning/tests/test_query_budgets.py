@@ -0,0 +1,240 @@
+"""
+Query-count budgets for every named route in learning/urls.py.
+
+Each route is requested as the role that uses it, against a seeded dataset
+large enough for an N+1 to show up, and must stay within the number of
+queries listed in BUDGETS. Tighten a budget whenever a view gets cheaper; a
+route added to urls.py without a budget fails ``test_every_route_has_a_budget``.
+"""
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from learning import urls
+from learning.notifications import unread_count
+from learning.models import (AccountImport, Announcement, Answer, Course, Instructor, Learner, LearnerAnswer, Notes,
+                             Question, Quiz, TakenQuiz, Tutorial, Upload, User)
+
+COURSES = 4
+INSTRUCTORS = 3
+LEARNERS = 12
+QUIZZES_PER_INSTRUCTOR = 4
+QUESTIONS_PER_QUIZ = 5
+ANSWERS_PER_QUESTION = 4
+ITEMS_PER_INSTRUCTOR = 6
+
+# url name: (role, method, max queries)
+BUDGETS = {
+    # Shared
+    'home': (None, 'get', 0),
+    'signup': (None, 'get', 0),
+    'login_form': (None, 'get', 0),
+    'login': (None, 'get', 0),
+    'logout': ('learner', 'get', 4),
+    'announcementstream': ('learner', 'get', 2),
+    'notifications': ('learner', 'get', 4),
+    'notificationsread': ('learner', 'post', 4),
+    'media': ('learner', 'get', 2),
+
+    # Admin
+    'dashboard': ('admin', 'get', 3),
+    'course': ('admin', 'get', 5),
+    'deletecourse': ('admin', 'get', 4),
+    'addinstructor': ('admin', 'get', 4),
+    'addlearner': ('admin', 'get', 4),
+    'addanonce': ('admin', 'get', 3),
+    'allannonce': ('admin', 'get', 6),
+    'deleteannonce': ('admin', 'get', 4),
+    'allusers': ('admin', 'get', 4),
+    'admindeleteuser': ('admin', 'get', 4),
+    'create_user_form': ('admin', 'get', 4),
+    'create_user': ('admin', 'get', 2),
+    'makeadmin': ('admin', 'get', 2),
+    'removeadmin': ('admin', 'get', 2),
+    'adminprofile': ('admin', 'get', 3),
+    'updatepassword': ('admin', 'get', 3),
+    'profiling': ('admin', 'get', 3),
+    'importaccounts': ('admin', 'get', 4),
+    'importreport': ('admin', 'get', 3),
+
+    # Instructor
+    'instructor': ('instructor', 'get', 13),
+    'annonce': ('instructor', 'get', 3),
+    'instructorallannonce': ('instructor', 'get', 6),
+    'quiz_add': ('instructor', 'get', 4),
+    'quiz_change_list': ('instructor', 'get', 4),
+    'quiz_results': ('instructor', 'get', 8),
+    'quiz_delete': ('instructor', 'get', 4),
+    'quiz_change': ('instructor', 'get', 7),
+    'question_add': ('instructor', 'get', 4),
+    'question_change': ('instructor', 'get', 6),
+    'question_delete': ('instructor', 'get', 6),
+    'tutorial': ('instructor', 'get', 5),
+    'deleteTutorial': ('instructor', 'get', 7),
+    'lnotes': ('instructor', 'get', 5),
+    'iadd_notes': ('instructor', 'get', 4),
+    'update_file': ('instructor', 'get', 3),
+    'publish_notes': ('instructor', 'get', 2),
+    'publish_tutorial': ('instructor', 'get', 2),
+    'upload_start': ('instructor', 'post', 2),
+    'upload': ('instructor', 'get', 3),
+    'itutorial': ('instructor', 'get', 5),
+    'itutorial-detail': ('instructor', 'get', 6),
+    'instructorprofile': ('instructor', 'get', 3),
+
+    # Learner
+    'learner': ('learner', 'get', 3),
+    'learnerallannonce': ('learner', 'get', 6),
+    'learnerprofile': ('learner', 'get', 3),
+    'learnerupdatepassword': ('learner', 'get', 3),
+    'grades': ('learner', 'get', 6),
+    'ltutorial': ('learner', 'get', 7),
+    'search': ('learner', 'get', 3),
+    'tutorial-detail': ('learner', 'get', 8),
+    'interests': ('learner', 'get', 6),
+    'lquiz_list': ('learner', 'get', 7),
+    'taken_quiz_list': ('learner', 'get', 6),
+    'take_quiz': ('learner', 'get', 9),
+
+    # JSON API
+    'api-courses': ('learner', 'get', 3),
+    'api-tutorials': ('learner', 'get', 5),
+    'api-tutorial': ('learner', 'get', 5),
+    'api-notes': ('learner', 'get', 5),
+    'api-quizzes': ('learner', 'get', 3),
+    'api-quiz': ('learner', 'get', 7),
+    'api-quiz-submit': ('learner', 'post', 2),
+    'api-taken': ('learner', 'get', 4),
+}
+
+
+def _url_kwargs(data):
+    # Arguments for the routes that take them, pointing at objects owned by the requesting role
+    quiz = data.instructor_quiz
+    return {
+        'media': {'path': data.notes.file.name},
+        'deletecourse': {'course_id': data.courses[-1].pk},
+        'deleteannonce': {'pk': data.announcement.pk},
+        'admindeleteuser': {'pk': data.spare_user.pk},
+        'importreport': {'pk': data.account_import.pk},
+        'quiz_results': {'pk': quiz.pk},
+        'quiz_delete': {'pk': quiz.pk},
+        'quiz_change': {'pk': quiz.pk},
+        'question_add': {'pk': quiz.pk},
+        'question_change': {'quiz_pk': quiz.pk, 'question_pk': quiz.questions.first().pk},
+        'question_delete': {'quiz_pk': quiz.pk, 'question_pk': quiz.questions.first().pk},
+        'deleteTutorial': {'tutorial_id': data.tutorial.pk},
+        'update_file': {'pk': data.notes.pk},
+        'upload': {'pk': data.upload.pk},
+        'tutorial-detail': {'pk': data.tutorial.pk},
+        'itutorial-detail': {'pk': data.tutorial.pk},
+        'take_quiz': {'pk': data.open_quiz.pk},
+        'api-tutorial': {'pk': data.tutorial.pk},
+        'api-quiz': {'pk': data.open_quiz.pk},
+        'api-quiz-submit': {'pk': data.open_quiz.pk},
+    }
+
+
+@override_settings(READ_MARKER_FLUSH_INTERVAL=0,
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [Course.objects.create(name='Course %s' % i) for i in range(COURSES)]
+        cls.admin = User.objects.create_user('admin', password='pw', is_admin=True)
+        cls.spare_user = User.objects.create_user('spare', password='pw', is_learner=True)
+
+        instructors = []
+        for i in range(INSTRUCTORS):
+            user = User.objects.create_user('instructor%s' % i, password='pw', is_instructor=True)
+            Instructor.objects.create(user=user).interest.set(cls.courses)
+            instructors.append(user)
+        cls.instructor = instructors[0]
+
+        learners = []
+        for i in range(LEARNERS):
+            user = User.objects.create_user('learner%s' % i, password='pw', is_learner=True)
+            learner = Learner.objects.create(user=user)
+            learner.interests.set(cls.courses)
+            learners.append(learner)
+        cls.learner = learners[0].user
+
+        quizzes = []
+        for owner in instructors:
+            for i in range(QUIZZES_PER_INSTRUCTOR):
+                quiz = Quiz.objects.create(owner=owner, name='%s quiz %s' % (owner.username, i),
+                                           course=cls.courses[i % COURSES])
+                for q in range(QUESTIONS_PER_QUIZ):
+                    question = Question.objects.create(quiz=quiz, text='Question %s' % q)
+                    Answer.objects.bulk_create([
+                        Answer(question=question, text='Answer %s' % a, is_correct=a == 0)
+                        for a in range(ANSWERS_PER_QUESTION)
+                    ])
+                quizzes.append(quiz)
+            for i in range(ITEMS_PER_INSTRUCTOR):
+                course = cls.courses[i % COURSES]
+                Tutorial.objects.create(title='Tutorial %s' % i, content='...', course=course, user=owner,
+                                        thumb='tutorials/thumbnails/seed.png')
+                Notes.objects.create(title='Notes %s' % i, course=course, user=owner,
+                                     file='notes/files/seed.pdf', cover='notes/covers/seed.png')
+                Announcement.objects.create(user=owner, content='Announcement %s' % i)
+
+        # Every learner has taken all but the last quiz, answering every question
+        cls.open_quiz = quizzes[-1]
+        for learner in learners:
+            for n, quiz in enumerate(quizzes[:-1]):
+                answers = Answer.objects.filter(question__quiz=quiz, text='Answer %s' % (n % 2))
+                LearnerAnswer.objects.bulk_create([LearnerAnswer(student=learner, answer=a) for a in answers])
+                TakenQuiz.objects.create(learner=learner, quiz=quiz, score=100.0 if n % 2 == 0 else 0.0)
+
+        cls.instructor_quiz = cls.instructor.quizzes.first()
+        cls.tutorial = Tutorial.objects.filter(user=cls.instructor).first()
+        cls.notes = Notes.objects.filter(user=cls.instructor).first()
+        cls.announcement = Announcement.objects.first()
+        cls.upload = Upload.objects.create(user=cls.instructor, filename='seed.pdf', size=1024)
+        cls.account_import = AccountImport.objects.create(created_by=cls.admin, name='seed.csv', source='seed.csv')
+        cls.users = {'admin': cls.admin, 'instructor': cls.instructor, 'learner': cls.learner}
+        for user in cls.users.values():
+            # Seed the badge counters so routes are measured in the steady state
+            unread_count(user)
+
+    def setUp(self):
+        # Answer keys and read markers live in the cache; start every route cold
+        cache.clear()
+
+    def assertWithinBudget(self, name):
+        role, method, budget = BUDGETS[name]
+        if role:
+            self.client.force_login(self.users[role])
+        url = reverse(name, kwargs=_url_kwargs(self).get(name))
+        # Count every alias, so routing reads elsewhere (SQLITE_PRODUCTION) cannot hide queries
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+            response = getattr(self.client, method)(url)
+        queries = [query['sql'] for ctx in captured for query in ctx.captured_queries]
+        self.assertLess(response.status_code, 500)
+        if len(queries) > budget:
+            self.fail('%s %s ran %d queries, budget is %d:\n%s' % (
+                method.upper(), url, len(queries), budget,
+                '\n'.join('%d. %s' % (i, sql) for i, sql in enumerate(queries, 1))))
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if isinstance(pattern, URLPattern) and pattern.name}
+        self.assertEqual(sorted(names - set(BUDGETS)), [], 'Add these routes to BUDGETS')
+        self.assertEqual(sorted(set(BUDGETS) - names), [], 'Remove these routes from BUDGETS')
+
+
+def _budget_test(name):
+    def test(self):
+        self.assertWithinBudget(name)
+    test.__name__ = 'test_%s' % name.replace('-', '_')
+    return test
+
+for _name in BUDGETS:
+    setattr(QueryBudgetTests, 'test_%s' % _name.replace('-', '_'), _budget_test(_name))
@@ -0,0 +1,83 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot querysets.
+
+Each queryset below mirrors one the views run on every request. The test
+fails if SQLite plans a full scan of a table or has to sort rows for an
+ORDER BY, which means the index meant for it was dropped or no longer
+matches the query.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Avg, Count, F
+from django.test import TestCase
+from django.utils import timezone
+
+from learning.models import (Announcement, Answer, Course, Learner, LearnerAnswer, Notes, Question, Quiz,
+                             TakenQuiz, Tutorial, User)
+from learning.pagination import CursorPaginator
+
+# A bare "SCAN learning_tutorial" (no "USING ... INDEX") is a full table scan
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username='instructor', is_instructor=True)
+        cls.learner = Learner.objects.create(user=User.objects.create(username='learner', is_learner=True))
+        cls.course = Course.objects.create(name='Course')
+        cls.quiz = Quiz.objects.create(owner=cls.instructor, name='Quiz', course=cls.course)
+        question = Question.objects.create(quiz=cls.quiz, text='Question')
+        cls.answers = Answer.objects.bulk_create([Answer(question=question, text=str(i)) for i in range(4)])
+        LearnerAnswer.objects.create(student=cls.learner, answer=cls.answers[0])
+        TakenQuiz.objects.create(learner=cls.learner, quiz=cls.quiz, score=100)
+        Tutorial.objects.create(title='Tutorial', content='...', course=cls.course, user=cls.instructor)
+        Notes.objects.create(title='Notes', course=cls.course, user=cls.instructor)
+        Announcement.objects.create(user=cls.instructor, content='Announcement')
+
+    def hot_querysets(self):
+        now = timezone.now()
+        answer_ids = [answer.pk for answer in self.answers]
+        return {
+            'announcement list': Announcement.objects.filter(posted_at__lt=now).order_by('-posted_at'),
+            'unread announcements': Announcement.objects.filter(posted_at__gt=now - timedelta(days=1))
+                .exclude(user=self.learner.user).order_by('-posted_at')[:10],
+            'instructor announcements': Announcement.objects.filter(user=self.instructor).order_by('-posted_at')[:3],
+            'tutorial list': Tutorial.objects.select_related('course', 'user').order_by('-created_at')[:20],
+            'instructor tutorials': Tutorial.objects.filter(user=self.instructor).order_by('-created_at')[:3],
+            'instructor notes': Notes.objects.filter(user=self.instructor).order_by('-id')[:3],
+            'course notes': Notes.objects.filter(course=self.course).order_by('-id'),
+            'quiz results': self.quiz.taken_quizzes.select_related('learner__user').order_by('-date'),
+            'quiz average': TakenQuiz.objects.filter(quiz=self.quiz).values('quiz').annotate(Avg('score')),
+            'taken check': self.learner.quizzes.filter(pk=self.quiz.pk),
+            'taken quizzes': self.learner.quizzes.values_list('pk', flat=True),
+            'answered ids': self.learner.quiz_answers.filter(answer_id__in=answer_ids).values_list('answer_id'),
+            'correct answers': self.learner.quiz_answers.filter(answer_id__in=answer_ids[:1]),
+            'tutorial page': CursorPaginator(Tutorial.objects.select_related('course', 'user'), 10,
+                                             ('-created_at', '-id')).rows_after([now, 1])[:11],
+            'announcement page': CursorPaginator(Announcement.objects.filter(posted_at__lt=now), 10,
+                                                 ('-posted_at', '-id')).rows_after([now, 1], backwards=True)[:11],
+            'notes page': CursorPaginator(Notes.objects.all(), 4, ('-id',)).rows_after([1])[:5],
+            'learner signups': User.objects.filter(is_learner=True)
+                .values(day=F('date_joined__date')).annotate(learners=Count('id')).order_by(),
+        }
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_hot_querysets_use_indexes(self):
+        for name, queryset in self.hot_querysets().items():
+            with self.subTest(name):
+                plan = self.explain(queryset)
+                detail = '\n'.join(plan)
+                self.assertFalse([step for step in plan if FULL_SCAN.match(step)],
+                                 '%s scans a whole table:\n%s' % (name, detail))
+                if queryset.query.order_by:
+                    self.assertNotIn(SORT, detail, '%s sorts instead of reading an index:\n%s' % (name, detail))
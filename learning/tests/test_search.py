@@ -0,0 +1,76 @@
+"""Keeping the full-text index in sync and searching it (learning.search)."""
+from django.test import TestCase
+
+from learning import search
+from learning.models import Announcement, Course, Learner, Notes, Question, Quiz, Tutorial, User
+
+
+class SearchTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.biology, cls.history = Course.objects.create(name='Biology'), Course.objects.create(name='History')
+        cls.instructor = User.objects.create_user('instructor', password='pw', is_instructor=True)
+        cls.learner = User.objects.create_user('learner', password='pw', is_learner=True)
+        Learner.objects.create(user=cls.learner).interests.set([cls.biology])
+
+    def tutorial(self, title, content, course=None):
+        return Tutorial.objects.create(title=title, content=content, course=course or self.biology,
+                                       user=self.instructor)
+
+    def titles(self, text, courses=None):
+        return [result['title'] for result in search.search(text, courses or [self.biology.pk])]
+
+    def test_ranks_title_matches_first_and_filters_by_course(self):
+        self.tutorial('Cells', 'Mitochondria produce energy for the cell.')
+        self.tutorial('Mitochondria', 'The powerhouse.')
+        self.tutorial('Mitochondria in history', 'Not a course this learner follows.', course=self.history)
+        Notes.objects.create(title='Mitochondria diagrams', course=self.history, user=self.instructor)
+        Announcement.objects.create(user=self.instructor, content='Mitochondria quiz on Friday')
+
+        results = search.search('mitochon', [self.biology.pk])
+        self.assertEqual(results[0]['title'], 'Mitochondria')
+        self.assertEqual(sorted(r['label'] for r in results), ['Announcement', 'Tutorial', 'Tutorial'])
+        self.assertIn('<mark>Mitochondria</mark> produce', results[-1]['snippet'] + results[-2]['snippet'])
+
+    def test_index_follows_saves_and_deletes(self):
+        tutorial = self.tutorial('Photosynthesis', 'Light <b>reactions</b>')
+        self.assertEqual(self.titles('photosynthesis'), ['Photosynthesis'])
+        # Stored text is escaped in snippets
+        self.assertIn('&lt;b&gt;<mark>reactions</mark>', search.search('reactions', [self.biology.pk])[0]['snippet'])
+
+        tutorial.title = 'Respiration'
+        tutorial.save()
+        self.assertEqual(self.titles('photosynthesis'), [])
+        tutorial.delete()
+        self.assertEqual(self.titles('respiration'), [])
+
+        quiz = Quiz.objects.create(owner=self.instructor, name='Genetics', course=self.history)
+        question = Question.objects.create(quiz=quiz, text='What does DNA stand for?')
+        self.assertEqual(self.titles('dna'), [])
+        # Moving the quiz moves its questions into the learner's course
+        quiz.course = self.biology
+        quiz.save()
+        results = search.search('dna', [self.biology.pk])
+        self.assertEqual([(r['label'], r['url']) for r in results], [('Question', '/quiz/%d/' % quiz.pk)])
+        quiz.delete()
+        self.assertEqual(self.titles('dna genetics'), [])
+        self.assertFalse(Question.objects.filter(pk=question.pk).exists())
+
+    def test_rebuild_and_query_syntax(self):
+        Tutorial.objects.bulk_create([Tutorial(title='Enzymes', content='Catalysts', course=self.biology,
+                                               user=self.instructor)])
+        self.assertEqual(self.titles('enzymes'), [])
+        self.assertEqual(search.rebuild(), 1)
+        self.assertEqual(self.titles('enzymes'), ['Enzymes'])
+        # FTS5 operators are matched as words, never parsed
+        self.assertEqual(self.titles('enzymes AND NEAR( "*'), [])
+
+    def test_view(self):
+        self.tutorial('Osmosis', 'Water through membranes')
+        self.client.force_login(self.learner)
+        response = self.client.get('/search/', {'q': 'osmosis'})
+        self.assertContains(response, 'Osmosis')
+        self.client.force_login(self.instructor)
+        self.assertRedirects(self.client.get('/search/', {'q': 'osmosis'}), '/')
@@ -0,0 +1,51 @@
+"""Precompression in the manifest storage and the vendor asset check in learning.staticfiles."""
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.finders import get_finder
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from learning.staticfiles import check_vendor_assets, library
+
+CSS = 'body { color: black; }\n' * 100
+
+
+class StaticFilesTests(SimpleTestCase):
+
+    def test_library(self):
+        self.assertEqual(library('vendor/jquery/jquery-3.5.1.min.js'), 'jquery.js')
+        self.assertEqual(library('js/jquery.min.js'), 'jquery.js')
+        self.assertEqual(library('vendor/bootstrap/js/bootstrap.bundle.min.js'), 'bootstrap.js')
+        self.assertEqual(library('vendor/jquery-easing/jquery.easing.min.js'), 'jquery.easing.js')
+
+    def test_dashboard_pages_load_each_library_once(self):
+        duplicates = [warning.msg for warning in check_vendor_assets(None) if warning.id == 'learning.W001']
+        self.assertEqual(duplicates, [])
+
+    def test_collectstatic_writes_hashed_gzip_copies(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, root)
+        with open(os.path.join(source, 'site.css'), 'w') as f:
+            f.write(CSS)
+        with open(os.path.join(source, 'tiny.css'), 'w') as f:
+            f.write('a{}')
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'learning.staticfiles.CompressedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=root, STORAGES=storages,
+                               STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder']):
+            get_finder.cache_clear()
+            self.addCleanup(get_finder.cache_clear)
+            call_command('collectstatic', interactive=False, verbosity=0)
+        files = set(os.listdir(root))
+        hashed = next(name for name in files if name.startswith('site.') and name.endswith('.css')
+                      and name != 'site.css')
+        with gzip.open(os.path.join(root, hashed + '.gz'), 'rt') as f:
+            self.assertEqual(f.read(), CSS)
+        # Too small to be worth it
+        self.assertFalse(any(name.startswith('tiny.') and name.endswith('.gz') for name in files))
@@ -0,0 +1,36 @@
+"""Taking a quiz page by page (learning.views.learner.take_quiz)."""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from learning.models import Answer, Course, Learner, LearnerAnswer, Question, Quiz, TakenQuiz, User
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TakeQuizTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name='Course')
+        instructor = User.objects.create_user('instructor', is_instructor=True)
+        cls.quiz = Quiz.objects.create(owner=instructor, name='Quiz', course=course)
+        question = Question.objects.create(quiz=cls.quiz, text='Question')
+        cls.correct = Answer.objects.create(question=question, text='Right', is_correct=True)
+        cls.learner = User.objects.create_user('learner', is_learner=True)
+        Learner.objects.create(user=cls.learner).interests.set([course])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def test_an_attempt_is_only_recorded_on_post(self):
+        # Answered earlier, but the attempt was never recorded
+        LearnerAnswer.objects.create(student_id=self.learner.pk, answer=self.correct)
+        url = '/quiz/%d/' % self.quiz.pk
+
+        response = self.client.get(url)
+        self.assertContains(response, 'Finish the quiz')
+        self.assertFalse(TakenQuiz.objects.exists())
+
+        self.assertRedirects(self.client.post(url), '/learner_quiz/', fetch_redirect_response=False)
+        self.assertEqual(TakenQuiz.objects.get().score, 100.0)
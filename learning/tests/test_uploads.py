@@ -0,0 +1,63 @@
+"""Reference counting of content-addressed notes files in learning.uploads."""
+from io import BytesIO
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from learning import uploads
+from learning.models import Blob, Course, Notes, Upload, User
+
+
+class UploadTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings = override_settings(MEDIA_ROOT=cls.media_root,
+                                         CHUNKED_UPLOAD_DIR=os.path.join(cls.media_root, 'partial'))
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def test_replacing_a_notes_file_keeps_one_reference_per_note(self):
+        instructor = User.objects.create_user('instructor', is_instructor=True)
+        name = uploads.store(SimpleUploadedFile('lecture.pdf', b'%PDF lecture'))
+        notes = Notes.objects.create(title='Lecture', course=Course.objects.create(name='Biology'), user=instructor,
+                                     file=name, cover='notes/covers/seed.png')
+        self.client.force_login(instructor)
+
+        # The same content again: still the one note using the blob
+        self.client.post('/update_file/%d' % notes.pk, {'file': SimpleUploadedFile('lecture.pdf', b'%PDF lecture')})
+        self.assertEqual(Blob.objects.get(name=name).refcount, 1)
+
+        self.client.post('/update_file/%d' % notes.pk, {'file': SimpleUploadedFile('lecture.pdf', b'%PDF revised')})
+        notes.refresh_from_db()
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertEqual(Blob.objects.get(name=notes.file.name).refcount, 1)
+
+    def test_a_note_that_fails_to_save_keeps_no_reference(self):
+        instructor = User.objects.create_user('instructor', is_instructor=True)
+        upload = uploads.start(instructor, 'lecture.pdf', 12)
+        upload = uploads.append(upload, 0, BytesIO(b'%PDF lecture'), 12)
+        self.client.force_login(instructor)
+
+        def publish(**file):
+            cover = SimpleUploadedFile('cover.png', b'cover')
+            with self.assertRaises(ValueError):
+                self.client.post('/publish_notes/', {'title': 'Lecture', 'course_id': 'biology', 'cover': cover, **file})
+
+        # The finished upload is still there to attach to a note once the form is fixed
+        publish(upload=upload.pk)
+        self.assertTrue(Upload.objects.filter(pk=upload.pk).exists())
+        self.assertEqual(Blob.objects.get(pk=upload.blob_id).refcount, 1)
+
+        publish(file=SimpleUploadedFile('other.pdf', b'%PDF other'))
+        self.assertEqual(Blob.objects.count(), 1)
@@ -0,0 +1,176 @@
+"""
+Content-addressed storage for notes files, with resumable chunked uploads.
+
+Every file is stored once as ``notes/blobs/<sha256[:2]>/<sha256><ext>`` and
+tracked by a ``Blob`` row counting the notes (and finished uploads not yet
+attached to a note) that use it. ``release`` drops a reference and deletes
+the file with the last one, so notes sharing a PDF never delete it from
+under each other.
+
+Large files go through the chunked upload endpoint instead of a single
+multipart POST: the client creates an ``Upload``, then PUTs the bytes in
+order with an ``Upload-Offset`` header, and after a dropped connection asks
+for the offset and carries on from there. Chunks are hashed while they are
+streamed to a partial file in ``CHUNKED_UPLOAD_DIR``. The running hash lives
+in the process that received the previous chunk; a chunk landing in another
+process re-reads the partial file once to rebuild it.
+"""
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Blob, Upload
+from .tasks import delete_files, delete_unused_blob
+
+READ_SIZE = 64 * 1024
+
+# upload id -> (offset, hash object) for uploads this process received the last chunk of
+_hashers = {}
+_lock = threading.Lock()
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the upload stands; the client should resume from ``offset``."""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class _PartialFile(File):
+    # FileSystemStorage moves (rather than copies) files that expose a temporary path
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def blob_name(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f'notes/blobs/{sha256[:2]}/{sha256}{extension}'
+
+
+def partial_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def _store(sha256, size, filename, content):
+    """Return the blob for ``sha256`` with one more reference, writing ``content`` only if it is new."""
+    with transaction.atomic():
+        blob, created = Blob.objects.get_or_create(
+            sha256=sha256, defaults={'name': blob_name(sha256, filename), 'size': size, 'refcount': 1})
+        if not created:
+            Blob.objects.filter(pk=sha256).update(refcount=F('refcount') + 1)
+        # Also rewrites a blob whose file went missing
+        if not default_storage.exists(blob.name):
+            default_storage.save(blob.name, content)
+    return blob
+
+
+def store(uploaded_file):
+    """Store a file from ``request.FILES``; returns the name to put in ``Notes.file``."""
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks(READ_SIZE):
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return _store(hasher.hexdigest(), uploaded_file.size, uploaded_file.name, uploaded_file).name
+
+
+def release(name):
+    """Drop one reference to the file ``name`` and delete it if that was the last one."""
+    if not name:
+        return
+    with transaction.atomic():
+        blobs = Blob.objects.filter(name=name)
+        if not blobs.exists():
+            # Stored before content addressing: the note was its only user
+            delete_files.delay([name])
+            return
+        blobs.filter(refcount__gt=0).update(refcount=F('refcount') - 1)
+        if blobs.filter(refcount=0).delete()[0]:
+            delete_unused_blob.delay(name)
+
+
+def start(user, filename, size):
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    upload = Upload.objects.create(user=user, filename=os.path.basename(filename)[:255], size=size)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def _hasher_at(upload):
+    with _lock:
+        offset, hasher = _hashers.pop(upload.pk, (None, None))
+    if offset == upload.offset:
+        return hasher
+    # The previous chunk went to another process (or this one restarted)
+    hasher = hashlib.sha256()
+    with open(partial_path(upload), 'rb') as f:
+        remaining = upload.offset
+        while remaining:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            hasher.update(data)
+            remaining -= len(data)
+    return hasher
+
+
+def append(upload, offset, stream, length):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset``. Returns the upload,
+    finished (``upload.blob`` set) once the last byte is in.
+    """
+    if offset != upload.offset or upload.blob_id:
+        raise OffsetMismatch(upload.offset)
+    length = min(length, upload.size - offset)
+    hasher = _hasher_at(upload)
+    written = 0
+    with open(partial_path(upload), 'r+b') as f:
+        # Anything past the recorded offset is the tail of a chunk that never finished
+        f.truncate(offset)
+        f.seek(offset)
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            hasher.update(data)
+            written += len(data)
+    # Only move the offset if nobody else did meanwhile
+    if not Upload.objects.filter(pk=upload.pk, offset=offset).update(offset=offset + written,
+                                                                     updated_at=timezone.now()):
+        raise OffsetMismatch(Upload.objects.values_list('offset', flat=True).get(pk=upload.pk))
+    upload.offset = offset + written
+
+    if upload.offset < upload.size:
+        with _lock:
+            _hashers[upload.pk] = (upload.offset, hasher)
+        return upload
+    with open(partial_path(upload), 'rb') as f:
+        upload.blob = _store(hasher.hexdigest(), upload.size, upload.filename, _PartialFile(f))
+    # Moved into storage, unless the content was already there
+    if os.path.exists(partial_path(upload)):
+        os.remove(partial_path(upload))
+    Upload.objects.filter(pk=upload.pk).update(blob=upload.blob, updated_at=timezone.now())
+    return upload
+
+
+def adopt(upload):
+    """Hand a finished upload's reference over to a note; returns the name for ``Notes.file``."""
+    name = upload.blob.name
+    upload.delete()
+    return name
+
+
+def discard(upload):
+    if upload.blob_id:
+        release(upload.blob.name)
+    if os.path.exists(partial_path(upload)):
+        os.remove(partial_path(upload))
+    upload.delete()
@@ -1,8 +1,12 @@
 from django.urls import path
-from .views import main,instructor,learner,admin
+from .views import main,instructor,learner,admin,api
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.conf.urls.static import static
+
+# Under ASGI the dashboards with several independent reads have async versions (see learning/concurrency.py)
+dashboard = admin.dashboard_async if settings.ASYNC_VIEWS else admin.dashboard
+home_instructor = instructor.home_instructor_async if settings.ASYNC_VIEWS else instructor.home_instructor
+quiz_results = instructor.quiz_results_async if settings.ASYNC_VIEWS else instructor.QuizResultsView.as_view()
 
 urlpatterns = [
 
@@ -12,9 +16,13 @@ urlpatterns = [
     path('login_form/', main.login_form, name='login_form'),
     path('login/', main.loginView, name='login'),
     path('logout/', main.logoutView, name='logout'),
+    path('announcements/stream/', main.announcement_stream, name='announcementstream'),
+    path('notifications/', login_required(main.notifications), name='notifications'),
+    path('notifications/read/', login_required(main.mark_notifications_read), name='notificationsread'),
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', login_required(main.serve_media), name='media'),
 
     # # Admin URLs
-    path('dashboard/', login_required(admin.dashboard), name='dashboard'),
+    path('dashboard/', login_required(dashboard), name='dashboard'),
     path('course/', login_required(admin.course), name='course'),
     path('deletecourse/<int:course_id>/', admin.DeleteCourse, name='deletecourse'),
     path('addinstructor/', login_required(admin.InstructorSignUpView.as_view()), name='addinstructor'),
@@ -30,16 +38,17 @@ urlpatterns = [
     path('removeadmin/', login_required(admin.remove_admin), name='removeadmin'),
     path('adminprofile/', login_required(admin.AdminProfile), name='adminprofile'),
     path('updatepassword/', login_required(admin.UpdatePassword), name='updatepassword'),
-    path('adminclearnotification/', login_required(admin.ClearNotification), name='adminclearnotification'),
-    path('adminnotification/', login_required(admin.Notification.as_view()), name='adminnotification'),
+    path('profiling/', login_required(admin.slow_requests), name='profiling'),
+    path('importaccounts/', login_required(admin.ImportAccounts), name='importaccounts'),
+    path('importaccounts/<int:pk>/report/', login_required(admin.ImportReport), name='importreport'),
 
     # # Instructor URLs
-    path('instructor/', login_required(instructor.home_instructor), name='instructor'),
+    path('instructor/', login_required(home_instructor), name='instructor'),
     path('annonce/', login_required(instructor.InstructorCreateAnnonce.as_view()), name='annonce'),
     path('instructorallannonce/', login_required(instructor.InstructorAllAnnonce.as_view()), name='instructorallannonce'),
     path('quiz_add/', login_required(instructor.QuizCreateView.as_view()), name='quiz_add'),
     path('llist_quiz/', login_required(instructor.QuizListView.as_view()), name='quiz_change_list'),
-    path('quiz/<int:pk>/results/', login_required(instructor.QuizResultsView.as_view()), name='quiz_results'),
+    path('quiz/<int:pk>/results/', login_required(quiz_results), name='quiz_results'),
     path('quiz/<int:pk>/delete/', login_required(instructor.QuizDeleteView.as_view()), name='quiz_delete'),
     path('quizupdate/<int:pk>/', login_required(instructor.QuizUpdateView.as_view()), name='quiz_change'),
     path('question_add/<int:pk>', login_required(instructor.question_add), name='question_add'),
@@ -51,28 +60,35 @@ urlpatterns = [
     path('iadd_notes/', login_required(instructor.iadd_notes), name='iadd_notes'),  
     path('update_file/<int:pk>', login_required(instructor.update_file), name='update_file'),
     path('publish_notes/', login_required(instructor.publish_notes), name='publish_notes'),
+    path('uploads/', login_required(instructor.upload_start), name='upload_start'),
+    path('uploads/<uuid:pk>/', login_required(instructor.upload_chunk), name='upload'),
     path('post/', login_required(instructor.publish_tutorial),name='publish_tutorial'),
     path('itutorial/', login_required(instructor.itutorial),name='itutorial'),
+    path('itutorials/<int:pk>/', login_required(instructor.ITutorialDetail.as_view()), name='itutorial-detail'),
     path('instructorprofile/', login_required(instructor.InstructorProfile), name='instructorprofile'),
     path('updatepassword/', login_required(instructor.UpdatePassword), name='updatepassword'),
-    path('instructorclearnotification/', login_required(instructor.ClearNotification), name='instructorclearnotification'),
-    path('instructornotification/', login_required(instructor.Notification.as_view()), name='instructornotification'),
 
     # # Learner URl's
     path('learner/', login_required(learner.home_learner),name='learner'),
     path('learnerallannonce/', login_required(learner.LearnerAllAnnonce.as_view()), name='learnerallannonce'),
-    path('clearnotification/', login_required(learner.ClearNotification), name='clearnotification'),
-    path('notification/', login_required(learner.Notification.as_view()), name='notification'),
     path('learnerprofile/', login_required(learner.LearnerProfile), name='learnerprofile'),
     path('learnerupdatepassword/', login_required(learner.LearnerUpdatePassword), name='learnerupdatepassword'),
     path('grades/', login_required(learner.LNotesList.as_view()), name='grades'),
     path('ltutorial/', login_required(learner.ltutorial),name='ltutorial'),
+    path('search/', login_required(learner.search), name='search'),
     path('tutorials/<int:pk>/', login_required(learner.LTutorialDetail.as_view()), name = "tutorial-detail"),
     path('interests/', login_required(learner.LearnerInterestsView.as_view()), name='interests'),
     path('learner_quiz/', login_required(learner.LQuizListView.as_view()), name='lquiz_list'),
     path('taken/', login_required(learner.TakenQuizListView.as_view()), name='taken_quiz_list'),
     path('quiz/<int:pk>/', login_required(learner.take_quiz), name='take_quiz'),
-]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # JSON API for learner clients (see learning/api.py); answers 401 itself instead of redirecting
+    path('api/v1/courses/', api.courses, name='api-courses'),
+    path('api/v1/tutorials/', api.tutorials, name='api-tutorials'),
+    path('api/v1/tutorials/<int:pk>/', api.tutorial, name='api-tutorial'),
+    path('api/v1/notes/', api.notes, name='api-notes'),
+    path('api/v1/quizzes/', api.quizzes, name='api-quizzes'),
+    path('api/v1/quizzes/<int:pk>/', api.quiz, name='api-quiz'),
+    path('api/v1/quizzes/<int:pk>/submit/', api.submit_quiz, name='api-quiz-submit'),
+    path('api/v1/taken/', api.taken_quizzes, name='api-taken'),
+]
\ No newline at end of file
@@ -1,9 +1,15 @@
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
 from django.views.generic.edit import CreateView
 from ..forms import CustomUserChangeForm, LearnerSignUpForm, InstructorSignUpForm, PostForm
-from ..models import User,Course,Announcement
+from ..models import User,Course,Announcement,AccountImport
+from ..pagination import CursorPaginationMixin, paginate
+from ..conditional import conditional, published_announcements
+from django.utils.decorators import method_decorator
+from .. import account_import, concurrency, fragments, profiling
+from ..tasks import delete_course, import_accounts
 from django.views.generic import ListView 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
@@ -13,14 +19,21 @@ from django.utils import timezone
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
-from django.views.decorators.csrf import csrf_exempt
-from django.views import View
+from django.http import FileResponse, Http404
+import os
 
 def dashboard(request):
     if not (request.user.is_admin or request.user.is_superuser):
         return redirect('home')
     return render(request, 'dashboard/admin/home.html')
 
+async def dashboard_async(request):
+    """``dashboard`` for ASGI; the page has no data of its own to read."""
+    user = await concurrency.request_user(request)
+    if not (user.is_admin or user.is_superuser):
+        return redirect('home')
+    return await sync_to_async(render)(request, 'dashboard/admin/home.html')
+
 def course(request):
     if not (request.user.is_admin or request.user.is_superuser):
         return redirect('home')
@@ -42,8 +55,9 @@ def DeleteCourse(request, course_id):
         return redirect('home')
 
     course = get_object_or_404(Course, id=course_id)
-    course.delete()
-    messages.success(request, 'Course was deleted successfully')
+    # The cascade and the file deletions run in the worker
+    delete_course.delay(course.id)
+    messages.success(request, 'Course is being deleted')
     return redirect('course')
 
 class InstructorSignUpView(CreateView):
@@ -85,15 +99,15 @@ class AdminLearner(CreateView):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
     
-class ListUserView(LoginRequiredMixin, ListView):
+class ListUserView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = User
     template_name = 'dashboard/admin/list_users.html'
     context_object_name = 'users'
-    paginated_by = 10
-
+    paginate_by = 10
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
-        return User.objects.order_by('-id')
+        return User.objects.all()
 
     def dispatch(self, request, *args, **kwargs):
         if not (request.user.is_admin or request.user.is_superuser):
@@ -111,12 +125,15 @@ class AdminDeleteAnnonce(SuccessMessageMixin, DeleteView):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
    
-class AdminAllAnnonce(LoginRequiredMixin, ListView):
+@method_decorator(conditional(published_announcements, 'posted_at', depends=('user',)), name='get')
+class AdminAllAnnonce(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Announcement
     template_name = 'dashboard/admin/tise_list.html'
+    paginate_by = 10
+    cursor_ordering = ('-posted_at', '-id')
 
     def get_queryset(self):
-        return Announcement.objects.filter(posted_at__lt=timezone.now()).order_by('-posted_at')
+        return Announcement.objects.filter(posted_at__lt=timezone.now()).select_related('user')
 
     def dispatch(self, request, *args, **kwargs):
         if not (request.user.is_admin or request.user.is_superuser):
@@ -173,7 +190,8 @@ def promote_to_admin(request):
         user.save()
         messages.success(request, f"{user.username} has been promoted to admin.")
         return redirect('allusers')
-    
+    return redirect('allusers')
+
 def remove_admin(request):
     if not (request.user.is_admin or request.user.is_superuser):
         return redirect('home')
@@ -192,10 +210,13 @@ def remove_admin(request):
 def create_user_form(request):
     if not (request.user.is_admin or request.user.is_superuser):
         return redirect('home')
-    users = User.objects.all()
+    # Admins cannot be promoted, so leave them out rather than skip them in the template
+    page = paginate(request, User.objects.filter(is_admin=False).only('id', 'username'), 50, ('-id',))
     
     context = {
-        'users': users
+        'users': page,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
     }
     
     return render(request, 'dashboard/admin/add_user.html', context)
@@ -219,6 +240,52 @@ def create_user(request):
         messages.error(request, 'Admin Was Not Created Successfully')
         return redirect('create_user_form')
 
+def slow_requests(request):
+    if not (request.user.is_admin or request.user.is_superuser):
+        return redirect('home')
+    if request.method == 'POST':
+        profiling.clear()
+        return redirect('profiling')
+    context = {
+        'enabled': settings.PROFILING,
+        'slow_ms': settings.PROFILING_SLOW_MS,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'profiles': profiling.recent(),
+        'fragments': fragments.stats(),
+    }
+    return render(request, 'dashboard/admin/profiling.html', context)
+
+def ImportAccounts(request):
+    if not (request.user.is_admin or request.user.is_superuser):
+        return redirect('home')
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        role = request.POST.get('role', 'learner')
+        if upload is None or role not in dict(AccountImport.ROLES):
+            messages.error(request, 'Choose a file and a role to import')
+            return redirect('importaccounts')
+        try:
+            pending = account_import.create(upload, role, request.user)
+        except ValueError as error:
+            messages.error(request, str(error))
+            return redirect('importaccounts')
+        # Hashing thousands of passwords takes minutes, so the worker does it
+        import_accounts.delay(pending.pk)
+        messages.success(request, f'{pending.name} is being imported')
+        return redirect('importaccounts')
+    imports = AccountImport.objects.select_related('created_by').order_by('-id')[:20]
+    return render(request, 'dashboard/admin/import_accounts.html', {'imports': imports})
+
+def ImportReport(request, pk):
+    if not (request.user.is_admin or request.user.is_superuser):
+        return redirect('home')
+    pending = get_object_or_404(AccountImport, pk=pk)
+    path = account_import.report_path(pending)
+    if not os.path.exists(path):
+        raise Http404('This import has no report yet')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'import-{pending.pk}-errors.csv',
+                        content_type='text/csv')
+
 def UpdatePassword(request):
     if not (request.user.is_admin or request.user.is_superuser):
         return redirect('home')
@@ -232,26 +299,4 @@ def UpdatePassword(request):
     else:
         form = PasswordChangeForm(request.user)
     
-    return render(request, 'user_profile.html', {'form': form})
- 
-@csrf_exempt
-def ClearNotification(request):
-    user = request.user
-    user.profile.new_announcements_count = 0
-    user.profile.save()
-    return JsonResponse({'status': 'success'})
-
-class Notification(View):
-    def get(self, request, *args, **kwargs):
-        last_check_time = request.user.last_announcements_check
-        
-        new_announcements = Announcement.objects.filter(posted_at__gt=last_check_time)
-        
-        request.user.last_announcements_check = timezone.now()
-        request.user.save()
-        
-        data = {
-            'count': new_announcements.count(),
-            'announcements': list(new_announcements.values('user', 'content', 'posted_at'))
-        }
-        return JsonResponse(data)
+    return render(request, 'dashboard/admin/user_profile.html', {'form': form})
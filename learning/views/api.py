@@ -0,0 +1,147 @@
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from ..answer_keys import get_answer_key
+from ..api import ApiError, Projection, detail, endpoint, file_url, json_response, page, read_json
+from ..conditional import conditional
+from ..models import Course, Learner, LearnerAnswer, Notes, Quiz, TakenQuiz, Tutorial
+from .learner import record_attempt
+
+COURSE = Projection(id='id', name='name', color='color')
+
+TUTORIAL = Projection(
+    id='id', title='title', content='content', course='course_id', course_name='course__name',
+    author='user__username', thumb=('thumb', file_url(Tutorial, 'thumb')),
+    created_at='created_at', updated_at='updated_at',
+)
+
+NOTES = Projection(
+    id='id', title='title', course='course_id', course_name='course__name', author='user__username',
+    file=('file', file_url(Notes, 'file')), cover=('cover', file_url(Notes, 'cover')),
+    created_at='created_at', updated_at='updated_at',
+)
+
+QUIZ = Projection(
+    id='id', name='name', course='course_id', course_name='course__name', single_page='single_page',
+    question_count='question_count', updated_at='updated_at',
+)
+
+# The questions come from the cached answer key, not from a column
+QUIZ_DETAIL = Projection(**QUIZ.fields, questions=None)
+
+TAKEN_QUIZ = Projection(
+    id='id', quiz='quiz_id', quiz_name='quiz__name', course='quiz__course_id', course_name='quiz__course__name',
+    score='score', date='date',
+)
+
+
+def _course_filter(request, queryset):
+    course = request.GET.get('course')
+    if course is None:
+        return queryset
+    if not course.isdigit():
+        raise ApiError(400, 'course must be a course id')
+    return queryset.filter(course_id=course)
+
+
+@endpoint('GET')
+def courses(request):
+    return json_response(page(request, COURSE, Course.objects.all(), ('name', 'id')))
+
+
+@endpoint('GET')
+@conditional(lambda request: Tutorial.objects.all(), 'updated_at', depends=('course', 'user'))
+def tutorials(request):
+    queryset = _course_filter(request, Tutorial.objects.all())
+    return json_response(page(request, TUTORIAL, queryset, ('-created_at', '-id')))
+
+
+@endpoint('GET')
+@conditional(lambda request, pk: Tutorial.objects.filter(pk=pk), 'updated_at', depends=('course', 'user'))
+def tutorial(request, pk):
+    return json_response(detail(request, TUTORIAL, Tutorial.objects.filter(pk=pk)))
+
+
+@endpoint('GET')
+@conditional(lambda request: Notes.objects.all(), 'updated_at', depends=('course', 'user'))
+def notes(request):
+    queryset = _course_filter(request, Notes.objects.all())
+    return json_response(page(request, NOTES, queryset, ('-id',)))
+
+
+@endpoint('GET')
+def quizzes(request):
+    # What the learner can still take: quizzes with questions in their courses, like the quiz list page
+    interests = Learner.interests.through.objects.filter(learner_id=request.user.pk).values('course_id')
+    taken = TakenQuiz.objects.filter(learner_id=request.user.pk).values('quiz_id')
+    queryset = Quiz.objects.filter(course__in=interests).exclude(pk__in=taken) \
+        .annotate(question_count=Count('questions')).filter(question_count__gt=0)
+    return json_response(page(request, QUIZ, queryset, ('name', 'id')))
+
+
+@endpoint('GET')
+@conditional(lambda request, pk: Quiz.objects.filter(pk=pk), 'updated_at', depends=('course',))
+def quiz(request, pk):
+    """The quiz with its questions and answer options, from the cached answer key; never which answer is right."""
+    names = QUIZ_DETAIL.selected(request)
+    row = QUIZ_DETAIL.values(Quiz.objects.filter(pk=pk).annotate(question_count=Count('questions')), names,
+                             extra=['id', 'key_version']).first()
+    if row is None:
+        raise Http404
+    data = QUIZ_DETAIL.serialize(row, names)
+    if 'questions' in names:
+        answer_key = get_answer_key(Quiz(pk=row['id'], key_version=row['key_version']))
+        data['questions'] = [{
+            'id': question.pk,
+            'text': question.text,
+            'answers': [{'id': answer.pk, 'text': answer.text} for answer in answers],
+        } for question, answers in answer_key.questions]
+    return json_response(data)
+
+
+@endpoint('POST')
+def submit_quiz(request, pk):
+    """
+    Take a quiz in one request: ``{"answers": {"<question id>": <answer id>, ...}}``.
+    Questions answered earlier on the quiz pages keep that answer.
+    """
+    answers = read_json(request).get('answers')
+    if not isinstance(answers, dict):
+        raise ApiError(400, 'answers must map question ids to answer ids')
+    quiz = get_object_or_404(Quiz, pk=pk)
+    learner = request.user.learner
+    if learner.taken_quizzes.filter(quiz=quiz).exists():
+        raise ApiError(409, 'The quiz was already taken')
+    answer_key = get_answer_key(quiz)
+    if not answer_key:
+        raise ApiError(409, 'The quiz has no questions yet')
+
+    answered_ids = learner.quiz_answers.filter(answer_id__in=answer_key.answer_ids).values_list('answer_id', flat=True)
+    picked = []
+    errors = {}
+    for question, options in answer_key.unanswered(answered_ids):
+        answer_id = answers.get(str(question.pk))
+        if answer_id is None:
+            errors[question.pk] = 'Not answered'
+        # bool is an int too, and true would otherwise pick answer 1
+        elif not isinstance(answer_id, int) or isinstance(answer_id, bool) \
+                or answer_id not in {answer.pk for answer in options}:
+            errors[question.pk] = 'Not one of the question\'s answers'
+        else:
+            picked.append(LearnerAnswer(student=learner, answer_id=answer_id))
+    if errors:
+        raise ApiError(400, 'Some questions have no valid answer', questions=errors)
+
+    with transaction.atomic():
+        LearnerAnswer.objects.bulk_create(picked)
+        taken = record_attempt(learner, quiz, answer_key)
+    return json_response({'id': taken.pk, 'quiz': quiz.pk, 'score': taken.score, 'date': taken.date}, status=201)
+
+
+@endpoint('GET')
+@conditional(lambda request: TakenQuiz.objects.filter(learner_id=request.user.pk), 'date')
+def taken_quizzes(request):
+    queryset = TakenQuiz.objects.filter(learner_id=request.user.pk)
+    return json_response(page(request, TAKEN_QUIZ, queryset, ('-date', '-id')))
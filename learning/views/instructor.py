@@ -1,4 +1,7 @@
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
 from django.urls import reverse_lazy
@@ -8,251 +11,176 @@ from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from ..forms import CustomUserChangeForm, QuestionForm, BaseAnswerInlineFormSet, TutorialForm, PostForm
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Avg, Count
+from django.db.models import Count, Q, Sum
 from django.forms import inlineformset_factory
-from ..models import Answer, Quiz, Question, Course, Notes, Announcement,Tutorial, User, TakenQuiz
+from ..models import (Answer, Quiz, Question, Course, Notes, Announcement,Tutorial, User, TakenQuiz, Upload,
+                      InstructorStats, InstructorCourseStats, InstructorLearnerStats, DailySignups)
 from django.db import transaction
-from django.core.files.storage import FileSystemStorage
+from django.views.decorators.http import require_http_methods, require_POST
+from ..answer_keys import bump_version
+from ..pagination import CursorPaginationMixin, paginate
+from ..conditional import conditional, published_announcements
+from django.utils.decorators import method_decorator
+from .. import concurrency, item_analysis, uploads
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
-from django.views.decorators.csrf import csrf_exempt
-from django.views import View
 
-def home_instructor(request):
-    if not request.user.is_instructor:
-        return redirect('home')
+def _time_ago(moment, now):
+    time_diff = now - moment
+    if time_diff.days > 0:
+        return f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
+    elif time_diff.seconds // 3600 > 0:
+        hours = time_diff.seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    minutes = max(1, time_diff.seconds // 60)
+    return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+
+def _average(scores):
+    return sum(scores) / len(scores) if scores else 0
+
+def _home_queries(instructor, now):
+    """The independent reads behind the instructor dashboard, by name; each returns loaded rows."""
+    thirty_days_ago = now - timezone.timedelta(days=30)
+
+    # Counters are maintained incrementally by learning.rollups, so every read
+    # below is a bounded, indexed lookup regardless of how much history exists
+    def stats():
+        stats = InstructorStats.objects.filter(instructor=instructor).first() or InstructorStats(instructor=instructor)
+        recent_taken_quizzes = list(TakenQuiz.objects.filter(
+            pk__in=[pk for pk, _ in stats.recent_attempts[:5]]
+        ).select_related('quiz', 'learner__user').order_by('-date'))
+        return stats, recent_taken_quizzes
+
+    return {
+        'stats': stats,
+        # Total students and growth come from per-day signup buckets (new students in last 30 days)
+        'signups': lambda: DailySignups.objects.aggregate(
+            total=Sum('learners'),
+            recent=Sum('learners', filter=Q(day__gte=timezone.localdate(thirty_days_ago))),
+        ),
+        # Total courses (all courses in the system)
+        'total_courses': lambda: Course.objects.count(),
+        # Courses that have quizzes by this instructor
+        'course_stats': lambda: list(
+            InstructorCourseStats.objects.filter(instructor=instructor, quiz_count__gt=0)
+            .select_related('course').order_by('-attempt_count')
+        ),
+        'recent_quizzes': lambda: list(Quiz.objects.filter(owner=instructor).order_by('-id')[:3]),
+        'recent_tutorials': lambda: list(Tutorial.objects.filter(user=instructor).order_by('-created_at')[:3]),
+        'recent_notes': lambda: list(Notes.objects.filter(user=instructor).order_by('-id')[:3]),
+        'recent_announcements': lambda: list(Announcement.objects.filter(user=instructor).order_by('-posted_at')[:3]),
+        # Get top performing students
+        'top_students': lambda: list(
+            InstructorLearnerStats.objects.filter(instructor=instructor, attempt_count__gt=0)
+            .select_related('learner__user').order_by('-avg_score')[:5]
+        ),
+    }
 
-    # Get current instructor
-    instructor = request.user
-    
-    # Total students (all learners)
-    total_students = User.objects.filter(is_learner=True).count()
-    
-    # Total courses (all courses in the system)
-    total_courses = Course.objects.count()
-    
-    # Total quizzes created by this instructor
-    total_quizzes = Quiz.objects.filter(owner=instructor).count()
-    
-    # Calculate average score for this instructor's quizzes
-    avg_score = TakenQuiz.objects.filter(
-        quiz__owner=instructor
-    ).aggregate(Avg('score'))['score__avg'] or 0
-    
-    # Calculate student growth (new students in last 30 days)
-    thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-    new_students = User.objects.filter(
-        is_learner=True, 
-        date_joined__gte=thirty_days_ago
-    ).count()
+def _home_context(instructor, now, results):
+    stats, recent_taken_quizzes = results['stats']
+
+    signups = results['signups']
+    total_students = signups['total'] or 0
+    new_students = signups['recent'] or 0
     student_growth = round((new_students / total_students * 100) if total_students > 0 else 0, 1)
-    
-    # Calculate course growth (new courses that have quizzes by this instructor in last 30 days)
-    new_courses = Course.objects.filter(
-        quizzes__owner=instructor,
-        quizzes__id__isnull=False
-    ).distinct().count()
-    # Since we don't have created_at on Course, we'll use a different metric
-    course_growth = round((new_courses / total_courses * 100) if total_courses > 0 else 0, 1)
-    
-    # Calculate quiz growth (new quizzes in last 30 days - using auto_now_add)
-    # Note: Quiz model doesn't have created_at, so we'll estimate based on ID
-    # Alternative: You could add created_at field to Quiz model
-    total_quizzes_count = Quiz.objects.filter(owner=instructor).count()
-    recent_quizzes_count = Quiz.objects.filter(
-        owner=instructor
-    ).order_by('-id')[:10].count()  # Last 10 quizzes as proxy for "recent"
-    quiz_growth = round((recent_quizzes_count / total_quizzes_count * 100) if total_quizzes_count > 0 else 0, 1)
-    
-    # Calculate score trend (compare recent quizzes to older ones)
-    # Get all taken quizzes for this instructor, ordered by date
-    all_taken = TakenQuiz.objects.filter(
-        quiz__owner=instructor
-    ).select_related('quiz').order_by('-date')
-    
-    recent_taken = all_taken[:20]  # Last 20 attempts
-    older_taken = all_taken[20:40]  # Next 20 attempts
-    
-    recent_avg = recent_taken.aggregate(Avg('score'))['score__avg'] or 0
-    older_avg = older_taken.aggregate(Avg('score'))['score__avg'] or 0
-    
+
+    total_courses = results['total_courses']
+    course_stats = results['course_stats']
+    course_growth = round((len(course_stats) / total_courses * 100) if total_courses > 0 else 0, 1)
+
+    # Last 10 quizzes as proxy for "recent"
+    total_quizzes = stats.quiz_count
+    quiz_growth = round((min(10, total_quizzes) / total_quizzes * 100) if total_quizzes > 0 else 0, 1)
+
+    # Score trend: last 20 attempts compared to the 20 before them
+    recent_scores = [score for _, score in stats.recent_attempts]
+    recent_avg = _average(recent_scores[:20])
+    older_avg = _average(recent_scores[20:40])
     if older_avg > 0:
         score_trend = round(((recent_avg - older_avg) / older_avg * 100), 1)
     else:
         score_trend = 0
-    
+
     # Get recent activities (last 10)
     recent_activities = []
-    
-    # Recent quiz completions (using date field which exists)
-    recent_taken_quizzes = TakenQuiz.objects.filter(
-        quiz__owner=instructor
-    ).select_related('quiz', 'learner__user').order_by('-date')[:5]
-    
+
     for taken in recent_taken_quizzes:
-        time_diff = timezone.now() - taken.date
-        if time_diff.days > 0:
-            time_str = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-        elif time_diff.seconds // 3600 > 0:
-            hours = time_diff.seconds // 3600
-            time_str = f"{hours} hour{'s' if hours > 1 else ''} ago"
-        else:
-            minutes = time_diff.seconds // 60
-            time_str = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            
         recent_activities.append({
             'type': 'success',
             'icon': 'check-circle',
             'title': f'Quiz "{taken.quiz.name}" completed by {taken.learner.user.username}',
-            'time': time_str,
+            'time': _time_ago(taken.date, now),
             'status': 'success',
             'score': f"{taken.score}%"
         })
-    
-    # Recent quiz creations (using ID as proxy for creation order)
-    recent_quizzes = Quiz.objects.filter(
-        owner=instructor
-    ).order_by('-id')[:3]
-    
-    for quiz in recent_quizzes:
-        # Since we don't have created_at, we'll use a generic "recently"
+
+    for quiz in results['recent_quizzes']:
         recent_activities.append({
             'type': 'primary',
             'icon': 'plus-circle',
             'title': f'New quiz "{quiz.name}" created',
-            'time': 'Recently',
+            'time': _time_ago(quiz.created_at, now),
             'status': 'primary'
         })
-    
-    # Recent tutorial uploads (using created_at which exists)
-    recent_tutorials = Tutorial.objects.filter(
-        user=instructor
-    ).order_by('-created_at')[:3]
-    
-    for tutorial in recent_tutorials:
-        time_diff = timezone.now() - tutorial.created_at
-        if time_diff.days > 0:
-            time_str = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-        elif time_diff.seconds // 3600 > 0:
-            hours = time_diff.seconds // 3600
-            time_str = f"{hours} hour{'s' if hours > 1 else ''} ago"
-        else:
-            minutes = time_diff.seconds // 60
-            time_str = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            
+
+    for tutorial in results['recent_tutorials']:
         recent_activities.append({
             'type': 'info',
             'icon': 'video',
             'title': f'New tutorial "{tutorial.title}" uploaded',
-            'time': time_str,
+            'time': _time_ago(tutorial.created_at, now),
             'status': 'info'
         })
-    
-    # Recent notes uploads (Note: Notes model doesn't have timestamp)
-    recent_notes = Notes.objects.filter(
-        user=instructor
-    ).order_by('-id')[:3]  # Using ID as proxy for creation order
-    
-    for notes in recent_notes:
+
+    for notes in results['recent_notes']:
         recent_activities.append({
             'type': 'warning',
             'icon': 'file-alt',
             'title': f'New notes "{notes.title}" uploaded',
-            'time': 'Recently',
+            'time': _time_ago(notes.created_at, now),
             'status': 'warning'
         })
-    
-    # Sort activities - we'll keep the ones with actual times first
-    # This is a simple sort - you might want to enhance this
+
     recent_activities = recent_activities[:10]
-    
-    # Get counts for different statuses
-    total_quiz_attempts = TakenQuiz.objects.filter(quiz__owner=instructor).count()
-    
-    # Quizzes that have been taken at least once
-    quizzes_with_attempts = Quiz.objects.filter(
-        owner=instructor,
-        taken_quizzes__isnull=False
-    ).distinct().count()
-    
-    # Get recent announcements (using posted_at which exists)
-    recent_announcements = Announcement.objects.filter(
-        user=instructor
-    ).order_by('-posted_at')[:3]
-    
-    # Format announcements for display
-    formatted_announcements = []
-    for ann in recent_announcements:
-        time_diff = timezone.now() - ann.posted_at
-        if time_diff.days > 0:
-            time_str = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-        elif time_diff.seconds // 3600 > 0:
-            hours = time_diff.seconds // 3600
-            time_str = f"{hours} hour{'s' if hours > 1 else ''} ago"
-        else:
-            minutes = max(1, time_diff.seconds // 60)
-            time_str = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            
-        formatted_announcements.append({
-            'content': ann.content[:50] + '...' if len(ann.content) > 50 else ann.content,
-            'time': time_str
-        })
-    
-    # Get course distribution for the instructor
-    courses_with_quizzes = Course.objects.filter(
-        quizzes__owner=instructor
-    ).annotate(
-        quiz_count=Count('quizzes'),
-        total_attempts=Count('quizzes__taken_quizzes')
-    ).distinct()
-    
+
+    formatted_announcements = [{
+        'content': ann.content[:50] + '...' if len(ann.content) > 50 else ann.content,
+        'time': _time_ago(ann.posted_at, now)
+    } for ann in results['recent_announcements']]
+
     # Get performance by course
-    course_performance = []
-    for course in courses_with_quizzes:
-        course_avg = TakenQuiz.objects.filter(
-            quiz__course=course,
-            quiz__owner=instructor
-        ).aggregate(Avg('score'))['score__avg'] or 0
-        course_performance.append({
-            'name': course.name,
-            'avg_score': round(course_avg, 1),
-            'quiz_count': course.quiz_count,
-            'total_attempts': course.total_attempts,
-            'color': course.color
-        })
-    
-    # Get top performing students
-    top_students = Learner.objects.filter(
-        taken_quizzes__quiz__owner=instructor
-    ).annotate(
-        avg_score=Avg('taken_quizzes__score'),
-        quizzes_taken=Count('taken_quizzes')
-    ).filter(quizzes_taken__gt=0).order_by('-avg_score')[:5]
-    
+    course_performance = [{
+        'name': row.course.name,
+        'avg_score': round(row.avg_score, 1),
+        'quiz_count': row.quiz_count,
+        'total_attempts': row.attempt_count,
+        'color': row.course.color
+    } for row in course_stats[:5]]
+
     formatted_top_students = []
-    for student in top_students:
+    for student in results['top_students']:
         formatted_top_students.append({
-            'name': student.user.get_full_name() or student.user.username,
-            'username': student.user.username,
-            'avg_score': round(student.avg_score, 1) if student.avg_score else 0,
-            'quizzes_taken': student.quizzes_taken,
-            'avatar': student.user.avatar.url if student.user.avatar else None
+            'name': student.learner.user.get_full_name() or student.learner.user.username,
+            'username': student.learner.user.username,
+            'avg_score': round(student.avg_score, 1),
+            'quizzes_taken': student.attempt_count,
+            'avatar': student.learner.user.avatar.url if student.learner.user.avatar else None
         })
-    
+
     # Create context dictionary with ALL real data
-    context = {
+    return {
         'total_students': total_students,
         'total_courses': total_courses,
         'total_quizzes': total_quizzes,
-        'avg_score': round(avg_score, 1),
+        'avg_score': round(stats.avg_score, 1),
         'student_growth': student_growth,
         'course_growth': course_growth,
         'quiz_growth': quiz_growth,
         'score_trend': score_trend,
         'recent_activities': recent_activities,
-        'current_date': timezone.now(),
-        'total_quiz_attempts': total_quiz_attempts,
-        'quizzes_with_attempts': quizzes_with_attempts,
+        'current_date': now,
+        'total_quiz_attempts': stats.attempt_count,
+        'quizzes_with_attempts': stats.quizzes_with_attempts,
         'recent_announcements': formatted_announcements,
         'instructor_name': instructor.get_full_name() or instructor.username,
         'instructor_first_name': instructor.first_name or instructor.username,
@@ -260,19 +188,40 @@ def home_instructor(request):
         'instructor_phone': instructor.phonenumber,
         'member_since': instructor.date_joined,
         'instructor_avatar': instructor.avatar.url if instructor.avatar else None,
-        'course_performance': course_performance[:5],  # Top 5 courses
+        'course_performance': course_performance,  # Top 5 courses
         'top_students': formatted_top_students,
-        'total_courses_taught': courses_with_quizzes.count(),
+        'total_courses_taught': len(course_stats),
     }
 
-    return render(request, 'dashboard/instructor/home.html', context)
+def home_instructor(request):
+    if not request.user.is_instructor:
+        return redirect('home')
+
+    instructor = request.user
+    now = timezone.now()
+    results = {name: query() for name, query in _home_queries(instructor, now).items()}
+    return render(request, 'dashboard/instructor/home.html', _home_context(instructor, now, results))
+
+async def home_instructor_async(request):
+    """``home_instructor`` for ASGI: the dashboard's reads run concurrently."""
+    instructor = await concurrency.request_user(request)
+    if not instructor.is_instructor:
+        return redirect('home')
+
+    now = timezone.now()
+    results = await concurrency.gather(_home_queries(instructor, now))
+    return await sync_to_async(render)(request, 'dashboard/instructor/home.html',
+                                       _home_context(instructor, now, results))
     
-class InstructorAllAnnonce(LoginRequiredMixin, ListView):
+@method_decorator(conditional(published_announcements, 'posted_at', depends=('user',)), name='get')
+class InstructorAllAnnonce(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Announcement
     template_name = 'dashboard/instructor/tise_list.html'
+    paginate_by = 10
+    cursor_ordering = ('-posted_at', '-id')
 
     def get_queryset(self):
-        return Announcement.objects.filter(posted_at__lt=timezone.now()).order_by('-posted_at')
+        return Announcement.objects.filter(posted_at__lt=timezone.now()).select_related('user')
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_instructor:
@@ -298,8 +247,8 @@ class InstructorCreateAnnonce(CreateView):
 
 class QuizCreateView(CreateView):
     model = Quiz
-    fields = ('name', 'course')
-    template_name = 'dashboard/Instructor/quiz_add_form.html'
+    fields = ('name', 'course', 'single_page')
+    template_name = 'dashboard/instructor/quiz_add_form.html'
 
     def form_valid(self, form):
         quiz = form.save(commit=False)
@@ -372,8 +321,9 @@ def question_change(request, quiz_pk, question_pk):
         formset = AnswerFormatSet(request.POST, instance=question)
         if form.is_valid() and formset.is_valid():
             with transaction.atomic():
+                form.save()
                 formset.save()
-                formset.save()
+                bump_version(quiz)
             messages.success(request, 'Question And Answers Saved Successfully')
             return redirect('quiz_change', quiz.pk)
     else:
@@ -415,40 +365,47 @@ class QuestionDeleteView(DeleteView):
         kwargs['quiz'] = question.quiz
         return super().get_context_data(**kwargs)
 
-    def delete(self, request, *args, **kwargs):
-        question = self.get_object()
-        messages.success(request, 'The Question Was Deleted Successfully')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        quiz = self.object.quiz
+        response = super().form_valid(form)
+        bump_version(quiz)
+        messages.success(self.request, 'The Question Was Deleted Successfully')
+        return response
 
     def get_queryset(self):
         return Question.objects.filter(quiz__owner=self.request.user)
 
     def get_success_url(self):
-        question = self.get_object()
-        return reverse('quiz_change', kwargs={'pk': question.quiz_id})    
+        return reverse('quiz_change', kwargs={'pk': self.object.quiz_id})    
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_instructor:
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
 
+def _taken_quizzes(quiz):
+    return list(quiz.taken_quizzes.select_related('learner__user').order_by('-date'))
+
+def _quiz_results_context(taken_quizzes, items):
+    total_taken_quizzes = len(taken_quizzes)
+    average_score = sum(t.score for t in taken_quizzes) / total_taken_quizzes if taken_quizzes else None
+    return {
+        'taken_quizzes': taken_quizzes,
+        'total_taken_quizzes': total_taken_quizzes,
+        'quiz_score': {'average_score': average_score},
+        'items': items,
+    }
+
 class QuizResultsView(DeleteView):
     model = Quiz
     context_object_name = 'quiz'
     template_name = 'dashboard/instructor/quiz_results.html'
 
     def get_context_data(self, **kwargs):
-        quiz = self.get_object()
-        taken_quizzes =quiz.taken_quizzes.select_related('learner__user').order_by('-date')
-        total_taken_quizzes = taken_quizzes.count()
-        quiz_score = quiz.taken_quizzes.aggregate(average_score=Avg('score'))
-        extra_context = {
-        'taken_quizzes': taken_quizzes,
-        'total_taken_quizzes': total_taken_quizzes,
-        'quiz_score':quiz_score
-        }
-
-        kwargs.update(extra_context)
+        quiz = self.object
+        # Loaded once: listed below, counted, averaged and fed to the item analysis
+        taken_quizzes = _taken_quizzes(quiz)
+        kwargs.update(_quiz_results_context(taken_quizzes, item_analysis.analyse(quiz, taken_quizzes)))
         return super().get_context_data(**kwargs)
 
     def get_queryset(self):
@@ -459,6 +416,29 @@ class QuizResultsView(DeleteView):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
 
+async def quiz_results_async(request, pk):
+    """
+    ``QuizResultsView`` for ASGI: the attempts list and the item analysis are
+    read concurrently, the analysis querying the attempts it has not seen
+    itself. Anything but a GET goes to ``QuizResultsView``.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(QuizResultsView.as_view())(request, pk=pk)
+    user = await concurrency.request_user(request)
+    if not user.is_instructor:
+        return redirect('home')
+    quiz = await user.quizzes.filter(pk=pk).afirst()
+    if quiz is None:
+        raise Http404('No quiz found matching the query')
+
+    results = await concurrency.gather({
+        'taken_quizzes': lambda: _taken_quizzes(quiz),
+        'items': lambda: item_analysis.analyse(quiz),
+    })
+    context = _quiz_results_context(results['taken_quizzes'], results['items'])
+    context.update(quiz=quiz, object=quiz)
+    return await sync_to_async(render)(request, QuizResultsView.template_name, context)
+
 class QuizDeleteView(DeleteView):
     model = Quiz
     context_object_name = 'quiz'
@@ -489,6 +469,7 @@ def question_add(request, pk):
             question = form.save(commit=False)
             question.quiz = quiz
             question.save()
+            bump_version(quiz)
             messages.success(request, 'You may now add answers/options to the question.')
             return redirect('question_change', quiz.pk, question.pk)
     else:
@@ -498,7 +479,7 @@ def question_add(request, pk):
 
 class QuizUpdateView(UpdateView):
     model = Quiz
-    fields = ('name', 'course', )
+    fields = ('name', 'course', 'single_page', )
     context_object_name = 'quiz'
     template_name = 'dashboard/instructor/quiz_change_form.html'
 
@@ -544,7 +525,7 @@ class TiseList(LoginRequiredMixin, ListView):
     template_name = 'dashboard/instructor/tise_list.html'
 
     def get_queryset(self):
-        return Announcement.objects.filter(posted_at__lt=timezone.now()).order_by('posted_at')
+        return Announcement.objects.filter(posted_at__lt=timezone.now()).select_related('user').order_by('posted_at')
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_instructor:
@@ -564,12 +545,14 @@ def tutorial(request):
     else:
         form = TutorialForm()
     
-    tutorials = Tutorial.objects.all()
+    page = paginate(request, Tutorial.objects.select_related('course', 'user'), 10, ('-created_at', '-id'))
     courses = Course.objects.only('id', 'name')
     context = {
         'courses': courses,
         'form': form,
-        'tutorials': tutorials,
+        'tutorials': page,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
     }
     return render(request, 'dashboard/instructor/tutorial.html', context)
 
@@ -595,8 +578,6 @@ def publish_tutorial(request):
         thumb = request.FILES['thumb']
         current_user = request.user
         author_id = current_user.id
-        print(author_id)
-        print(course_id)
         a = Tutorial(title=title, content=content, thumb=thumb, user_id=author_id, course_id=course_id)
         a.save()
         messages.success(request, 'Tutorial was published successfully!')
@@ -608,8 +589,8 @@ def publish_tutorial(request):
 def itutorial(request):
     if not request.user.is_instructor:
         return redirect('home')
-    tutorials = Tutorial.objects.all().order_by('-created_at')
-    tutorials = {'tutorials':tutorials}
+    page = paginate(request, Tutorial.objects.select_related('course', 'user'), 10, ('-created_at', '-id'))
+    tutorials = {'tutorials': page, 'page_obj': page, 'is_paginated': page.has_other_pages()}
     return render(request, 'dashboard/instructor/list_tutorial.html', tutorials)
 
 class ITutorialDetail(LoginRequiredMixin, DetailView):
@@ -621,14 +602,12 @@ class ITutorialDetail(LoginRequiredMixin, DetailView):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
 
-class LNotesList(ListView):
+class LNotesList(CursorPaginationMixin, ListView):
     model = Notes
     template_name = 'dashboard/instructor/list_notes.html'
     context_object_name = 'notes'
     paginate_by = 4
-
-    def get_queryset(self):
-        return Notes.objects.order_by('-id')
+    cursor_ordering = ('-id',)
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_instructor:
@@ -649,37 +628,101 @@ def publish_notes(request):
         title = request.POST['title']
         course_id = request.POST['course_id']
         cover = request.FILES['cover']
-        file = request.FILES['file']
         current_user = request.user
         user_id = current_user.id
 
-        a = Notes(title=title, cover=cover, file=file, user_id=user_id, course_id=course_id)
-        a.save()
-        messages.success = (request, 'Notes Was Published Successfully')
+        # The note takes over the file's reference, so a note that fails to save keeps neither
+        with transaction.atomic():
+            file = _notes_file(request)
+            if file is None:
+                messages.error(request, 'Please choose the PDF notes')
+                return redirect('iadd_notes')
+            a = Notes(title=title, cover=cover, file=file, user_id=user_id, course_id=course_id)
+            a.save()
+        messages.success(request, 'Notes Was Published Successfully')
         return redirect('lnotes')
     else:
-        messages.error = (request, 'Notes Was Not Published Successfully')
+        messages.error(request, 'Notes Was Not Published Successfully')
         return redirect('iadd_notes')
 
 def update_file(request, pk):
     if not request.user.is_instructor:
         return redirect('home')
     if request.method == 'POST':
-        file = request.FILES['file']
-        file_name = request.FILES['file'].name
-
-        fs = FileSystemStorage()
-        file = fs.save(file.name, file)
-        fileurl = fs.url(file)
-        file = file_name
-        print(file)
-
-        Notes.objects.filter(id = pk).update(file = file)
-        messages.success = (request, 'Notes was updated successfully!')
+        notes = get_object_or_404(Notes, pk=pk)
+        with transaction.atomic():
+            file = _notes_file(request)
+            if file is None:
+                messages.error(request, 'Please choose a file')
+                return redirect('update_file', pk=pk)
+            previous = notes.file.name
+            notes.file = file
+            notes.save(update_fields=['file', 'updated_at'])
+        # Storing the new file took a reference even when the content is unchanged
+        uploads.release(previous)
+        messages.success(request, 'Notes was updated successfully!')
         return redirect('lnotes')
     else:
         return render(request, 'dashboard/instructor/update.html')
 
+def _notes_file(request):
+    # A finished chunked upload (the page's JavaScript) or a plain multipart file; None if neither
+    upload_id = request.POST.get('upload')
+    if upload_id:
+        try:
+            upload = Upload.objects.select_related('blob').get(pk=upload_id, user=request.user, blob__isnull=False)
+        except (Upload.DoesNotExist, ValidationError):
+            return None
+        return uploads.adopt(upload)
+    if 'file' in request.FILES:
+        return uploads.store(request.FILES['file'])
+    return None
+
+def _upload_state(upload):
+    return {
+        'url': reverse('upload', args=[upload.pk]),
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        'complete': upload.blob_id is not None,
+    }
+
+@require_POST
+def upload_start(request):
+    if not request.user.is_instructor:
+        return redirect('home')
+    try:
+        size = int(request.POST['size'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'size is required'}, status=400)
+    if not 0 <= size <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return JsonResponse({'error': 'The file is too large'}, status=413)
+    upload = uploads.start(request.user, request.POST.get('filename', ''), size)
+    return JsonResponse(_upload_state(upload), status=201)
+
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_chunk(request, pk):
+    # GET: where to resume; PUT: the next chunk, starting at the Upload-Offset header; DELETE: give up
+    if not request.user.is_instructor:
+        return redirect('home')
+    upload = get_object_or_404(Upload, pk=pk, user=request.user)
+    if request.method == 'DELETE':
+        uploads.discard(upload)
+        return HttpResponse(status=204)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length are required'}, status=400)
+        if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+            return JsonResponse({'error': 'Chunk too large'}, status=413)
+        try:
+            upload = uploads.append(upload, offset, request, length)
+        except uploads.OffsetMismatch as mismatch:
+            return JsonResponse({'offset': mismatch.offset}, status=409)
+    return JsonResponse(_upload_state(upload))
+
 def InstructorProfile(request):
     if not request.user.is_instructor:
         return redirect('home')
@@ -705,26 +748,4 @@ def UpdatePassword(request):
     else:
         form = PasswordChangeForm(request.user)
     
-    return render(request, 'user_profile.html', {'form': form})
-    
-@csrf_exempt
-def ClearNotification(request):
-    user = request.user
-    user.profile.new_announcements_count = 0
-    user.profile.save()
-    return JsonResponse({'status': 'success'})
-
-class Notification(View):
-    def get(self, request, *args, **kwargs):
-        last_check_time = request.user.last_announcements_check
-        
-        new_announcements = Announcement.objects.filter(posted_at__gt=last_check_time)
-        
-        request.user.last_announcements_check = timezone.now()
-        request.user.save()
-        
-        data = {
-            'count': new_announcements.count(),
-            'announcements': list(new_announcements.values('user', 'content', 'posted_at'))
-        }
-        return JsonResponse(data)
\ No newline at end of file
+    return render(request, 'dashboard/instructor/user_profile.html', {'form': form})
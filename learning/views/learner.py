@@ -4,16 +4,18 @@ from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView 
 from django.views.generic.edit import UpdateView
-from django.http import JsonResponse
 from ..forms import CustomUserChangeForm, TakeQuizForm, LearnerInterestsForm
 from django.utils import timezone
 from django.db.models import Count
-from ..models import TakenQuiz, Quiz, Learner, Notes, Announcement,Tutorial
+from ..models import TakenQuiz, Quiz, Learner, LearnerAnswer, Notes, Announcement,Tutorial
+from ..answer_keys import get_answer_key
+from .. import search as full_text
+from ..pagination import CursorPaginationMixin, paginate
+from ..conditional import conditional, published_announcements
+from django.utils.decorators import method_decorator
 from django.db import transaction
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
-from django.views.decorators.csrf import csrf_exempt
-from django.views import View
 
 def home_learner(request):
     if not request.user.is_learner:
@@ -45,70 +47,56 @@ def LearnerUpdatePassword(request):
     else:
         form = PasswordChangeForm(request.user)
     
-    return render(request, 'user_profile.html', {'form': form})
+    return render(request, 'dashboard/learner/user_profile.html', {'form': form})
 
-class LearnerAllAnnonce(LoginRequiredMixin, ListView):
+@method_decorator(conditional(published_announcements, 'posted_at', depends=('user',)), name='get')
+class LearnerAllAnnonce(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Announcement
     template_name = 'dashboard/learner/tise_list.html'
+    paginate_by = 10
+    cursor_ordering = ('-posted_at', '-id')
 
     def get_queryset(self):
-        return Announcement.objects.filter(posted_at__lt=timezone.now()).order_by('-posted_at')
+        return Announcement.objects.filter(posted_at__lt=timezone.now()).select_related('user')
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_learner:
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
-    
-@csrf_exempt
-def ClearNotification(request):
-    if not request.user.is_learner:
-        return redirect('home')
-    user = request.user
-    user.profile.new_announcements_count = 0
-    user.profile.save()
-    return JsonResponse({'status': 'success'})
-
-class Notification(View):
-    def get(self, request, *args, **kwargs):
-        last_check_time = request.user.last_announcements_check
-        
-        new_announcements = Announcement.objects.filter(posted_at__gt=last_check_time)
-        
-        request.user.last_announcements_check = timezone.now()
-        request.user.save()
-        
-        data = {
-            'count': new_announcements.count(),
-            'announcements': list(new_announcements.values('user', 'content', 'posted_at'))
-        }
-        return JsonResponse(data)
-    
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.is_learner:
-            return redirect('home')
-        return super().dispatch(request, *args, **kwargs)
-    
-class LNotesList(ListView):
+
+@method_decorator(conditional(lambda request: Notes.objects.all(), 'updated_at'), name='get')
+class LNotesList(CursorPaginationMixin, ListView):
     model = Notes
     template_name = 'dashboard/learner/list_notes.html'
     context_object_name = 'notes'
     paginate_by = 4
-
-    def get_queryset(self):
-        return Notes.objects.order_by('-id')
+    cursor_ordering = ('-id',)
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_learner:
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
     
+@conditional(lambda request: Tutorial.objects.all(), 'updated_at', depends=('course',))
 def ltutorial(request):
     if not request.user.is_learner:
         return redirect('home')
-    tutorials = Tutorial.objects.all().order_by('-created_at')
-    tutorials = {'tutorials':tutorials}
+    page = paginate(request, Tutorial.objects.select_related('course', 'user'), 10, ('-created_at', '-id'))
+    tutorials = {'tutorials': page, 'page_obj': page, 'is_paginated': page.has_other_pages()}
     return render(request, 'dashboard/learner/list_tutorial.html', tutorials)
 
+def search(request):
+    if not request.user.is_learner:
+        return redirect('home')
+    query = request.GET.get('q', '').strip()
+    results = []
+    if query:
+        interests = Learner.interests.through.objects.filter(learner_id=request.user.pk)
+        results = full_text.search(query, interests.values_list('course_id', flat=True))
+    return render(request, 'dashboard/learner/search.html', {'query': query, 'results': results})
+
+@method_decorator(conditional(lambda request, pk: Tutorial.objects.filter(pk=pk), 'updated_at',
+                              depends=('course', 'user')), name='get')
 class LTutorialDetail(LoginRequiredMixin, DetailView):
     model = Tutorial
     template_name = 'dashboard/learner/tutorial_detail.html'
@@ -173,6 +161,20 @@ class TakenQuizListView(ListView):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
     
+def record_attempt(learner, quiz, answer_key):
+    """Score the learner's saved answers to ``quiz`` and record the attempt."""
+    correct_answers = learner.quiz_answers.filter(answer_id__in=answer_key.correct_ids).count()
+    score = round((correct_answers / len(answer_key)) * 100.0, 2)
+    return TakenQuiz.objects.create(learner=learner, quiz=quiz, score=score)
+
+def _finish_quiz(request, learner, quiz, answer_key):
+    score = record_attempt(learner, quiz, answer_key).score
+    if score < 50.0:
+        messages.warning(request, 'Better luck next time! Your score for the quiz %s was %s.' % (quiz.name, score))
+    else:
+        messages.success(request, 'Congratulations! You completed the quiz %s with success! You scored %s points.' % (quiz.name, score))
+    return redirect('lquiz_list')
+
 def take_quiz(request, pk):
     if not request.user.is_learner:
         return redirect('home')
@@ -182,36 +184,65 @@ def take_quiz(request, pk):
     if learner.quizzes.filter(pk=pk).exists():
         return render(request, 'dashboard/learner/taken_quiz.html')
 
-    total_questions = quiz.questions.count()
-    unanswered_questions = learner.get_unanswered_questions(quiz)
-    total_unanswered_questions = unanswered_questions.count()
+    # Questions, answers and the correct ids come from the cached snapshot, not the ORM
+    answer_key = get_answer_key(quiz)
+    answered_ids = learner.quiz_answers.filter(answer_id__in=answer_key.answer_ids).values_list('answer_id', flat=True)
+    unanswered_questions = answer_key.unanswered(answered_ids)
+
+    if not answer_key:
+        return redirect('lquiz_list')
+    if not unanswered_questions:
+        # Everything was answered but the attempt itself was never recorded; only a POST records it
+        if request.method == 'POST':
+            return _finish_quiz(request, learner, quiz, answer_key)
+        return render(request, 'dashboard/learner/finish_quiz.html', {'quiz': quiz})
+
+    if quiz.single_page:
+        return take_whole_quiz(request, quiz, learner, answer_key, unanswered_questions)
+
+    total_questions = len(answer_key)
+    total_unanswered_questions = len(unanswered_questions)
     progress = 100 - round(((total_unanswered_questions - 1) / total_questions) * 100)
-    question = unanswered_questions.first()
+    question, answers = unanswered_questions[0]
 
     if request.method == 'POST':
-        form = TakeQuizForm(question=question, data=request.POST)
+        form = TakeQuizForm(question=question, answers=answers, data=request.POST)
         if form.is_valid():
             with transaction.atomic():
                 learner_answer = form.save(commit=False)
                 learner_answer.student = learner
                 learner_answer.save()
-                if learner.get_unanswered_questions(quiz).exists():
+                if total_unanswered_questions > 1:
                     return redirect('take_quiz', pk)
                 else:
-                    correct_answers = learner.quiz_answers.filter(answer__question__quiz=quiz, answer__is_correct=True).count()
-                    score = round((correct_answers / total_questions) * 100.0, 2)
-                    TakenQuiz.objects.create(learner=learner, quiz=quiz, score=score)
-                    if score < 50.0:
-                        messages.warning(request, 'Better luck next time! Your score for the quiz %s was %s.' % (quiz.name, score))
-                    else:
-                        messages.success(request, 'Congratulations! You completed the quiz %s with success! You scored %s points.' % (quiz.name, score))
-                    return redirect('lquiz_list')
+                    return _finish_quiz(request, learner, quiz, answer_key)
     else:
-        form = TakeQuizForm(question=question)
+        form = TakeQuizForm(question=question, answers=answers)
 
     return render(request, 'dashboard/learner/take_quiz_form.html', {
         'quiz': quiz,
         'question': question,
         'form': form,
         'progress': progress
-    })        
\ No newline at end of file
+    })
+
+def take_whole_quiz(request, quiz, learner, answer_key, unanswered_questions):
+    # Every question is rendered on one page and submitted in a single POST.
+    # Questions already answered on a step-by-step attempt are not asked again
+    data = request.POST if request.method == 'POST' else None
+    forms = [
+        (question, TakeQuizForm(question=question, answers=answers, data=data, prefix='question-%s' % question.pk))
+        for question, answers in unanswered_questions
+    ]
+
+    if data is not None and all([form.is_valid() for _, form in forms]):
+        with transaction.atomic():
+            LearnerAnswer.objects.bulk_create([
+                LearnerAnswer(student=learner, answer=form.cleaned_data['answer']) for _, form in forms
+            ])
+            return _finish_quiz(request, learner, quiz, answer_key)
+
+    return render(request, 'dashboard/learner/take_whole_quiz_form.html', {
+        'quiz': quiz,
+        'questions': forms,
+    })
@@ -1,12 +1,25 @@
+import asyncio
+import json
+import time
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.contrib.auth import logout,login, authenticate ,authenticate
+from django.views.decorators.http import require_http_methods, require_POST
 from django.views.generic.edit import CreateView
+from .. import media
+from ..conditional import conditional, shared_cache
 from ..forms import LearnerSignUpForm
-from ..models import User
+from ..models import User, Announcement
+from ..notifications import mark_all_read, recent_unread, unread_count
+from ..pubsub import ANNOUNCEMENTS, announcement_payload, broker
 
 # Shared Views
 
+@conditional()
+@shared_cache()
 def home(request):
 	return render(request, 'home.html')
 
@@ -67,3 +80,61 @@ class LearnerSignUpView(CreateView):
         user = form.save()
         login(self.request, user)
         return redirect('home')
+
+def notifications(request):
+    # Same endpoint for every role; the count is the user's counter row, not a COUNT
+    return JsonResponse({
+        'count': unread_count(request.user),
+        'announcements': recent_unread(request.user),
+    })
+
+@require_POST
+def mark_notifications_read(request):
+    mark_all_read(request.user)
+    return JsonResponse({'status': 'success'})
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    if not media.can_read(request.user, path):
+        return redirect('home')
+    return media.response(request, path)
+
+STREAM_HEARTBEAT = 15
+STREAM_MAX_AGE = 300
+
+async def announcement_stream(request):
+    # Server-Sent Events: one long-lived connection per tab instead of polling.
+    # Only ASGI can hold the connection open; under WSGI answer 204 so the
+    # browser's EventSource gives up and the page falls back to polling.
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+
+    async def events():
+        async with broker.subscribe(ANNOUNCEMENTS) as queue:
+            yield 'retry: 10000\n\n'
+            if last_event_id.isdigit():
+                # Replay what was posted while the browser was reconnecting
+                missed = Announcement.objects.filter(pk__gt=int(last_event_id)).order_by('pk')[:50]
+                async for announcement in missed:
+                    yield _sse(announcement_payload(announcement))
+            deadline = time.monotonic() + STREAM_MAX_AGE
+            while time.monotonic() < deadline:
+                try:
+                    message = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                else:
+                    yield _sse(message)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _sse(message):
+    return 'id: %s\nevent: announcement\ndata: %s\n\n' % (message['id'], json.dumps(message, cls=DjangoJSONEncoder))
@@ -0,0 +1,38 @@
+// Live announcements for the dashboard navbar.
+// New announcements are pushed over Server-Sent Events; browsers without
+// EventSource, or servers that refuse to stream (WSGI answers 204), fall
+// back to polling the role's notification endpoint.
+var ANNOUNCEMENT_POLL_INTERVAL = 30000;
+
+function listenForAnnouncements(streamUrl, onAnnouncement, poll)
+{
+    var polling = null;
+
+    function startPolling()
+    {
+        if (polling === null)
+        {
+            polling = setInterval(poll, ANNOUNCEMENT_POLL_INTERVAL);
+        }
+    }
+
+    if (!window.EventSource)
+    {
+        startPolling();
+        return;
+    }
+
+    var source = new EventSource(streamUrl);
+    source.addEventListener('announcement', function (event)
+    {
+        onAnnouncement(JSON.parse(event.data));
+    });
+    source.onerror = function ()
+    {
+        // CONNECTING means the browser is retrying on its own; CLOSED means it gave up
+        if (source.readyState === EventSource.CLOSED)
+        {
+            startPolling();
+        }
+    };
+}
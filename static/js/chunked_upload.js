@@ -0,0 +1,136 @@
+// Resumable chunked uploads for notes files (see learning/uploads.py).
+// On submit, the file chosen in the form's input[type=file][data-chunked] is
+// sent in chunks to the upload endpoint; the form then posts only the upload
+// id. An interrupted upload picks up from the server's offset, also after a
+// page reload, since the upload URL is remembered per file. Browsers without
+// fetch submit the file the ordinary way.
+var CHUNKED_UPLOAD_RETRIES = 5;
+
+function chunkedUploadKey(file)
+{
+    return 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+}
+
+function csrfToken(form)
+{
+    return form.querySelector('input[name=csrfmiddlewaretoken]').value;
+}
+
+function sendFileInChunks(file, startUrl, token, onProgress)
+{
+    var key = chunkedUploadKey(file);
+    var attempts = 0;
+
+    function json(response)
+    {
+        if (!response.ok && response.status !== 409)
+        {
+            throw new Error('Upload failed (' + response.status + ')');
+        }
+        return response.json();
+    }
+
+    function start()
+    {
+        var body = new FormData();
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        return fetch(startUrl, {method: 'POST', body: body, headers: {'X-CSRFToken': token}, credentials: 'same-origin'})
+            .then(json)
+            .then(function (state)
+            {
+                localStorage.setItem(key, state.url);
+                return state;
+            });
+    }
+
+    function resume()
+    {
+        var url = localStorage.getItem(key);
+        if (!url)
+        {
+            return start();
+        }
+        return fetch(url, {credentials: 'same-origin'}).then(function (response)
+        {
+            // Expired or discarded on the server: start over
+            return response.ok ? response.json() : start();
+        });
+    }
+
+    function send(state)
+    {
+        onProgress(state.offset, file.size);
+        if (state.complete)
+        {
+            localStorage.removeItem(key);
+            return state;
+        }
+        var chunk = file.slice(state.offset, state.offset + state.chunk_size);
+        return fetch(state.url, {
+            method: 'PUT',
+            body: chunk,
+            credentials: 'same-origin',
+            headers: {'X-CSRFToken': token, 'Upload-Offset': state.offset, 'Content-Type': 'application/octet-stream'}
+        })
+            .then(json)
+            .then(function (next)
+            {
+                attempts = 0;
+                // A 409 only carries the offset to continue from
+                return send(Object.assign({}, state, next));
+            }, retry);
+    }
+
+    function retry(error)
+    {
+        if (++attempts > CHUNKED_UPLOAD_RETRIES)
+        {
+            throw error;
+        }
+        return new Promise(function (resolve)
+        {
+            setTimeout(resolve, 1000 * Math.pow(2, attempts));
+        }).then(resume).then(send);
+    }
+
+    return resume().then(send);
+}
+
+function enableChunkedUpload(form, startUrl)
+{
+    var input = form.querySelector('input[type=file][data-chunked]');
+    if (!input || !window.fetch || !window.localStorage)
+    {
+        return;
+    }
+    var progress = document.createElement('small');
+    input.parentNode.appendChild(progress);
+
+    form.addEventListener('submit', function (event)
+    {
+        var file = input.files[0];
+        if (!file || form.elements.upload)
+        {
+            return;
+        }
+        event.preventDefault();
+        sendFileInChunks(file, startUrl, csrfToken(form), function (offset, size)
+        {
+            progress.textContent = 'Uploading ' + Math.floor(100 * offset / Math.max(size, 1)) + '%';
+        }).then(function (state)
+        {
+            var id = document.createElement('input');
+            id.type = 'hidden';
+            id.name = 'upload';
+            id.value = state.url.split('/').filter(Boolean).pop();
+            form.appendChild(id);
+            // The bytes are on the server already
+            input.removeAttribute('name');
+            form.submit();
+        }, function (error)
+        {
+            progress.textContent = error.message + '. Submit again to resume.';
+        });
+    });
+}
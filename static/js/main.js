@@ -1,3 +0,0 @@
-$(document).ready(function(){   
-    $('.datatable').dataTable();
-});
\ No newline at end of file